@@ -1,9 +1,13 @@
 import dataclasses
+import hashlib
 import importlib
 import logging
+import os
+import re
 import subprocess
 import sys
 from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from shutil import rmtree
 
@@ -86,15 +90,33 @@ def _get_output_path(output_dir: Path, deployment_extension: str) -> Path:
     )
 
 
-def build(output_dir: Path, contract_path: Path) -> Path:
+def build(output_dir: Path, contract_path: Path, digest: str | None = None) -> Path:
     """
     Builds the contract by exporting (compiling) its source and generating a client.
-    If the output directory already exists, it is cleared.
+    Artifacts are written to a scratch directory that replaces `output_dir` only
+    once everything succeeded, so a failed or interrupted build leaves the
+    previous artifacts intact. `digest` is stored as the build's fingerprint.
     """
-    output_dir = output_dir.resolve()
-    if output_dir.exists():
-        rmtree(output_dir)
-    output_dir.mkdir(exist_ok=True, parents=True)
+    final_dir = output_dir.resolve()
+    scratch = final_dir.with_name(f".{final_dir.name}.build-{os.getpid()}")
+    if scratch.exists():
+        rmtree(scratch)
+    scratch.mkdir(parents=True)
+    try:
+        client_file = _export(scratch, contract_path)
+        if digest:
+            (scratch / FINGERPRINT_FILE).write_text(digest + "\n")
+        _replace_dir(scratch, final_dir)
+    finally:
+        if scratch.exists():
+            rmtree(scratch)
+    if client_file:
+        return final_dir / client_file
+    return final_dir
+
+
+def _export(output_dir: Path, contract_path: Path) -> str | None:
+    """`algokit compile` + `algokit generate client` into `output_dir`."""
     logger.info(f"Exporting {contract_path} to {output_dir}")
 
     build_result = subprocess.run(
@@ -152,16 +174,150 @@ def build(output_dir: Path, contract_path: Path) -> Path:
                     raise Exception(
                         f"Could not generate typed client:\n{generate_result.stdout}"
                     )
-    if client_file:
-        return output_dir / client_file
-    return output_dir
+    return client_file
+
+
+def _replace_dir(src: Path, dst: Path) -> None:
+    """Swap a finished build into place: two renames, no half-written state."""
+    old = dst.with_name(f".{dst.name}.old-{os.getpid()}")
+    if dst.exists():
+        dst.rename(old)
+    try:
+        src.rename(dst)
+    except BaseException:
+        if old.exists() and not dst.exists():
+            old.rename(dst)  # keep serving the previous artifacts
+        raise
+    if old.exists():
+        rmtree(old)
+
+
+_LEFTOVER = re.compile(r"^\.(?P<name>.+)\.(?P<kind>old|build)-(?P<pid>\d+)$")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _clean_leftovers(artifact_path: Path) -> None:
+    """
+    Remove scratch and swapped-out dirs left by builds that died (their pid
+    is gone). A swapped-out dir whose build died between the two renames of
+    `_replace_dir` is moved back into place instead.
+    """
+    if not artifact_path.is_dir():
+        return
+    for path in artifact_path.iterdir():
+        m = _LEFTOVER.match(path.name)
+        if not m or not path.is_dir():
+            continue
+        pid = int(m["pid"])
+        if pid != os.getpid() and _pid_alive(pid):
+            continue  # a build running in another process
+        dst = path.with_name(m["name"])
+        if m["kind"] == "old" and not dst.exists():
+            logger.info(f"{m['name']}: restoring artifacts of an interrupted build")
+            path.rename(dst)
+        else:
+            logger.info(f"Removing leftover {path.name}")
+            rmtree(path)
+
+
+# ----------------------- Incremental Builds ----------------------- #
+
+# Bump when the compile / generate invocations above change, so every
+# contract rebuilds once.
+BUILD_FORMAT = "1"
+FINGERPRINT_FILE = ".fingerprint"
+
+
+def _toolchain_version() -> str:
+    """`algokit --version`; part of every fingerprint (compiler upgrades rebuild)."""
+    try:
+        result = subprocess.run(
+            ["algokit", "--version"], capture_output=True, text=True, timeout=60
+        )
+        return result.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def fingerprint(contract: SmartContract, toolchain: str) -> str:
+    """
+    sha256 over every Python source in the contract's folder (deploy_config.py
+    excluded: it does not affect artifacts), the toolchain and BUILD_FORMAT.
+    """
+    folder = contract.path.parent
+    h = hashlib.sha256(f"{BUILD_FORMAT}\0{toolchain}\0".encode())
+    for source in sorted(folder.rglob("*.py")):
+        if "__pycache__" in source.parts or source.name == "deploy_config.py":
+            continue
+        h.update(str(source.relative_to(folder)).encode() + b"\0")
+        h.update(source.read_bytes() + b"\0")
+    return h.hexdigest()
+
+
+def _is_current(output_dir: Path, digest: str) -> bool:
+    stamp = output_dir / FINGERPRINT_FILE
+    return stamp.is_file() and stamp.read_text().strip() == digest
+
+
+def build_changed(
+    artifact_path: Path, selected: list[SmartContract], force: bool = False
+) -> None:
+    """
+    Rebuild only contracts whose fingerprint changed, independent ones in
+    parallel (BUILD_JOBS processes, default one per CPU).
+    """
+    _clean_leftovers(artifact_path)
+    toolchain = _toolchain_version()
+    pending: dict[str, tuple[Path, Path, str]] = {}
+    for contract in selected:
+        output_dir = artifact_path / contract.name
+        digest = fingerprint(contract, toolchain)
+        if not force and _is_current(output_dir, digest):
+            logger.info(f"{contract.name}: up to date, skipping")
+            continue
+        pending[contract.name] = (output_dir, contract.path, digest)
+    if not pending:
+        return
+
+    jobs = int(os.getenv("BUILD_JOBS", "0")) or os.cpu_count() or 1
+    jobs = min(jobs, len(pending))
+    logger.info(f"Building {', '.join(pending)} ({jobs} parallel)")
+    if jobs == 1:
+        for name, args in pending.items():
+            build(*args)
+            logger.info(f"{name}: built")
+        return
+
+    failures: list[str] = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {name: pool.submit(build, *args) for name, args in pending.items()}
+        for name, future in futures.items():
+            try:
+                future.result()
+                logger.info(f"{name}: built")
+            except Exception as e:
+                failures.append(f"{name}: {e}")
+    if failures:
+        raise Exception("Could not build contracts:\n" + "\n".join(failures))
 
 
 # --------------------------- Main Logic --------------------------- #
 
 
-def main(action: str, contract_name: str | None = None) -> None:
-    """Main entry point to build and/or deploy smart contracts."""
+def main(action: str, contract_name: str | None = None, force: bool = False) -> None:
+    """
+    Main entry point to build and/or deploy smart contracts.
+    `force` rebuilds even contracts whose sources are unchanged.
+    """
     artifact_path = root_path / "artifacts"
     # Filter contracts based on an optional specific contract name.
     filtered_contracts = [
@@ -172,9 +328,7 @@ def main(action: str, contract_name: str | None = None) -> None:
 
     match action:
         case "build":
-            for contract in filtered_contracts:
-                logger.info(f"Building app at {contract.path}")
-                build(artifact_path / contract.name, contract.path)
+            build_changed(artifact_path, filtered_contracts, force)
         case "deploy":
             for contract in filtered_contracts:
                 output_dir = artifact_path / contract.name
@@ -192,9 +346,8 @@ def main(action: str, contract_name: str | None = None) -> None:
                     logger.info(f"Deploying app {contract.name}")
                     contract.deploy()
         case "all":
+            build_changed(artifact_path, filtered_contracts, force)
             for contract in filtered_contracts:
-                logger.info(f"Building app at {contract.path}")
-                build(artifact_path / contract.name, contract.path)
                 if contract.deploy:
                     logger.info(f"Deploying {contract.name}")
                     contract.deploy()
@@ -203,9 +356,11 @@ def main(action: str, contract_name: str | None = None) -> None:
 
 
 if __name__ == "__main__":
-    if len(sys.argv) > 2:
-        main(sys.argv[1], sys.argv[2])
-    elif len(sys.argv) > 1:
-        main(sys.argv[1])
+    force = "--force" in sys.argv[1:]
+    args = [a for a in sys.argv[1:] if a != "--force"]
+    if len(args) > 1:
+        main(args[0], args[1], force)
+    elif args:
+        main(args[0], force=force)
     else:
-        main("all")
+        main("all", force=force)
@@ -0,0 +1,11 @@
+# app/__init__.py
+# The contract package (hackathon/src) is imported as `hackathon` by
+# app.core.wallet and app.sim; put it on the path for every entry point
+# (uvicorn app.main, python -m bench, tests), not just the web app.
+from pathlib import Path
+import sys as _sys
+
+_SMART_CONTRACTS_ROOT = Path(__file__).resolve().parents[2]
+_HACKATHON_SRC = _SMART_CONTRACTS_ROOT / "hackathon" / "src"
+if str(_HACKATHON_SRC) not in _sys.path:
+    _sys.path.insert(0, str(_HACKATHON_SRC))
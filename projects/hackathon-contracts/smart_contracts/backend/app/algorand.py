@@ -1,8 +1,12 @@
 from algokit_utils import AlgorandClient, AccountManager
 from algokit_utils.models.amount import AlgoAmount
 
+from app.core import faults, metrics
+
 
 def get_algorand_client() -> AlgorandClient:
+    faults.instrument_algosdk()  # once; no-op unless FAULTS_ENABLED
+    metrics.instrument_algosdk()  # once; algod / indexer / kmd latency metrics
     return AlgorandClient.default_localnet()
 
 
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import os
 import json
 import time
 import hashlib
-from typing import Optional, Any, Dict
+import threading
+from contextlib import ExitStack
+from typing import Optional, Any, Callable, Dict
 
-from algosdk import transaction
+from algosdk import encoding, transaction
+from algosdk.error import AlgodHTTPError
 from algosdk.atomic_transaction_composer import (
     AtomicTransactionComposer,
     AccountTransactionSigner,
@@ -13,7 +17,14 @@ from algosdk.atomic_transaction_composer import (
 )
 
 from app.algorand import get_algorand_client, get_account_manager
+from app.core import tracing
+from app.core.chain import follower
+from app.core.fees import NORMAL, URGENT, apply_fee, suggested_params
 from app.core.firebase import get_firestore_client
+from app.core.ledger import ledger
+from app.core.notes import NOTE_LIMIT, NOTE_NS, encode_note_v2
+from app.core.receipts import put_receipt
+from app.core.treasury import get_treasury_pool
 from app.binance import spot_market_buy_usdc_with_usdt, find_usdcusdt_symbol
 
 # ─────────────────────────────────────────────────────────────
@@ -21,7 +32,6 @@ from app.binance import spot_market_buy_usdc_with_usdt, find_usdcusdt_symbol
 # ─────────────────────────────────────────────────────────────
 
 SYSDOC = lambda: get_firestore_client().collection("__sys").document("USDC")
-RECEIPTS = lambda: get_firestore_client().collection("receipts")
 
 # ─────────────────────────────────────────────────────────────
 # ASA config
@@ -31,8 +41,8 @@ USDC_DECIMALS = 6  # like real USDC
 USDC_UNIT = "USDC"
 USDC_NAME = "USDC"
 
-NOTE_LIMIT = 1024  # Algorand hard cap
-NOTE_NS = "rad/ramp"  # a tiny namespace string for the note
+# "v2" = compact binary note (app.core.notes); "v1" = legacy minified JSON.
+NOTE_FORMAT = os.getenv("NOTE_FORMAT", "v2").lower()
 
 
 def _now() -> float:
@@ -57,6 +67,12 @@ def encode_receipt_note(receipt_full: dict) -> tuple[bytes, str]:
     Build a compact on-chain note (<= 1024 bytes) and return (note_bytes, content_hash).
     The content_hash is SHA-256 of the minified full receipt (hex).
     """
+    if NOTE_FORMAT != "v1":
+        return encode_note_v2(receipt_full)
+    return _encode_receipt_note_v1(receipt_full)
+
+
+def _encode_receipt_note_v1(receipt_full: dict) -> tuple[bytes, str]:
     full_min = _minify(receipt_full)
     h = _hash_bytes(full_min)
 
@@ -118,27 +134,10 @@ def encode_receipt_note(receipt_full: dict) -> tuple[bytes, str]:
 def _save_full_receipt(txid: str, content_hash: str, receipt_full: dict):
     """
     Persist the full receipt off-chain so the UI can retrieve by hash/txid.
+    Stored once (compressed) under the content hash, plus a txid pointer.
     """
     try:
-        RECEIPTS().document(txid).set(
-            {
-                "hash": content_hash,
-                "txid": txid,
-                "ts": int(time.time()),
-                "receipt": receipt_full,
-            },
-            merge=True,
-        )
-        # Also store by hash (helpful for quick lookup)
-        RECEIPTS().document(content_hash).set(
-            {
-                "hash": content_hash,
-                "txid": txid,
-                "ts": int(time.time()),
-                "receipt": receipt_full,
-            },
-            merge=True,
-        )
+        put_receipt(txid, content_hash, receipt_full)
     except Exception:
         # Don't fail the request if Firestore write has issues.
         pass
@@ -149,11 +148,26 @@ def _save_full_receipt(txid: str, content_hash: str, receipt_full: dict):
 # ─────────────────────────────────────────────────────────────
 
 
+_usdc_asset_id: Optional[int] = None  # resolved once per process
+_usdc_lock = threading.Lock()
+
+
 def _ensure_usdc_dev() -> int:
     """
     Ensure a demo USDC ASA exists on LocalNet. Returns asset_id.
-    Stores { assetId } in Firestore __sys/USDC.
+    Stores { assetId } in Firestore __sys/USDC; kept in memory after the
+    first lookup (the lifespan warm-up resolves it before traffic).
     """
+    global _usdc_asset_id
+    if _usdc_asset_id is not None:
+        return _usdc_asset_id
+    with _usdc_lock:
+        if _usdc_asset_id is None:
+            _usdc_asset_id = _resolve_usdc_dev()
+    return _usdc_asset_id
+
+
+def _resolve_usdc_dev() -> int:
     sysdoc_ref = SYSDOC()
     doc = sysdoc_ref.get().to_dict() or {}
     if doc.get("assetId"):
@@ -164,9 +178,7 @@ def _ensure_usdc_dev() -> int:
     am = get_account_manager()
     creator = am.localnet_dispenser()  # use dispenser as ASA creator
 
-    sp = algod.suggested_params()
-    sp.flat_fee = True
-    sp.fee = max(sp.min_fee, 1000)
+    sp = suggested_params(algod)
 
     txn = transaction.AssetConfigTxn(
         sender=creator.address,
@@ -181,6 +193,7 @@ def _ensure_usdc_dev() -> int:
         clawback=creator.address,
         decimals=USDC_DECIMALS,
     )
+    apply_fee(algod, txn, NORMAL)
     stx = txn.sign(creator.signer.private_key)
     txid = algod.send_transaction(stx)
     transaction.wait_for_confirmation(algod, txid, 4)
@@ -195,11 +208,29 @@ def _ensure_usdc_dev() -> int:
     return asset_id
 
 
+def is_opted_in(address: str, asset_id: int) -> bool:
+    """Whether `address` can receive `asset_id`: the follower's view, then algod."""
+    if follower.views.is_opted_in(address, asset_id):
+        return True
+    if follower.covers_history():
+        return False  # the views have seen every opt-in
+    try:
+        get_algorand_client().client.algod.account_asset_info(address, asset_id)
+    except AlgodHTTPError as e:
+        if e.code == 404:
+            return False
+        raise
+    return True
+
+
 def _opt_in_if_needed(address: str, signer_sk: bytes, asset_id: int):
     """
     Opt-in the account at `address` to `asset_id` by signing with `signer_sk`.
     No-op if already opted-in.
     """
+    if follower.views.is_opted_in(address, asset_id):
+        return  # seen on chain by the follower
+
     algo = get_algorand_client()
     algod = algo.client.algod
 
@@ -210,9 +241,7 @@ def _opt_in_if_needed(address: str, signer_sk: bytes, asset_id: int):
     except Exception:
         pass  # not opted-in or not holding
 
-    sp = algod.suggested_params()
-    sp.flat_fee = True
-    sp.fee = max(sp.min_fee, 1000)
+    sp = suggested_params(algod)
 
     optin = transaction.AssetTransferTxn(
         sender=address,
@@ -221,6 +250,7 @@ def _opt_in_if_needed(address: str, signer_sk: bytes, asset_id: int):
         amt=0,
         index=asset_id,
     )
+    apply_fee(algod, optin, URGENT)
     stx = optin.sign(signer_sk)
     txid = algod.send_transaction(stx)
     transaction.wait_for_confirmation(algod, txid, 4)
@@ -238,16 +268,20 @@ def _send_usdc_dev(
     asset_id: int,
     amt_min_units: int,
     note_json: dict,
+    priority: str = URGENT,
+    wait: bool = True,
+    on_signed: Optional[Callable[[str, str, str, tuple[int, int]], None]] = None,
 ) -> tuple[str, str]:
     """
     Sends ASA and returns (txid, content_hash). Ensures note <= 1024 bytes.
+    With wait=False the transaction is only submitted, not awaited.
+    `on_signed(txid, content_hash, signed_b64, (first_valid, last_valid))`
+    runs after signing and before submission; if it raises, nothing is sent.
     """
     algo = get_algorand_client()
     algod = algo.client.algod
 
-    sp = algod.suggested_params()
-    sp.flat_fee = True
-    sp.fee = max(sp.min_fee, 1000)
+    sp = suggested_params(algod)
 
     note_bytes, content_hash = encode_receipt_note(note_json)
 
@@ -259,11 +293,28 @@ def _send_usdc_dev(
         index=asset_id,
         note=note_bytes,
     )
+    apply_fee(algod, txn, priority)
+
+    if on_signed is not None:
+        stxn = txn.sign(sender_sk)
+        txid = stxn.get_txid()
+        valid = (txn.first_valid_round, txn.last_valid_round)
+        on_signed(txid, content_hash, encoding.msgpack_encode(stxn), valid)
+        algod.send_transaction(stxn)
+        ledger.submitted(txid, sender_addr, to_addr, amt_min_units)
+        if wait:
+            wait_for_mint(txid)
+        return txid, content_hash
 
     atc = AtomicTransactionComposer()
     atc.add_transaction(TransactionWithSigner(txn, AccountTransactionSigner(sender_sk)))
+    if not wait:
+        txid = atc.submit(algod)[0]
+        ledger.submitted(txid, sender_addr, to_addr, amt_min_units)
+        return txid, content_hash
     res = atc.execute(algod, 4)
     txid = res.tx_ids[0]
+    ledger.confirmed(txid, res.confirmed_round, sender_addr, to_addr, amt_min_units)
     return txid, content_hash
 
 
@@ -279,22 +330,27 @@ def _units_to_min_units(units_str: str) -> int:
     return whole * (10**USDC_DECIMALS) + (int(frac) if frac else 0)
 
 
-def mint_and_send_usdc_dev(to_addr: str, usdc_units: str, receipt: dict) -> dict:
+@tracing.traced("usdc.mint_and_send")
+def mint_and_send_usdc_dev(
+    to_addr: str,
+    usdc_units: str,
+    receipt: dict,
+    wait: bool = True,
+    on_intent: Optional[Callable[[dict], None]] = None,
+) -> dict:
     """
-    Mints (from the creator treasury) and sends USDC to `to_addr`.
-    Embeds a compact JSON receipt into the transfer note (public, on-chain),
+    Mints (from a treasury hot account) and sends USDC to `to_addr`.
+    Embeds a compact receipt into the transfer note (public, on-chain),
     and saves the full receipt off-chain in Firestore keyed by hash + txid.
     `usdc_units` is a string like "12.34" in asset units.
-    """
-    asset_id = _ensure_usdc_dev()
-
-    # Use dispenser as "treasury" for demo
-    am = get_account_manager()
-    treasury = am.localnet_dispenser()
-
-    # Ensure treasury is opted-in (some SDKs require it too)
-    _opt_in_if_needed(treasury.address, treasury.signer.private_key, asset_id)
+    With wait=False it returns right after submission; see `wait_for_mint`.
 
+    `on_intent` is handed the signed transaction (see `resend_mint`) before
+    it is submitted, so a caller can checkpoint it; if it raises, nothing is
+    sent and nothing is minted.
+    """
+    with tracing.span("usdc.ensure_asset"):
+        asset_id = _ensure_usdc_dev()
     min_units = _units_to_min_units(usdc_units)
 
     # Envelope that goes into hashing + compact note
@@ -310,27 +366,119 @@ def mint_and_send_usdc_dev(to_addr: str, usdc_units: str, receipt: dict) -> dict
         **receipt,
     }
 
-    txid, content_hash = _send_usdc_dev(
-        sender_addr=treasury.address,
-        sender_sk=treasury.signer.private_key,
-        to_addr=to_addr,
-        asset_id=asset_id,
-        amt_min_units=min_units,
-        note_json=envelope,
-    )
+    # Sign from a leased hot account (opted in, float topped up from the reserve)
+    with ExitStack() as stack:
+        with tracing.span("treasury.lease", min_units=min_units):
+            hot = stack.enter_context(
+                get_treasury_pool().lease(asset_id=asset_id, usdc_needed=min_units)
+            )
+        hook = None
+        if on_intent is not None:
+
+            def hook(txid, content_hash, signed_b64, valid):
+                # the receipt goes first: a resent intent has no envelope
+                _save_full_receipt(txid, content_hash, envelope)
+                on_intent(
+                    _mint_result(txid, asset_id, min_units, content_hash, hot.address)
+                    | {"signed": signed_b64, "valid": list(valid), "to": to_addr}
+                )
+
+        with tracing.span("usdc.send", sender=hot.address, wait=wait) as sp:
+            txid, content_hash = _send_usdc_dev(
+                sender_addr=hot.address,
+                sender_sk=hot.private_key,
+                to_addr=to_addr,
+                asset_id=asset_id,
+                amt_min_units=min_units,
+                note_json=envelope,
+                wait=wait,
+                on_signed=hook,
+            )
+            sp.set(txid=txid)
 
     # Persist full receipt off-chain for rich UI / audit
-    _save_full_receipt(txid, content_hash, envelope)
+    if on_intent is None:
+        with tracing.span("receipt.save"):
+            _save_full_receipt(txid, content_hash, envelope)
+
+    return _mint_result(txid, asset_id, min_units, content_hash, hot.address) | {
+        "confirmed": wait
+    }
 
+
+def _mint_result(
+    txid: str, asset_id: int, min_units: int, content_hash: str, sender: str
+) -> dict:
     return {
         "txid": txid,
         "asset_id": asset_id,
         "amount_min_units": min_units,
         "decimals": USDC_DECIMALS,
         "hash": content_hash,
+        "sender": sender,
     }
 
 
+_ALREADY_SENT = ("already in ledger", "already in pool")
+
+
+@tracing.traced("usdc.resend_mint")
+def resend_mint(intent: dict) -> Optional[dict]:
+    """
+    Re-send a mint whose intent was checkpointed before submission (a crash
+    may have hit before or after the send). The same signed bytes can land
+    at most once, so this never mints twice. Returns the mint result when the
+    transaction is on chain or (re)accepted, None when it is past its last
+    valid round without having landed: only then is a fresh mint safe.
+    """
+    algod = get_algorand_client().client.algod
+    txid = intent["txid"]
+    result = _mint_result(
+        txid,
+        intent["asset_id"],
+        intent["amount_min_units"],
+        intent["hash"],
+        intent["sender"],
+    ) | {"confirmed": False}
+    try:
+        algod.send_raw_transaction(intent["signed"])
+    except AlgodHTTPError as e:
+        if any(s in str(e) for s in _ALREADY_SENT):
+            return result
+        if "dead" not in str(e):
+            raise
+        return result if _landed_round(algod, txid, *intent["valid"]) else None
+    ledger.submitted(txid, intent["sender"], intent["to"], intent["amount_min_units"])
+    return result
+
+
+def _landed_round(algod, txid: str, first: int, last: int) -> Optional[int]:
+    """Round `txid` was confirmed in, searching its whole validity window."""
+    rnd = follower.views.confirmed_round(txid)
+    if rnd:
+        return rnd
+    try:
+        return (
+            int(algod.pending_transaction_info(txid).get("confirmed-round") or 0)
+            or None
+        )
+    except AlgodHTTPError:
+        pass
+    for r in range(first, last + 1):
+        if txid in (algod.get_block_txids(r).get("blockTxids") or []):
+            return r
+    return None
+
+
+def wait_for_mint(txid: str, rounds: int = 4) -> int:
+    """Block until `txid` is confirmed; returns the confirmed round."""
+    algod = get_algorand_client().client.algod
+    info = transaction.wait_for_confirmation(algod, txid, rounds)
+    confirmed_round = int(info.get("confirmed-round", 0))
+    ledger.confirmed(txid, confirmed_round)  # settles the submitted amount
+    return confirmed_round
+
+
 # -----------------------------
 # Spot testnet buy -> LocalNet mint & send
 # -----------------------------
@@ -1,7 +1,20 @@
 from __future__ import annotations
-import os, time, hmac, hashlib, requests
+import os, time, hmac, hashlib, threading, requests
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlencode
 
+from app.core import faults, metrics, tracing
+from app.core.ratelimit import (
+    ACCOUNT,
+    BACKFILL,
+    ORDER,
+    QUOTE,
+    RateLimited,
+    WeightLimiter,
+)
+from app.core.routing import blended_slippage_bps, child_sizes, plan_routes
+from app.sim import SIMULATION
+
 # ── Env & base normalization ────────────────────────────────────────────────
 _RAW_BASE = os.getenv("BINANCE_BASE", "https://testnet.binance.vision").rstrip("/")
 if _RAW_BASE.endswith("/api"):  # avoid /api/api/...
@@ -29,6 +42,35 @@ HEADERS_AUTH = (
 )
 HEADERS_JSON = {"Accept": "application/json", "User-Agent": "rad-ramp/1.0"}
 
+# ── Rate limits ────────────────────────────────────────────────────────────
+# Spot defaults: 6000 request weight / minute, 100 orders / 10 s per account.
+BINANCE_WEIGHT_PER_MIN = int(os.getenv("BINANCE_WEIGHT_PER_MIN", "6000"))
+BINANCE_ORDERS_PER_10S = int(os.getenv("BINANCE_ORDERS_PER_10S", "100"))
+BINANCE_QUOTE_TTL = float(os.getenv("BINANCE_QUOTE_TTL", "1.0"))  # fresh quote, s
+BINANCE_QUOTE_STALE_MAX = float(os.getenv("BINANCE_QUOTE_STALE_MAX", "30"))  # s
+BINANCE_SYMBOL_TTL = float(os.getenv("BINANCE_SYMBOL_TTL", "600"))  # s
+
+# ── Routing ────────────────────────────────────────────────────────────────
+STABLE_CANDIDATES = ["USDCUSDT", "BUSDUSDT", "FDUSDUSDT", "USDTBUSD", "TUSDUSDT"]
+ROUTE_DEPTH_LIMIT = int(os.getenv("ROUTE_DEPTH_LIMIT", "20"))  # levels per book
+ROUTE_MIN_CHILD_USDT = float(os.getenv("ROUTE_MIN_CHILD_USDT", "10"))
+ROUTE_MAX_CHILD_USDT = float(os.getenv("ROUTE_MAX_CHILD_USDT", "0"))  # 0 = no split
+
+# Request weight per endpoint (single-symbol variants).
+_WEIGHTS = {
+    "/api/v3/ping": 1,
+    "/api/v3/time": 1,
+    "/api/v3/ticker/price": 2,
+    "/api/v3/ticker/bookTicker": 2,
+    "/api/v3/depth": 5,  # limit <= 100
+    "/api/v3/klines": 2,
+    "/api/v3/account": 20,
+    "/api/v3/order": 4,  # GET; POST is 1 + an order slot
+}
+
+limiter = WeightLimiter(BINANCE_WEIGHT_PER_MIN, BINANCE_ORDERS_PER_10S)
+_session = requests.Session()
+
 
 def _dbg(msg: str):
     if BINANCE_DEBUG:
@@ -48,15 +90,80 @@ def _json_or_raise(r: requests.Response, label: str):
     return data
 
 
-# ── Public endpoints ───────────────────────────────────────────────────────
-def _public_get(path: str, params: dict | None = None):
+def _http(
+    method: str,
+    path: str,
+    params: dict,
+    headers: dict,
+    timeout: float,
+    priority: int,
+    weight: int | None = None,
+) -> requests.Response:
+    """
+    Every Binance call goes through here: reserve weight with the shared
+    limiter, send on the pooled session, then feed the used-weight headers
+    (and any 429/418 ban) back into the limiter.
+    """
+    is_order = method == "POST" and path == "/api/v3/order"
+    if weight is None:
+        weight = 1 if is_order else _WEIGHTS.get(path, 1)
+    limiter.acquire(weight, priority, is_order=is_order)
     url = f"{BINANCE_BASE}{path}"
-    _dbg(f"GET {url} params={params}")
-    r = requests.get(url, headers=HEADERS_JSON, params=params or {}, timeout=20)
+    _dbg(f"{method} {url} params={params}")
+    op = f"{method} {path}"
+    with tracing.span("binance.http", op=op, symbol=params.get("symbol")) as sp:
+        with metrics.timed("binance", op):
+            faults.inject("binance", op, timeout)
+            r = _session.request(
+                method, url, headers=headers, params=params, timeout=timeout
+            )
+        sp.set(status=r.status_code)
     _dbg(f"-> {r.status_code} body[:120]={r.text[:120]!r}")
+    if r.status_code >= 400:
+        metrics.http_error("binance", op, r.status_code)
+    limiter.observe(r.status_code, r.headers)
+    return r
+
+
+def headroom() -> dict:
+    """Limiter state for metrics / the headroom endpoint."""
+    return {**limiter.snapshot(), "quote_cache": len(_quote_cache)}
+
+
+# ── Public endpoints ───────────────────────────────────────────────────────
+def _public_get(path: str, params: dict | None = None, priority: int = QUOTE):
+    r = _http("GET", path, params or {}, HEADERS_JSON, 20, priority)
     return _json_or_raise(r, f"GET {path}")
 
 
+# (path, symbol) -> (monotonic ts, payload)
+_quote_cache: dict[tuple[str, str], tuple[float, dict]] = {}
+_quote_lock = threading.Lock()
+
+
+def _cached_quote(path: str, symbol: str) -> dict:
+    """
+    Quote endpoints share one short-lived cache. When the limiter sheds the
+    refresh, a quote up to BINANCE_QUOTE_STALE_MAX old is served instead.
+    """
+    key = (path, symbol)
+    now = time.monotonic()
+    with _quote_lock:
+        hit = _quote_cache.get(key)
+    if hit and now - hit[0] <= BINANCE_QUOTE_TTL:
+        return hit[1]
+    try:
+        data = _public_get(path, {"symbol": symbol})
+    except RateLimited:
+        if hit and now - hit[0] <= BINANCE_QUOTE_STALE_MAX:
+            _dbg(f"serving stale {path} {symbol} ({now - hit[0]:.1f}s old)")
+            return hit[1]
+        raise
+    with _quote_lock:
+        _quote_cache[key] = (time.monotonic(), data)
+    return data
+
+
 def ping() -> dict:
     return _public_get("/api/v3/ping")
 
@@ -67,14 +174,30 @@ def server_time() -> dict:
 
 def _symbol_exists(symbol: str) -> bool:
     try:
-        _public_get("/api/v3/ticker/price", {"symbol": symbol})
+        _cached_quote("/api/v3/ticker/price", symbol)
         return True
+    except RateLimited:
+        raise  # unknown, not absent
     except Exception as e:
         _dbg(f"symbol check failed for {symbol}: {e}")
         return False
 
 
+_picked: tuple[float, str] | None = None
+
+
 def pick_stable_pair() -> str:
+    """Chosen symbol, re-probed at most every BINANCE_SYMBOL_TTL seconds."""
+    global _picked
+    if _picked and time.monotonic() - _picked[0] <= BINANCE_SYMBOL_TTL:
+        return _picked[1]
+    symbol = _probe_stable_pair()
+    _picked = (time.monotonic(), symbol)
+    return symbol
+
+
+@tracing.traced("binance.probe_symbol")
+def _probe_stable_pair() -> str:
     # 1) explicit override via env
     if BINANCE_SYMBOL:
         if _symbol_exists(BINANCE_SYMBOL):
@@ -84,8 +207,7 @@ def pick_stable_pair() -> str:
             f"BINANCE_SYMBOL={BINANCE_SYMBOL} not available on {BINANCE_BASE}"
         )
     # 2) preferred stables in order
-    candidates = ["USDCUSDT", "BUSDUSDT", "FDUSDUSDT", "USDTBUSD", "TUSDUSDT"]
-    for s in candidates:
+    for s in STABLE_CANDIDATES:
         if _symbol_exists(s):
             _dbg(f"using symbol: {s}")
             return s
@@ -98,12 +220,12 @@ def pick_stable_pair() -> str:
 
 
 def ticker_price(symbol: str) -> float:
-    data = _public_get("/api/v3/ticker/price", {"symbol": symbol})
+    data = _cached_quote("/api/v3/ticker/price", symbol)
     return float(data["price"])
 
 
 def book_ticker(symbol: str) -> dict:
-    data = _public_get("/api/v3/ticker/bookTicker", {"symbol": symbol})
+    data = _cached_quote("/api/v3/ticker/bookTicker", symbol)
     return {
         "bidPrice": float(data["bidPrice"]),
         "bidQty": float(data["bidQty"]),
@@ -112,12 +234,13 @@ def book_ticker(symbol: str) -> dict:
     }
 
 
-def spot_quote_usdc_from_usd(usd_amount: float) -> dict:
+def spot_quote_usdc_from_usd(usd_amount: float, symbol: str | None = None) -> dict:
     """
     Live spot snapshot for converting USD≈USDT into base (e.g., USDC) using chosen symbol.
     Computes expected base qty at last/mid/ask.
+    Pass `symbol` when it is already resolved to skip symbol probing.
     """
-    symbol = find_usdcusdt_symbol()
+    symbol = symbol or find_usdcusdt_symbol()
     last = ticker_price(symbol)
     book = book_ticker(symbol)
     mid = (book["bidPrice"] + book["askPrice"]) / 2.0
@@ -145,6 +268,72 @@ def spot_quote_usdc_from_usd(usd_amount: float) -> dict:
     }
 
 
+def depth(symbol: str, limit: int = ROUTE_DEPTH_LIMIT) -> dict:
+    data = _public_get("/api/v3/depth", {"symbol": symbol, "limit": limit})
+    return {
+        "bids": [(float(p), float(q)) for p, q in data.get("bids", [])],
+        "asks": [(float(p), float(q)) for p, q in data.get("asks", [])],
+    }
+
+
+def klines(
+    symbol: str,
+    interval: str = "1m",
+    start_ms: int | None = None,
+    limit: int = 1000,
+) -> list[list]:
+    """Raw kline rows, oldest first. Backfill priority: shed before quotes."""
+    params = {"symbol": symbol, "interval": interval, "limit": limit}
+    if start_ms is not None:
+        params["startTime"] = start_ms
+    return _public_get("/api/v3/klines", params, priority=BACKFILL)
+
+
+def _route_symbols() -> list[str]:
+    # only stable/USDT books: buying base with USDT keeps prices comparable
+    if BINANCE_SYMBOL:
+        return [BINANCE_SYMBOL]
+    return [s for s in STABLE_CANDIDATES if s.endswith("USDT")]
+
+
+def plan_best_execution(quote_amount: float) -> dict:
+    """
+    Fetch the ask side of every candidate book concurrently and split
+    `quote_amount` USDT across them (see app.core.routing). Books that fail to
+    load are skipped; with none left the plan falls back to the single pair
+    from `find_usdcusdt_symbol`, without estimates.
+    """
+    symbols = _route_symbols()
+
+    def _asks(sym: str):
+        try:
+            return sym, depth(sym)["asks"]
+        except RateLimited:
+            raise
+        except Exception as e:
+            _dbg(f"depth failed for {sym}: {e}")
+            return sym, []
+
+    with ThreadPoolExecutor(max_workers=len(symbols)) as pool:
+        books = dict(pool.map(tracing.bind(_asks), symbols))
+
+    routes = plan_routes(
+        books, quote_amount, ROUTE_MIN_CHILD_USDT, ROUTE_MAX_CHILD_USDT
+    )
+    if not routes:
+        return {
+            "quote_qty": quote_amount,
+            "routes": [{"symbol": find_usdcusdt_symbol(), "quote_qty": quote_amount}],
+            "books": sorted(s for s, a in books.items() if a),
+        }
+    return {
+        "quote_qty": quote_amount,
+        "routes": [r.as_dict() for r in routes],
+        "books": sorted(s for s, a in books.items() if a),
+        "est_slippage_bps": blended_slippage_bps(routes),
+    }
+
+
 # ── Signed endpoints ───────────────────────────────────────────────────────
 def _signed_params(params: dict) -> dict:
     q = urlencode({k: str(v) for k, v in params.items()}, doseq=True)
@@ -152,14 +341,10 @@ def _signed_params(params: dict) -> dict:
     return {**{k: str(v) for k, v in params.items()}, "signature": sig}
 
 
-def _signed_request(method: str, path: str, params: dict):
-    if not BINANCE_API_KEY or not BINANCE_API_SECRET:
+def _signed_request(method: str, path: str, params: dict, priority: int = ACCOUNT):
+    if not (BINANCE_API_KEY and BINANCE_API_SECRET) and not SIMULATION:
         raise RuntimeError("Missing BINANCE_API_KEY or BINANCE_API_SECRET")
-    url = f"{BINANCE_BASE}{path}"
-    sp = _signed_params(params)
-    _dbg(f"{method} {url} params={sp}")
-    r = requests.request(method, url, headers=HEADERS_AUTH, params=sp, timeout=30)
-    _dbg(f"-> {r.status_code} body[:120]={r.text[:120]!r}")
+    r = _http(method, path, _signed_params(params), HEADERS_AUTH, 30, priority)
     return _json_or_raise(r, f"{method} {path}")
 
 
@@ -174,24 +359,126 @@ def account() -> dict:
     )
 
 
-def spot_market_buy_usdc_with_usdt(quote_amount: float) -> dict:
+def spot_market_buy_usdc_with_usdt(
+    quote_amount: float,
+    symbol: str | None = None,
+    client_order_id: str | None = None,
+) -> dict:
     """
     Spend `quote_amount` of quote asset (USDT) to buy base (e.g., USDC).
     Returns Binance order JSON (MARKET order).
+    `client_order_id` makes the order findable again via `get_order`.
     """
-    symbol = find_usdcusdt_symbol()
-    return _signed_request(
-        "POST",
-        "/api/v3/order",
-        {
-            "symbol": symbol,
-            "side": "BUY",
-            "type": "MARKET",
-            "quoteOrderQty": f"{quote_amount}",
-            "timestamp": int(time.time() * 1000),
-            "recvWindow": 10000,
-        },
-    )
+    symbol = symbol or find_usdcusdt_symbol()
+    params = {
+        "symbol": symbol,
+        "side": "BUY",
+        "type": "MARKET",
+        "quoteOrderQty": f"{quote_amount}",
+        "timestamp": int(time.time() * 1000),
+        "recvWindow": 10000,
+    }
+    if client_order_id:
+        params["newClientOrderId"] = client_order_id
+    return _signed_request("POST", "/api/v3/order", params, priority=ORDER)
+
+
+def get_order(symbol: str, client_order_id: str) -> dict | None:
+    """Look up an order by its client order id; None if Binance does not know it."""
+    try:
+        return _signed_request(
+            "GET",
+            "/api/v3/order",
+            {
+                "symbol": symbol,
+                "origClientOrderId": client_order_id,
+                "timestamp": int(time.time() * 1000),
+                "recvWindow": 10000,
+            },
+        )
+    except RuntimeError as e:
+        if "-2013" in str(e):  # Order does not exist
+            return None
+        raise
+
+
+CLIENT_ORDER_ID_MAX = 36  # Binance rejects a longer newClientOrderId
+
+
+def child_order_id(client_order_id: str, n: int) -> str:
+    """`<client_order_id>-<n>`, the parent id cut short to fit Binance's limit."""
+    suffix = f"-{n}"
+    return client_order_id[: CLIENT_ORDER_ID_MAX - len(suffix)] + suffix
+
+
+def execute_plan(
+    plan: dict, client_order_id: str | None = None, resume: bool = False
+) -> dict:
+    """
+    Place one MARKET order per child of every route in `plan` and merge them
+    into a single order-shaped dict (summed executedQty / cummulativeQuoteQty,
+    all fills) with the individual orders under "children".
+    Child client ids come from `child_order_id`; with `resume`, children that
+    Binance already filled are looked up instead of placed again.
+    If a child fails after others have filled, the rest are not placed and
+    the filled ones come back as PARTIALLY_FILLED with the failure under
+    "error": that USDT is spent, so it still has to be delivered.
+    """
+    legs = [
+        (route["symbol"], size)
+        for route in plan["routes"]
+        for size in child_sizes(route["quote_qty"], route.get("children", 1))
+    ]
+    children: list[dict] = []
+    error = None
+    for n, (symbol, size) in enumerate(legs):
+        coid = child_order_id(client_order_id, n) if client_order_id else None
+        try:
+            placed = None
+            if resume and coid:
+                placed = get_order(symbol, coid)
+            if not placed or placed.get("status") != "FILLED":
+                placed = spot_market_buy_usdc_with_usdt(
+                    size, symbol=symbol, client_order_id=coid
+                )
+        except Exception as e:
+            if not children:
+                raise
+            error = f"child {n} of {len(legs)} failed: {e}"
+            break
+        children.append(placed)
+
+    if len(children) == 1 and error is None:
+        return children[0]
+    first = children[0]
+    return {
+        "symbol": first.get("symbol"),
+        "orderId": first.get("orderId"),
+        "clientOrderId": client_order_id or first.get("clientOrderId"),
+        "status": (
+            "FILLED"
+            if error is None and all(c.get("status") == "FILLED" for c in children)
+            else "PARTIALLY_FILLED"
+        ),
+        "transactTime": max(c.get("transactTime") or 0 for c in children),
+        "side": first.get("side"),
+        "type": first.get("type"),
+        "executedQty": f"{sum(float(c.get('executedQty') or 0) for c in children):.8f}",
+        "cummulativeQuoteQty": f"{sum(float(c.get('cummulativeQuoteQty') or 0) for c in children):.8f}",
+        "fills": [f for c in children for f in c.get("fills") or []],
+        "children": [
+            {
+                "symbol": c.get("symbol"),
+                "orderId": c.get("orderId"),
+                "clientOrderId": c.get("clientOrderId"),
+                "executedQty": c.get("executedQty"),
+                "cummulativeQuoteQty": c.get("cummulativeQuoteQty"),
+                "status": c.get("status"),
+            }
+            for c in children
+        ],
+        **({"error": error} if error else {}),
+    }
 
 
 def find_usdcusdt_symbol() -> str:
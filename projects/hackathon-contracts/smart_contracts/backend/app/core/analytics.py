@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from google.api_core.exceptions import AlreadyExists
+from google.cloud import firestore
+
+from app.core.firebase import get_firestore_client
+
+# ─────────────────────────────────────────────────────────────
+# Per-address USDC aggregates
+# ─────────────────────────────────────────────────────────────
+# analytics/{address}:
+#   in / out            μUSDC totals        nIn / nOut   transfer counts
+#   fillUsdt / fillUsdc μ-units bought through the ramp (avg price = ratio)
+#   daily.{YYYY-MM-DD}  {in, out, n}
+#   cp.{address}        {in, out, n}        per counterparty
+#   seeded              True once history before tracking was folded in
+# analytics_applied/{txid}:{address}  marker so each side of a transfer is
+#                     counted exactly once, whether by record_transfer or seed
+#
+# Each confirmed transfer is one marker create + one Increment merge per side;
+# reads come from one document get, cached here for ANALYTICS_CACHE_TTL_S
+# (other workers write too), never from the indexer. Documents are only ever
+# changed by increments, so concurrent writers (the sender path, the chain
+# follower, a seed) never overwrite each other.
+
+AGG = lambda: get_firestore_client().collection("analytics")
+APPLIED = lambda: get_firestore_client().collection("analytics_applied")
+
+ANALYTICS_CACHE_TTL_S = float(os.getenv("ANALYTICS_CACHE_TTL_S", "5"))
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "1024"))
+
+MICRO = 1_000_000
+SEED_BATCH = 400  # markers per write batch, next to the aggregate increment
+
+_lock = threading.Lock()
+_mem: OrderedDict[str, tuple[float, dict]] = OrderedDict()  # address -> (expiry, doc)
+_seeding: set[str] = set()  # addresses with a seed running in this process
+
+
+def _day(ts: Optional[float]) -> str:
+    return datetime.fromtimestamp(ts or time.time(), tz=timezone.utc).strftime(
+        "%Y-%m-%d"
+    )
+
+
+def _side_delta(
+    direction: str,
+    amount: int,
+    counterparty: Optional[str],
+    day: str,
+    fill: Optional[tuple[int, int]],
+) -> dict:
+    """Nested delta for one side of a transfer (plain ints)."""
+    key = "in" if direction == "IN" else "out"
+    delta: dict = {
+        key: amount,
+        "nIn" if key == "in" else "nOut": 1,
+        "daily": {day: {key: amount, "n": 1}},
+    }
+    if counterparty:
+        delta["cp"] = {counterparty: {key: amount, "n": 1}}
+    if fill and key == "in":
+        delta["fillUsdt"], delta["fillUsdc"] = fill
+    return delta
+
+
+def _merge_mem(doc: dict, delta: dict) -> None:
+    for k, v in delta.items():
+        if isinstance(v, dict):
+            _merge_mem(doc.setdefault(k, {}), v)
+        else:
+            doc[k] = doc.get(k, 0) + v
+
+
+def _as_increments(delta: dict) -> dict:
+    return {
+        k: _as_increments(v) if isinstance(v, dict) else firestore.Increment(v)
+        for k, v in delta.items()
+    }
+
+
+def _apply(address: str, delta: dict) -> None:
+    AGG().document(address).set(
+        {**_as_increments(delta), "updatedAt": time.time()}, merge=True
+    )
+    with _lock:
+        hit = _mem.get(address)
+        if hit is not None:
+            _merge_mem(hit[1], delta)
+
+
+def _claim(txid: str, address: str, ts: Optional[float]) -> bool:
+    """True if this side of `txid` was not counted yet (and now is claimed)."""
+    try:
+        APPLIED().document(f"{txid}:{address}").create({"ts": int(ts or time.time())})
+    except AlreadyExists:
+        return False
+    return True
+
+
+def record_transfer(
+    txid: str,
+    sender: str,
+    receiver: str,
+    amount_min_units: int,
+    ts: Optional[float] = None,
+    fill: Optional[tuple[int, int]] = None,
+) -> bool:
+    """
+    Fold one confirmed USDC transfer into both parties' aggregates.
+    `fill` is (μUSDT spent, μUSDC bought) when the transfer delivers a ramp
+    buy. Returns False if `txid` was already counted on both sides.
+    """
+    day = _day(ts)
+    counted = False
+    if _claim(txid, receiver, ts):
+        _apply(receiver, _side_delta("IN", amount_min_units, sender, day, fill))
+        counted = True
+    if sender != receiver and _claim(txid, sender, ts):
+        _apply(sender, _side_delta("OUT", amount_min_units, receiver, day, None))
+        counted = True
+    return counted
+
+
+def load(address: str) -> Optional[dict]:
+    now = time.monotonic()
+    with _lock:
+        hit = _mem.get(address)
+        if hit is not None and hit[0] > now:
+            return hit[1]
+    doc = AGG().document(address).get().to_dict()
+    if doc is not None:
+        with _lock:
+            _mem[address] = (now + ANALYTICS_CACHE_TTL_S, doc)
+            _mem.move_to_end(address)
+            while len(_mem) > ANALYTICS_CACHE_SIZE:
+                _mem.popitem(last=False)
+    return doc
+
+
+def begin_seed(address: str) -> bool:
+    """True if no seed of `address` runs in this process: the caller starts one."""
+    with _lock:
+        if address in _seeding:
+            return False
+        _seeding.add(address)
+        return True
+
+
+def _seed_chunk(address: str, chunk: list[dict]) -> None:
+    markers = {f"{t['txid']}:{address}": t for t in chunk}
+    while True:
+        refs = [APPLIED().document(m) for m in markers]
+        counted = {s.id for s in get_firestore_client().get_all(refs) if s.exists}
+        batch = get_firestore_client().batch()
+        delta: dict = {}
+        for marker, t in markers.items():
+            if marker in counted:
+                continue
+            batch.create(APPLIED().document(marker), {"ts": int(t["ts"] or 0)})
+            direction = "IN" if t["receiver"] == address else "OUT"
+            other = t["sender"] if direction == "IN" else t["receiver"]
+            _merge_mem(
+                delta, _side_delta(direction, t["amount"], other, _day(t["ts"]), None)
+            )
+        if not delta:
+            return
+        batch.set(
+            AGG().document(address),
+            {**_as_increments(delta), "updatedAt": time.time()},
+            merge=True,
+        )
+        try:
+            batch.commit()
+            return
+        except AlreadyExists:
+            continue  # record_transfer counted one meanwhile: read again
+
+
+def seed(address: str, transfers: Iterable[dict]) -> Optional[dict]:
+    """
+    One-off, off the request path (see `begin_seed`): fold the transfer
+    history ({txid, sender, receiver, amount, ts}) of an address that
+    predates tracking into its aggregate. Transfers this side already has
+    counted are skipped; the rest goes in SEED_BATCH at a time, each batch
+    creating its markers and merging its increments atomically, so totals
+    recorded meanwhile (ramp fills, transfers the indexer has not caught up
+    with) are kept.
+    """
+    try:
+        transfers = iter(transfers)
+        while chunk := list(itertools.islice(transfers, SEED_BATCH)):
+            _seed_chunk(address, chunk)
+        AGG().document(address).set(
+            {"seeded": True, "updatedAt": time.time()}, merge=True
+        )
+        with _lock:
+            _mem.pop(address, None)
+        return load(address)
+    finally:
+        with _lock:
+            _seeding.discard(address)
+
+
+def summary(doc: dict, top: int = 10) -> dict:
+    """API shape: amounts as 2dp strings, daily series sorted, top counterparties."""
+
+    def amt(v: int) -> str:
+        return f"{(v or 0) / MICRO:.2f}"
+
+    inflow, outflow = doc.get("in", 0), doc.get("out", 0)
+    fill_usdc = doc.get("fillUsdc", 0)
+    cps = sorted(
+        (doc.get("cp") or {}).items(),
+        key=lambda kv: kv[1].get("in", 0) + kv[1].get("out", 0),
+        reverse=True,
+    )[:top]
+    return {
+        "totals": {
+            "inflow": amt(inflow),
+            "outflow": amt(outflow),
+            "net": amt(inflow - outflow),
+            "count_in": doc.get("nIn", 0),
+            "count_out": doc.get("nOut", 0),
+        },
+        "daily": [
+            {
+                "day": day,
+                "in": amt(b.get("in", 0)),
+                "out": amt(b.get("out", 0)),
+                "n": b.get("n", 0),
+            }
+            for day, b in sorted((doc.get("daily") or {}).items())
+        ],
+        "counterparties": [
+            {
+                "address": a,
+                "in": amt(b.get("in", 0)),
+                "out": amt(b.get("out", 0)),
+                "n": b.get("n", 0),
+            }
+            for a, b in cps
+        ],
+        "avg_fill_price": (
+            f"{doc.get('fillUsdt', 0) / fill_usdc:.6f}" if fill_usdc else None
+        ),
+        "updatedAt": doc.get("updatedAt"),
+    }
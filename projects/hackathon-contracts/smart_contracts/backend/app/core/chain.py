@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict, defaultdict, deque
+from pathlib import Path
+from typing import Callable, Optional
+
+from algosdk import encoding as algo_encoding
+
+from app.core.events import bus
+from app.core.notes import NOTE_NS, decode_note
+
+log = logging.getLogger("chain")
+
+# ─────────────────────────────────────────────────────────────
+# Block-streaming chain follower
+# ─────────────────────────────────────────────────────────────
+# Tails algod round by round (status_after_block + block_info) from a
+# persisted checkpoint and keeps only what concerns us:
+#
+#   transfer  axfer of our USDC ASA with a non-zero amount
+#   optin     axfer of 0 to self (and closes, as optout)
+#   registry  app call to the WalletRegistry ("register_user", hash, addr)
+#
+# Every event is appended to .cache/chain/events.jsonl, applied to the
+# in-memory views, handed to subscribers and published on the event bus
+# ("chain" and "chain:<address>"). On start the log is replayed so the views
+# come back without touching the indexer.
+
+CHAIN_DATA_DIR = Path(os.getenv("CHAIN_DATA_DIR", ".cache/chain"))
+CHAIN_START_ROUND = int(os.getenv("CHAIN_START_ROUND", "1"))  # LocalNet: genesis
+CHAIN_HISTORY_PER_ADDR = int(os.getenv("CHAIN_HISTORY_PER_ADDR", "500"))
+CHAIN_LAG_OK = 2  # rounds behind the tip that still count as "synced"
+
+Event = dict
+Subscriber = Callable[[Event], None]
+
+
+def _addr(v) -> Optional[str]:
+    """Block JSON carries addresses as base32; tolerate base64 raw keys too."""
+    if not v:
+        return None
+    if len(v) == 58:
+        return v
+    try:
+        raw = base64.b64decode(v)
+        return algo_encoding.encode_address(raw) if len(raw) == 32 else v
+    except Exception:
+        return v
+
+
+def decode_block(
+    block: dict, txids: list[str], asset_id: int, app_id: Optional[int]
+) -> list[Event]:
+    """Events for our asset / app from one block (top-level txns only)."""
+    rnd = int(block.get("rnd", 0))
+    ts = int(block.get("ts", 0))
+    out: list[Event] = []
+    for i, stxn in enumerate(block.get("txns") or []):
+        txn = stxn.get("txn") or {}
+        base = {
+            "round": rnd,
+            "ts": ts,
+            "txid": txids[i] if i < len(txids) else None,
+            "sender": _addr(txn.get("snd")),
+        }
+        kind = txn.get("type")
+        if kind == "axfer" and int(txn.get("xaid", 0)) == asset_id:
+            receiver = _addr(txn.get("arcv")) or base["sender"]
+            amount = int(txn.get("aamt", 0))
+            if txn.get("aclose"):
+                out.append({**base, "kind": "optout", "asset_id": asset_id})
+            if amount:
+                note = None
+                if txn.get("note"):
+                    note = decode_note(base64.b64decode(txn["note"]))
+                out.append(
+                    {
+                        **base,
+                        "kind": "transfer",
+                        "asset_id": asset_id,
+                        "receiver": receiver,
+                        "amount": amount,
+                        "note": note,
+                    }
+                )
+            elif receiver == base["sender"] and not txn.get("aclose"):
+                out.append({**base, "kind": "optin", "asset_id": asset_id})
+        elif kind == "appl" and app_id and int(txn.get("apid", 0)) == app_id:
+            args = [base64.b64decode(a) for a in txn.get("apaa") or []]
+            if len(args) == 3 and args[0] == b"register_user":
+                out.append(
+                    {
+                        **base,
+                        "kind": "registry",
+                        "app_id": app_id,
+                        "email_hash": args[1].hex(),
+                        "wallet": algo_encoding.encode_address(args[2]),
+                    }
+                )
+    return out
+
+
+class ChainViews:
+    """Materialized state rebuilt from the event stream."""
+
+    def __init__(self, history_per_addr: int = CHAIN_HISTORY_PER_ADDR):
+        self._lock = threading.Lock()
+        self.history: dict[str, deque] = defaultdict(
+            lambda: deque(maxlen=history_per_addr)
+        )
+        self.opted_in: set[tuple[str, int]] = set()
+        self.registry: dict[str, str] = {}  # email sha256 hex -> wallet
+        self.confirmed: OrderedDict[str, int] = OrderedDict()  # txid -> round
+
+    def apply(self, ev: Event) -> None:
+        with self._lock:
+            kind = ev["kind"]
+            if kind == "transfer":
+                self.history[ev["sender"]].append(ev)
+                if ev["receiver"] != ev["sender"]:
+                    self.history[ev["receiver"]].append(ev)
+                self.opted_in.add((ev["receiver"], ev["asset_id"]))
+            elif kind == "optin":
+                self.opted_in.add((ev["sender"], ev["asset_id"]))
+            elif kind == "optout":
+                self.opted_in.discard((ev["sender"], ev["asset_id"]))
+            elif kind == "registry":
+                self.registry[ev["email_hash"]] = ev["wallet"]
+            if ev.get("txid"):
+                self.confirmed[ev["txid"]] = ev["round"]
+                if len(self.confirmed) > 100_000:
+                    self.confirmed.popitem(last=False)
+
+    def transfers(self, address: str, limit: int = 50) -> list[Event]:
+        """Newest first."""
+        with self._lock:
+            items = list(self.history.get(address, ()))
+        return items[::-1][:limit]
+
+    def is_opted_in(self, address: str, asset_id: int) -> bool:
+        with self._lock:
+            return (address, asset_id) in self.opted_in
+
+    def wallet_for(self, email_hash_hex: str) -> Optional[str]:
+        with self._lock:
+            return self.registry.get(email_hash_hex)
+
+    def confirmed_round(self, txid: str) -> Optional[int]:
+        with self._lock:
+            return self.confirmed.get(txid)
+
+
+class ChainFollower:
+    def __init__(
+        self,
+        resolve_asset: Callable[[], int],
+        resolve_app: Callable[[], Optional[int]],
+        algod_factory: Callable[[], object],
+    ):
+        self._resolve_asset = resolve_asset
+        self._resolve_app = resolve_app
+        self._algod_factory = algod_factory
+        self.views = ChainViews()
+        self.round = 0  # last fully processed round
+        self.tip = 0
+        self.log_start_round: Optional[int] = None
+        self.last_error: Optional[str] = None
+        self._log_round = 0  # last round present in the event log
+        self._subs: list[Subscriber] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------------- subscribers ----------------
+    def subscribe(self, fn: Subscriber) -> Callable[[], None]:
+        """`fn(event)` runs on the follower thread for each new event."""
+        self._subs.append(fn)
+        return lambda: self._subs.remove(fn)
+
+    # ---------------- persistence ----------------
+    @property
+    def _log_path(self) -> Path:
+        return CHAIN_DATA_DIR / "events.jsonl"
+
+    @property
+    def _ckpt_path(self) -> Path:
+        return CHAIN_DATA_DIR / "checkpoint.json"
+
+    def _replay(self) -> None:
+        try:
+            ckpt = json.loads(self._ckpt_path.read_text())
+        except (FileNotFoundError, ValueError):
+            ckpt = {}
+        self.log_start_round = ckpt.get("start")
+        n = 0
+        try:
+            with self._log_path.open() as f:
+                for line in f:
+                    try:
+                        ev = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line
+                    self.views.apply(ev)
+                    self._log_round = max(self._log_round, ev["round"])
+                    n += 1
+        except FileNotFoundError:
+            pass
+        self.round = max(int(ckpt.get("round", 0)), self._log_round)
+        if self.log_start_round is None:
+            self.log_start_round = CHAIN_START_ROUND
+        if n:
+            log.info("replayed %s chain events up to round %s", n, self.round)
+
+    def _persist(self, rnd: int, events: list[Event]) -> None:
+        CHAIN_DATA_DIR.mkdir(parents=True, exist_ok=True)
+        if events and rnd > self._log_round:
+            with self._log_path.open("a") as f:
+                for ev in events:
+                    f.write(json.dumps(ev, separators=(",", ":")) + "\n")
+            self._log_round = rnd
+        tmp = self._ckpt_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"round": rnd, "start": self.log_start_round}))
+        os.replace(tmp, self._ckpt_path)
+
+    # ---------------- follow loop ----------------
+    def _process(self, algod, rnd: int, asset_id: int, app_id: Optional[int]) -> None:
+        block = algod.block_info(rnd).get("block") or {}
+        txids = []
+        if block.get("txns"):
+            txids = algod.get_block_txids(rnd).get("blockTxids") or []
+        events = decode_block(block, txids, asset_id, app_id)
+        self._persist(rnd, events)
+        for ev in events:
+            self.views.apply(ev)
+            for fn in list(self._subs):
+                try:
+                    fn(ev)
+                except Exception:
+                    log.exception("chain subscriber failed on %s", ev.get("txid"))
+            bus.publish("chain", ev)
+            for a in {ev.get("sender"), ev.get("receiver")} - {None}:
+                bus.publish(f"chain:{a}", ev)
+        self.round = rnd
+
+    def _run(self) -> None:
+        self._replay()
+        asset_id = app_id = None
+        while not self._stop.is_set():
+            try:
+                algod = self._algod_factory()
+                if asset_id is None:
+                    asset_id = self._resolve_asset()
+                if app_id is None:
+                    app_id = self._resolve_app()  # None until first deploy
+                nxt = max(self.round + 1, self.log_start_round or 1)
+                self.tip = int(algod.status().get("last-round", 0))
+                if nxt > self.tip:
+                    # blocks server-side until round `tip` + 1 exists
+                    self.tip = int(
+                        algod.status_after_block(self.tip).get("last-round", 0)
+                    )
+                while nxt <= self.tip and not self._stop.is_set():
+                    self._process(algod, nxt, asset_id, app_id)
+                    nxt += 1
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                log.warning("chain follower error at round %s: %s", self.round, e)
+                self._stop.wait(5)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="chain-follower", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()  # the thread is a daemon; no join on a long poll
+
+    # ---------------- status ----------------
+    def synced(self) -> bool:
+        return self._thread is not None and self.tip - self.round <= CHAIN_LAG_OK
+
+    def covers_history(self) -> bool:
+        """True when the log starts at genesis and is caught up."""
+        return self.synced() and (self.log_start_round or 0) <= 1
+
+    def stats(self) -> dict:
+        return {
+            "round": self.round,
+            "tip": self.tip,
+            "synced": self.synced(),
+            "log_start_round": self.log_start_round,
+            "subscribers": len(self._subs),
+            "last_error": self.last_error,
+        }
+
+
+def _receipt_confirmed(ev: Event) -> None:
+    note = ev.get("note") or {}
+    if ev["kind"] == "transfer" and note.get("k") == NOTE_NS:
+        from app.core.receipts import mark_confirmed
+
+        mark_confirmed(ev["txid"], ev["round"])
+
+
+def _analytics(ev: Event) -> None:
+    if ev["kind"] != "transfer":
+        return
+    from app.core import analytics
+
+    fill = None
+    note = ev.get("note") or {}
+    if note.get("k") == NOTE_NS and note.get("usdc") and note.get("px"):
+        usdc = round(float(note["usdc"]) * 1_000_000)
+        fill = (round(usdc * float(note["px"])), usdc)
+    analytics.record_transfer(
+        ev["txid"], ev["sender"], ev["receiver"], ev["amount"], ev["ts"], fill
+    )
+
+
+def _build() -> ChainFollower:
+    def algod():
+        from app.algorand import get_algorand_client
+
+        return get_algorand_client().client.algod
+
+    def asset():
+        from app.algorand_usdc import _ensure_usdc_dev
+
+        return _ensure_usdc_dev()
+
+    def app():
+        # read-only: deploying the registry stays with the wallet code
+        from app.core.wallet import SYSDOC
+
+        app_id = (SYSDOC().get().to_dict() or {}).get("appId")
+        return int(app_id) if app_id else None
+
+    f = ChainFollower(asset, app, algod)
+    f.subscribe(_receipt_confirmed)
+    f.subscribe(_analytics)
+    return f
+
+
+follower = _build()
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+from algosdk import encoding as algo_encoding, transaction
+from algosdk.error import TransactionRejectedError
+
+# ─────────────────────────────────────────────────────────────
+# Bulk USDC disbursement
+# ─────────────────────────────────────────────────────────────
+# rows (email|address, amount) -> resolve via WalletRegistry -> opt-in check
+# -> atomic groups of up to 16 transfers from one leased treasury account,
+# fee-pooled on the first txn -> up to DISBURSE_INFLIGHT groups submitted
+# before the oldest is awaited. One result per row, in completion order.
+# A group algod rejected is "failed"; one that was sent but did not confirm
+# within the wait is "unknown" (it may still land before its last valid
+# round): its txids are reported and the chain follower settles the ledger
+# projection if it does.
+
+GROUP_SIZE = 16  # protocol max per atomic group
+DISBURSE_INFLIGHT = int(os.getenv("DISBURSE_INFLIGHT", "8"))
+DISBURSE_MAX_ROWS = int(os.getenv("DISBURSE_MAX_ROWS", "50000"))
+DISBURSE_RESOLVE_WORKERS = int(os.getenv("DISBURSE_RESOLVE_WORKERS", "16"))
+
+_AMOUNT = re.compile(r"^\d+(\.\d{1,6})?$")
+
+CONFIRMED = "confirmed"
+FAILED = "failed"
+UNKNOWN = "unknown"  # submitted, no outcome within the wait
+REJECTED = "rejected"  # never submitted
+
+
+@dataclass
+class Row:
+    n: int  # 1-based input row number
+    recipient: str
+    amount: str
+    address: Optional[str] = None
+    min_units: int = 0
+    error: Optional[str] = None
+
+    def result(self, status: str, **kw) -> dict:
+        out = {
+            "row": self.n,
+            "recipient": self.recipient,
+            "amount": self.amount,
+            "address": self.address,
+            "status": status,
+        }
+        if self.error:
+            out["error"] = self.error
+        out.update(kw)
+        return out
+
+
+# ---------------- parsing ----------------
+def _row_from(n: int, rec: dict) -> Row:
+    recipient = str(
+        rec.get("recipient") or rec.get("email") or rec.get("address") or ""
+    ).strip()
+    amount = str(rec.get("amount") or "").strip()
+    row = Row(n, recipient, amount)
+    if not recipient:
+        row.error = "missing recipient"
+    elif not _AMOUNT.match(amount) or float(amount) <= 0:
+        row.error = "invalid amount"
+    return row
+
+
+async def parse_rows(chunks: AsyncIterator[bytes]) -> list[Row]:
+    """
+    Read CSV (`recipient,amount`, header optional) or NDJSON
+    ({"email"|"address"|"recipient", "amount"}) incrementally, line by line.
+    """
+    rows: list[Row] = []
+    buf = b""
+    fmt: Optional[str] = None
+    header: Optional[list[str]] = None
+
+    def feed(line: bytes) -> None:
+        nonlocal fmt, header
+        text = line.decode("utf-8-sig").strip()
+        if not text:
+            return
+        if fmt is None:
+            fmt = "ndjson" if text.startswith("{") else "csv"
+        if len(rows) >= DISBURSE_MAX_ROWS:
+            raise ValueError(f"more than {DISBURSE_MAX_ROWS} rows")
+        n = len(rows) + 1
+        if fmt == "ndjson":
+            try:
+                rows.append(_row_from(n, json.loads(text)))
+            except ValueError:
+                rows.append(Row(n, "", "", error="invalid json"))
+            return
+        cells = next(csv.reader(io.StringIO(text)))
+        if header is None:
+            header = [c.strip().lower() for c in cells]
+            if "amount" in header:
+                return  # header line
+            header = ["recipient", "amount"]
+        rows.append(_row_from(n, dict(zip(header, cells))))
+
+    async for chunk in chunks:
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            feed(line)
+    feed(buf)
+    return rows
+
+
+# ---------------- resolution ----------------
+def resolve(
+    rows: list[Row],
+    asset_id: int,
+    registry_view: Callable[[str], Optional[str]],
+    registry_read: Callable[[str], Optional[str]],
+    is_opted_in: Callable[[str, int], bool],
+    to_min_units: Callable[[str], int],
+) -> None:
+    """
+    Fill `address` / `min_units` or `error` on every row in place.
+    Emails go to the registry view first; misses are read from the registry
+    boxes concurrently, once per distinct email. Opt-in checks likewise run
+    once per distinct address; one that raises fails its rows with a lookup
+    error rather than "not opted in".
+    """
+    pool = ThreadPoolExecutor(DISBURSE_RESOLVE_WORKERS)
+    misses: set[str] = set()
+    for r in rows:
+        if r.error:
+            continue
+        r.min_units = to_min_units(r.amount)
+        if algo_encoding.is_valid_address(r.recipient):
+            r.address = r.recipient
+        elif "@" in r.recipient:
+            email = r.recipient.lower()
+            h = hashlib.sha256(email.encode()).hexdigest()
+            r.address = registry_view(h)
+            if r.address is None:
+                misses.add(email)
+        else:
+            r.error = "not an email or address"
+
+    if misses:
+        found = dict(zip(misses, pool.map(registry_read, misses)))
+        for r in rows:
+            if not r.error and r.address is None:
+                r.address = found.get(r.recipient.lower())
+                if r.address is None:
+                    r.error = "no registered wallet"
+
+    def check(address: str):
+        try:
+            return is_opted_in(address, asset_id)
+        except Exception as e:
+            return e
+
+    pending = [r for r in rows if not r.error]
+    addrs = {r.address for r in pending}
+    opted = dict(zip(addrs, pool.map(check, addrs)))
+    pool.shutdown()
+    for r in pending:
+        ok = opted[r.address]
+        if isinstance(ok, Exception):
+            r.error = f"opt-in lookup failed: {ok}"
+        elif not ok:
+            r.error = "recipient not opted in to USDC"
+
+
+# ---------------- submission ----------------
+def run_groups(
+    rows: list[Row],
+    algod,
+    asset_id: int,
+    sender: str,
+    sender_sk: bytes,
+    build_params: Callable[[], transaction.SuggestedParams],
+    finish_group: Callable[[list[transaction.Transaction]], None],
+    on_submitted: Callable[[str, Row], None] = lambda txid, row: None,
+    on_confirmed: Callable[[str, int, Row], None] = lambda txid, rnd, row: None,
+) -> Iterator[dict]:
+    """Submit `rows` (all resolved) in pipelined atomic groups; yield results."""
+    inflight: deque = deque()  # (rows, txids)
+
+    def settle(batch: list[Row], txids: list[str]) -> Iterator[dict]:
+        try:
+            info = transaction.wait_for_confirmation(algod, txids[0], 10)
+            rnd = int(info.get("confirmed-round", 0))
+        except Exception as e:
+            status = FAILED if isinstance(e, TransactionRejectedError) else UNKNOWN
+            for r, txid in zip(batch, txids):
+                r.error = f"confirmation failed: {e}"
+                yield r.result(status, txid=txid)
+            return
+        for r, txid in zip(batch, txids):
+            on_confirmed(txid, rnd, r)
+            yield r.result(CONFIRMED, txid=txid, round=rnd)
+
+    for start in range(0, len(rows), GROUP_SIZE):
+        batch = rows[start : start + GROUP_SIZE]
+        sp = build_params()
+        txns = [
+            transaction.AssetTransferTxn(
+                sender=sender,
+                sp=sp,
+                receiver=r.address,
+                amt=r.min_units,
+                index=asset_id,
+            )
+            for r in batch
+        ]
+        finish_group(txns)
+        if len(txns) > 1:
+            transaction.assign_group_id(txns)
+        signed = [t.sign(sender_sk) for t in txns]
+        txids = [t.get_txid() for t in txns]
+        try:
+            algod.send_transactions(signed)
+        except Exception as e:
+            for r in batch:
+                r.error = f"submit failed: {e}"
+                yield r.result(FAILED)
+            continue
+        for r, txid in zip(batch, txids):
+            on_submitted(txid, r)
+        inflight.append((batch, txids))
+        if len(inflight) >= DISBURSE_INFLIGHT:
+            yield from settle(*inflight.popleft())
+
+    while inflight:
+        yield from settle(*inflight.popleft())
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from typing import Any, AsyncIterator, Optional
+
+# ─────────────────────────────────────────────────────────────
+# In-process event bus
+# ─────────────────────────────────────────────────────────────
+# Topics are plain strings ("job:<id>", "user:<email>", "chain:<address>"). Publishing is thread-safe and
+# never blocks: each subscriber owns a bounded asyncio.Queue on its event
+# loop and the oldest event is dropped if a slow consumer falls behind.
+
+QUEUE_SIZE = 256
+
+
+class Subscription:
+    def __init__(
+        self, bus: "EventBus", topics: tuple[str, ...], loop: asyncio.AbstractEventLoop
+    ):
+        self.bus = bus
+        self.topics = topics
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def _offer(self, event: Any) -> None:
+        # runs on self.loop
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Any:
+        if timeout is None:
+            return await self.queue.get()
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self) -> None:
+        self.bus._unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class EventBus:
+    def __init__(self):
+        self._subs: dict[str, list[Subscription]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def subscribe(self, *topics: str) -> Subscription:
+        """
+        One queue for all of `topics` (events arrive in publish order).
+        Must be called from a running event loop.
+        """
+        sub = Subscription(self, topics, asyncio.get_running_loop())
+        with self._lock:
+            for topic in topics:
+                self._subs[topic].append(sub)
+        return sub
+
+    def _unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            for topic in sub.topics:
+                subs = self._subs.get(topic)
+                if subs and sub in subs:
+                    subs.remove(sub)
+                    if not subs:
+                        del self._subs[topic]
+
+    def publish(self, topic: str, event: Any) -> int:
+        """Deliver `event` to every subscriber of `topic`; safe from any thread."""
+        with self._lock:
+            subs = list(self._subs.get(topic, ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub._offer, event)
+            except RuntimeError:
+                self._unsubscribe(sub)  # loop closed
+        return len(subs)
+
+    def subscriber_count(self, topic: Optional[str] = None) -> int:
+        with self._lock:
+            if topic is not None:
+                return len(self._subs.get(topic, ()))
+            return sum(len(v) for v in self._subs.values())
+
+
+bus = EventBus()
+
+
+def user_topic(email: str) -> str:
+    """Per-user push channel (job and payout updates)."""
+    return f"user:{email.lower().strip()}"
+
+
+def sse_format(event: str, data: Any, id: Optional[str] = None) -> str:
+    lines = []
+    if id is not None:
+        lines.append(f"id: {id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'), default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def sse_keepalive(
+    sub: Subscription, interval: float = 15.0
+) -> AsyncIterator[Optional[Any]]:
+    """Yield events from `sub`, or None every `interval` seconds of silence."""
+    while True:
+        try:
+            yield await sub.get(timeout=interval)
+        except asyncio.TimeoutError:
+            yield None
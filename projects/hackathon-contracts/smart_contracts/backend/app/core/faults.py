@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import functools
+import math
+import os
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from fnmatch import fnmatchcase
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+from app.core import metrics, tracing
+
+# ─────────────────────────────────────────────────────────────
+# Fault and latency injection at the upstream boundary
+# ─────────────────────────────────────────────────────────────
+# One rule per (upstream, op glob). For each upstream call, the most specific
+# matching rule (an explicit op glob before "*") decides, independently:
+#   latency    with probability latency_rate, sleep a draw from the rule's
+#              distribution (fixed / uniform / normal / lognormal / pareto)
+#   error      with probability error_rate, raise what that client raises
+#              when the upstream fails (AlgodHTTPError 503, ServiceUnavailable,
+#              requests ConnectionError ...)
+#   blackhole  with probability blackhole_rate, hang for the call's timeout
+#              (capped at blackhole_s), then raise that client's timeout
+# The sleep happens on the calling thread, so it holds a threadpool slot
+# exactly like a slow upstream would.
+#
+# Hooks sit inside the metrics instrumentation, so injected delay and errors
+# show up in upstream_request_seconds / upstream_errors_total:
+#   binance   binance._http             paypal   utils.paypal
+#   algod / indexer / kmd   algosdk *_request methods (patched once)
+#   firestore DocumentReference / Query / WriteBatch methods (patched once)
+#
+# Off unless FAULTS_ENABLED=1. Rules expire after ttl_s so a forgotten
+# experiment cannot outlive its run; with no rules, a hook is one dict read.
+
+FAULTS_ENABLED = os.getenv("FAULTS_ENABLED", "0").lower() in ("1", "true", "yes")
+FAULTS_DEFAULT_TTL_S = float(os.getenv("FAULTS_DEFAULT_TTL_S", "600"))
+FAULTS_MAX_SLEEP_S = 120.0
+
+UPSTREAMS = ("binance", "paypal", "algod", "indexer", "kmd", "firestore")
+DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "pareto")
+
+FAULTS_INJECTED = metrics.registry.register(
+    metrics.Counter(
+        "faults_injected_total",
+        "Injected upstream faults",
+        ("upstream", "kind"),
+    )
+)
+
+
+class FaultsDisabled(RuntimeError):
+    pass
+
+
+@dataclass
+class LatencySpec:
+    """
+    fixed      ms
+    uniform    ms +/- jitter_ms
+    normal     mean ms, stddev jitter_ms (clipped at 0)
+    lognormal  median ms, shape sigma
+    pareto     minimum ms, tail index alpha (lower = heavier tail)
+    """
+
+    dist: str = "fixed"
+    ms: float = 0.0
+    jitter_ms: float = 0.0
+    sigma: float = 1.0
+    alpha: float = 1.5
+
+    def sample(self) -> float:
+        """Seconds."""
+        if self.dist == "uniform":
+            ms = self.ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        elif self.dist == "normal":
+            ms = random.gauss(self.ms, self.jitter_ms)
+        elif self.dist == "lognormal":
+            ms = self.ms * math.exp(random.gauss(0, self.sigma))
+        elif self.dist == "pareto":
+            ms = self.ms * random.paretovariate(self.alpha)
+        else:
+            ms = self.ms
+        return min(max(ms, 0.0) / 1000, FAULTS_MAX_SLEEP_S)
+
+
+@dataclass
+class Fault:
+    upstream: str
+    op: str = "*"  # fnmatch glob over the metrics op label
+    latency: Optional[LatencySpec] = None
+    latency_rate: float = 1.0
+    error_rate: float = 0.0
+    blackhole_rate: float = 0.0
+    blackhole_s: float = 30.0
+    expires_at: float = 0.0
+    injected: dict = field(default_factory=dict)  # kind -> count
+
+    def as_dict(self) -> dict:
+        d = asdict(self)
+        d["ttl_remaining_s"] = max(0, round(self.expires_at - time.time(), 1))
+        return d
+
+
+def _failure(upstream: str, kind: str) -> BaseException:
+    msg = f"injected {kind} ({upstream})"
+    if upstream in ("binance", "paypal"):
+        import requests
+
+        if kind == "blackhole":
+            return requests.exceptions.ReadTimeout(msg)
+        return requests.exceptions.ConnectionError(msg)
+    if upstream == "firestore":
+        from google.api_core import exceptions
+
+        if kind == "blackhole":
+            return exceptions.DeadlineExceeded(msg)
+        return exceptions.ServiceUnavailable(msg)
+    # algosdk: urlopen timeouts surface raw; HTTP failures as *HTTPError
+    if kind == "blackhole":
+        return TimeoutError(msg)
+    from algosdk import error
+
+    cls = {
+        "algod": error.AlgodHTTPError,
+        "indexer": error.IndexerHTTPError,
+        "kmd": error.KMDHTTPError,
+    }[upstream]
+    return cls(msg, 503)
+
+
+class FaultInjector:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rules: dict[str, list[Fault]] = {}  # upstream -> specific first
+
+    # ---------------- configuration ----------------
+    def set(self, fault: Fault, ttl_s: Optional[float] = None) -> Fault:
+        if not FAULTS_ENABLED:
+            raise FaultsDisabled("fault injection is off (FAULTS_ENABLED=1)")
+        if fault.upstream not in UPSTREAMS:
+            raise ValueError(f"unknown upstream {fault.upstream!r}")
+        if fault.latency and fault.latency.dist not in DISTRIBUTIONS:
+            raise ValueError(f"unknown distribution {fault.latency.dist!r}")
+        fault.expires_at = time.time() + (ttl_s or FAULTS_DEFAULT_TTL_S)
+        with self._lock:
+            rules = [r for r in self._rules.get(fault.upstream, []) if r.op != fault.op]
+            rules.append(fault)
+            rules.sort(key=lambda r: r.op == "*")
+            self._rules[fault.upstream] = rules
+        return fault
+
+    def clear(self, upstream: Optional[str] = None, op: Optional[str] = None) -> int:
+        with self._lock:
+            if upstream is None:
+                n = sum(len(r) for r in self._rules.values())
+                self._rules = {}
+                return n
+            rules = self._rules.get(upstream, [])
+            keep = [r for r in rules if op is not None and r.op != op]
+            if keep:
+                self._rules[upstream] = keep
+            else:
+                self._rules.pop(upstream, None)
+            return len(rules) - len(keep)
+
+    def list(self) -> list[dict]:
+        self._expire()
+        with self._lock:
+            return [r.as_dict() for rules in self._rules.values() for r in rules]
+
+    def _expire(self) -> None:
+        now = time.time()
+        with self._lock:
+            for upstream in list(self._rules):
+                live = [r for r in self._rules[upstream] if r.expires_at > now]
+                if live:
+                    self._rules[upstream] = live
+                else:
+                    del self._rules[upstream]
+
+    # ---------------- hook ----------------
+    def _match(self, upstream: str, op: str) -> Optional[Fault]:
+        rules = self._rules.get(upstream)
+        if not rules:
+            return None
+        now = time.time()
+        for r in rules:
+            if r.expires_at <= now:
+                self._expire()
+                return self._match(upstream, op)
+            if r.op == "*" or fnmatchcase(op, r.op):
+                return r
+        return None
+
+    def inject(self, upstream: str, op: str, timeout: Optional[float] = None) -> None:
+        """Call right before the real upstream call; may sleep and/or raise."""
+        if not self._rules:
+            return
+        rule = self._match(upstream, op)
+        if rule is None:
+            return
+        if rule.blackhole_rate and random.random() < rule.blackhole_rate:
+            self._note(rule, "blackhole")
+            time.sleep(min(timeout or rule.blackhole_s, rule.blackhole_s))
+            raise _failure(upstream, "blackhole")
+        if rule.latency and random.random() < rule.latency_rate:
+            self._note(rule, "latency")
+            time.sleep(rule.latency.sample())
+        if rule.error_rate and random.random() < rule.error_rate:
+            self._note(rule, "error")
+            raise _failure(upstream, "error")
+
+    @staticmethod
+    def _note(rule: Fault, kind: str) -> None:
+        rule.injected[kind] = rule.injected.get(kind, 0) + 1
+        FAULTS_INJECTED.inc(rule.upstream, kind)
+        span = tracing.current()
+        if span is not None:
+            span.set(fault=kind)
+
+
+injector = FaultInjector()
+inject = injector.inject
+
+
+# ---------------- client instrumentation ----------------
+# Installed before the metrics wrappers, so metrics (outer) times the fault.
+def _wrap(fn: Callable, upstream: str, op: Callable[..., str]) -> Callable:
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        injector.inject(upstream, op(*args, **kwargs))
+        return fn(*args, **kwargs)
+
+    wrapper.__faults_wrapped__ = True
+    return wrapper
+
+
+def _wrap_iter(fn: Callable, upstream: str, op: str) -> Callable:
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        injector.inject(upstream, op)
+        yield from fn(*args, **kwargs)
+
+    wrapper.__faults_wrapped__ = True
+    return wrapper
+
+
+def _patch(cls, name: str, make: Callable[[Callable], Callable]) -> None:
+    fn = getattr(cls, name, None)
+    if fn is not None and not getattr(fn, "__faults_wrapped__", False):
+        setattr(cls, name, make(fn))
+
+
+_installed = set()
+_install_lock = threading.Lock()
+
+
+def instrument_algosdk() -> None:
+    if not FAULTS_ENABLED or "algosdk" in _installed:
+        return
+    with _install_lock:
+        if "algosdk" in _installed:
+            return
+        from algosdk import kmd
+        from algosdk.v2client import algod, indexer
+
+        for cls, name, upstream in (
+            (algod.AlgodClient, "algod_request", "algod"),
+            (indexer.IndexerClient, "indexer_request", "indexer"),
+            (kmd.KMDClient, "kmd_request", "kmd"),
+        ):
+            _patch(
+                cls,
+                name,
+                lambda fn, u=upstream: _wrap(
+                    fn,
+                    u,
+                    lambda self, method, requrl, *a, **kw: metrics.path_op(
+                        method, requrl
+                    ),
+                ),
+            )
+        _installed.add("algosdk")
+
+
+def instrument_firestore(classes=None) -> None:
+    """
+    `classes`: anything exposing DocumentReference / Query /
+    CollectionReference / WriteBatch (e.g. app.sim.store); Google's by default.
+    """
+    if not FAULTS_ENABLED:
+        return
+    key = getattr(classes, "__name__", "google.cloud.firestore")
+    if key in _installed:
+        return
+    with _install_lock:
+        if key in _installed:
+            return
+        if classes is None:
+            from google.cloud.firestore_v1 import batch, collection, document, query
+
+            classes = SimpleNamespace(
+                DocumentReference=document.DocumentReference,
+                Query=query.Query,
+                CollectionReference=collection.CollectionReference,
+                WriteBatch=batch.WriteBatch,
+            )
+        for name in ("get", "set", "update", "create", "delete"):
+            _patch(
+                classes.DocumentReference,
+                name,
+                lambda fn, n=name: _wrap(fn, "firestore", lambda *a, **kw: f"doc.{n}"),
+            )
+        for cls in (classes.Query, classes.CollectionReference):
+            _patch(
+                cls, "stream", lambda fn: _wrap_iter(fn, "firestore", "query.stream")
+            )
+        _patch(
+            classes.WriteBatch,
+            "commit",
+            lambda fn: _wrap(fn, "firestore", lambda *a, **kw: "batch.commit"),
+        )
+        _installed.add(key)
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional, Sequence
+
+from algosdk import transaction
+
+log = logging.getLogger("fees")
+
+# ─────────────────────────────────────────────────────────────
+# Priority classes
+# ─────────────────────────────────────────────────────────────
+# URGENT      user-facing writes on the request path (mints, opt-ins)
+# NORMAL      registry writes, treasury top-ups
+# BACKGROUND  backfills and batch work that can wait a few rounds
+
+URGENT = "urgent"
+NORMAL = "normal"
+BACKGROUND = "background"
+
+# Which pending-pool fee-per-byte percentile each class has to beat once the
+# pool holds more than a block's worth of transactions.
+_PERCENTILE = {URGENT: 0.9, NORMAL: 0.5, BACKGROUND: 0.0}
+_HEADROOM = {URGENT: 1.1, NORMAL: 1.0, BACKGROUND: 1.0}
+
+FEE_SAMPLE_TTL = float(os.getenv("FEE_SAMPLE_TTL", "2.0"))  # seconds
+FEE_POOL_SAMPLE = int(os.getenv("FEE_POOL_SAMPLE", "100"))  # top pending txns inspected
+FEE_BLOCK_CAPACITY = int(os.getenv("FEE_BLOCK_CAPACITY", "5000"))  # txns per round
+FEE_MAX = int(os.getenv("FEE_MAX_MICROALGOS", "100000"))  # hard cap per txn
+FEE_EWMA_ALPHA = 0.3
+
+DEFAULT_TXN_SIZE = 250  # bytes; signed ASA transfer without note
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(q * len(ordered))))
+    return ordered[idx]
+
+
+class FeeEstimator:
+    """
+    Tracks algod's suggested fee-per-byte and pending-pool pressure and turns
+    them into flat fees per priority class.
+    Samples are cached for FEE_SAMPLE_TTL so a burst of submissions costs one
+    `suggested_params` + one `pending_transactions` call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sp: Optional[transaction.SuggestedParams] = None
+        self._sampled_at = 0.0
+        self._pool_fpb: list[float] = []  # fee-per-byte of top pending txns
+        self.pressure = 0.0  # EWMA of pending / block capacity
+        self.history: deque = deque(maxlen=120)
+
+    # ---------------- sampling ----------------
+    def _sample(self, algod) -> None:
+        sp = algod.suggested_params()
+        fpb: list[float] = []
+        total = 0
+        try:
+            pending = algod.pending_transactions(FEE_POOL_SAMPLE)
+            total = int(pending.get("total-transactions", 0))
+            for stxn in pending.get("top-transactions") or []:
+                txn = stxn.get("txn", {})
+                fee = txn.get("fee", 0)
+                if fee:
+                    fpb.append(fee / DEFAULT_TXN_SIZE)
+        except Exception as e:
+            log.debug("pending pool sample failed: %s", e)
+
+        raw = total / FEE_BLOCK_CAPACITY
+        self.pressure = FEE_EWMA_ALPHA * raw + (1 - FEE_EWMA_ALPHA) * self.pressure
+        self._pool_fpb = fpb
+        self._sp = sp
+        self._sampled_at = time.monotonic()
+        self.history.append(
+            {
+                "ts": time.time(),
+                "pending": total,
+                "feePerByte": sp.fee,
+                "pressure": round(self.pressure, 3),
+            }
+        )
+
+    def _fresh(self, algod) -> transaction.SuggestedParams:
+        with self._lock:
+            if self._sp is None or time.monotonic() - self._sampled_at > FEE_SAMPLE_TTL:
+                self._sample(algod)
+            return self._sp
+
+    # ---------------- public API ----------------
+    def suggested_params(self, algod) -> transaction.SuggestedParams:
+        """
+        A flat-fee copy of the cached suggested params (fee = min fee).
+        Call `apply` / `apply_group` once the transaction is built.
+        """
+        base = self._fresh(algod)
+        sp = transaction.SuggestedParams(
+            fee=base.min_fee,
+            first=base.first,
+            last=base.last,
+            gh=base.gh,
+            gen=base.gen,
+            flat_fee=True,
+            consensus_version=base.consensus_version,
+            min_fee=base.min_fee,
+        )
+        return sp
+
+    def fee_for(
+        self, algod, priority: str = NORMAL, size: int = DEFAULT_TXN_SIZE
+    ) -> int:
+        """Flat fee in μAlgos for one transaction of `size` bytes."""
+        sp = self._fresh(algod)
+        per_byte = float(sp.fee or 0)
+        if self.pressure >= 1.0 and self._pool_fpb:
+            pool = _percentile(self._pool_fpb, _PERCENTILE.get(priority, 0.5))
+            per_byte = max(per_byte, pool * _HEADROOM.get(priority, 1.0))
+        fee = max(int(sp.min_fee), int(per_byte * size) + (1 if per_byte else 0))
+        return min(fee, FEE_MAX)
+
+    def apply(self, algod, txn: transaction.Transaction, priority: str = NORMAL):
+        txn.fee = self.fee_for(algod, priority, txn.estimate_size())
+        return txn
+
+    def apply_group(
+        self,
+        algod,
+        txns: Sequence[transaction.Transaction],
+        priority: str = NORMAL,
+        payer: int = 0,
+    ):
+        """
+        Fee pooling: txns[payer] carries the whole group's fee, every other
+        transaction in the group pays zero.
+        """
+        total = sum(self.fee_for(algod, priority, t.estimate_size()) for t in txns)
+        for i, t in enumerate(txns):
+            t.fee = total if i == payer else 0
+        return txns
+
+    def snapshot(self) -> dict:
+        return {
+            "pressure": round(self.pressure, 3),
+            "samples": list(self.history)[-10:],
+        }
+
+
+_estimator = FeeEstimator()
+
+
+def get_fee_estimator() -> FeeEstimator:
+    return _estimator
+
+
+def suggested_params(algod) -> transaction.SuggestedParams:
+    return _estimator.suggested_params(algod)
+
+
+def apply_fee(algod, txn: transaction.Transaction, priority: str = NORMAL):
+    return _estimator.apply(algod, txn, priority)
+
+
+def apply_group_fee(algod, txns, priority: str = NORMAL, payer: int = 0):
+    return _estimator.apply_group(algod, txns, priority, payer)
+
+
+def fee_for(algod, priority: str = NORMAL, size: int = DEFAULT_TXN_SIZE) -> int:
+    return _estimator.fee_for(algod, priority, size)
@@ -14,6 +14,11 @@ def init_firebase_admin():
       - FIREBASE_PROJECT_ID
       - GOOGLE_APPLICATION_CREDENTIALS pointing to service account JSON (firebase-key.json)
     """
+    from app.sim import SIMULATION
+
+    if SIMULATION:
+        return None  # no Admin app: the document store is in memory
+
     import firebase_admin
     from firebase_admin import credentials
 
@@ -35,8 +40,22 @@ def get_firestore_client():
     """
     Lazy Firestore client. Ensures Admin is initialized.
     """
+    from app import sim
+
+    from app.core import faults, metrics
+
+    if sim.SIMULATION:
+        from app.sim import store
+
+        faults.instrument_firestore(store)
+        return sim.install().store
+
     init_firebase_admin()
     from google.cloud import firestore
 
+    # faults first: the metrics wrapper (outer) then times injected faults
+    faults.instrument_firestore()
+    metrics.instrument_firestore()
+
     project_id = os.getenv("FIREBASE_PROJECT_ID")
     return firestore.Client(project=project_id)
@@ -0,0 +1,544 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Iterator, Optional
+
+from algosdk import transaction
+from google.api_core.exceptions import AlreadyExists
+from google.cloud import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from app.core.firebase import get_firestore_client
+
+log = logging.getLogger("internal_ledger")
+
+# ─────────────────────────────────────────────────────────────
+# Internal (off-chain) double-entry ledger with net settlement
+# ─────────────────────────────────────────────────────────────
+# journal/{id}: {id, ts, memo, amount,
+#                lines: [{address, email, amount: -x}, {address, email, +x}],
+#                claim: <settlement id> | None, settled: <settlement id> | None}
+# internal_positions/{address}: {position}   sum of the unsettled lines
+# settlements/{id}: {id, ts, owner, status, entries, gross, transfers, txids,
+#                    failed, round,
+#                    sent: {txid: {from, to, amount, first, last, state}}}
+# leases/internal-settlement: {owner, expires}
+#
+# A user-to-user transfer is one journal entry whose lines sum to zero; it is
+# final for both users immediately. The entry and both position docs are
+# written in one Firestore transaction that re-reads the sender's position,
+# so concurrent transfers on any number of workers cannot overdraw:
+# spendable = on-chain available + position.
+#
+# Every SETTLE_INTERVAL_S the worker holding the settlement lease claims the
+# unclaimed unsettled entries (one transaction, which also creates the run
+# record), nets them per address and puts only the net deltas on chain
+# (debtors pay creditors, greedy largest-first) in atomic groups of 16. Each
+# group is written to `sent` before it goes out. Each confirmed transfer is
+# booked back as a reversing entry, after which the run's entries are marked
+# settled.
+#
+# A group that was sent but not confirmed within the wait is never re-sent:
+# it stays "unknown" and its entries stay claimed, so no later run nets them
+# again, until the chain follower sees the txid (its reversal is booked then)
+# or its validity window closes and a lookup by txid decides. A run whose
+# worker died is picked up the same way by the next lease holder.
+
+JOURNAL = lambda: get_firestore_client().collection("journal")
+POSITIONS = lambda: get_firestore_client().collection("internal_positions")
+SETTLEMENTS = lambda: get_firestore_client().collection("settlements")
+LEASE = (
+    lambda: get_firestore_client().collection("leases").document("internal-settlement")
+)
+
+SETTLE_INTERVAL_S = float(os.getenv("SETTLE_INTERVAL_S", "60"))
+SETTLE_LEASE_S = float(os.getenv("SETTLE_LEASE_S", "120"))
+SETTLE_MAX_ENTRIES = 400  # claimed per run: one transaction's worth of writes
+GROUP_SIZE = 16
+
+RUNNING = "running"
+PENDING = "pending"  # transfers sent with no outcome yet
+DONE = "done"
+# states of one transfer under settlements/{id}.sent
+UNKNOWN, CONFIRMED, DEAD = "unknown", "confirmed", "dead"
+
+
+class InsufficientFunds(RuntimeError):
+    pass
+
+
+def net_transfers(positions: dict[str, int]) -> list[tuple[str, str, int]]:
+    """
+    (debtor, creditor, amount) transfers that realise `positions` (which sum
+    to zero). Greedy: the largest debtor pays the largest creditor until one
+    side is exhausted, so at most n-1 transfers for n non-zero addresses.
+    """
+    debtors = sorted(((-v, a) for a, v in positions.items() if v < 0), reverse=True)
+    creditors = sorted(((v, a) for a, v in positions.items() if v > 0), reverse=True)
+    out: list[tuple[str, str, int]] = []
+    i = j = 0
+    debt = [d for d, _ in debtors]
+    cred = [c for c, _ in creditors]
+    while i < len(debtors) and j < len(creditors):
+        amt = min(debt[i], cred[j])
+        out.append((debtors[i][1], creditors[j][1], amt))
+        debt[i] -= amt
+        cred[j] -= amt
+        if debt[i] == 0:
+            i += 1
+        if cred[j] == 0:
+            j += 1
+    return out
+
+
+class InternalLedger:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._lease_until = 0.0  # wall clock, as written to the lease doc
+        self._inflight: dict[str, dict] = {}  # txid -> sent transfer, no outcome
+        self._open: set[str] = set()  # settlement ids not done yet
+        self._settling = False
+        self._unsettled_seen = 0  # at the last claim
+        self._task: Optional[asyncio.Task] = None
+        self.last_settlement: Optional[dict] = None
+
+    # ---------------- state ----------------
+    def position(self, address: str) -> int:
+        doc = POSITIONS().document(address).get().to_dict() or {}
+        return int(doc.get("position", 0))
+
+    # ---------------- transfers ----------------
+    def transfer(
+        self,
+        from_addr: str,
+        from_email: str,
+        to_addr: str,
+        to_email: Optional[str],
+        amount: int,
+        available_onchain: Callable[[str], int],
+        memo: Optional[str] = None,
+    ) -> dict:
+        """
+        Post one balanced entry. The sender's position is read and both
+        positions and the entry written in one transaction, retried on
+        contention, so concurrent transfers cannot overdraw. Raises
+        InsufficientFunds.
+        """
+        if amount <= 0:
+            raise ValueError("amount must be positive")
+        if from_addr == to_addr:
+            raise ValueError("cannot transfer to yourself")
+        entry = {
+            "id": uuid.uuid4().hex,
+            "ts": time.time(),
+            "memo": memo,
+            "amount": amount,
+            "lines": [
+                {"address": from_addr, "email": from_email, "amount": -amount},
+                {"address": to_addr, "email": to_email, "amount": amount},
+            ],
+            "claim": None,
+            "settled": None,
+        }
+        src, dst = POSITIONS().document(from_addr), POSITIONS().document(to_addr)
+
+        @firestore.transactional
+        def post(txn) -> None:
+            have = int((src.get(transaction=txn).to_dict() or {}).get("position", 0))
+            spendable = available_onchain(from_addr) + have
+            if spendable < amount:
+                raise InsufficientFunds(
+                    f"insufficient funds: {spendable} < {amount} min-units"
+                )
+            txn.set(src, {"position": have - amount}, merge=True)
+            txn.set(dst, {"position": firestore.Increment(amount)}, merge=True)
+            txn.create(JOURNAL().document(entry["id"]), entry)
+
+        post(get_firestore_client().transaction())
+        return entry
+
+    # ---------------- lease ----------------
+    def _lead(self) -> bool:
+        """Take or renew the settlement lease; True while this worker holds it."""
+        ref = LEASE()
+
+        @firestore.transactional
+        def claim(txn) -> bool:
+            cur = ref.get(transaction=txn).to_dict() or {}
+            now = time.time()
+            if cur.get("owner") not in (None, self.owner) and cur["expires"] > now:
+                return False
+            txn.set(ref, {"owner": self.owner, "expires": now + SETTLE_LEASE_S})
+            return True
+
+        now = time.time()
+        ok = claim(get_firestore_client().transaction())
+        self._lease_until = now + SETTLE_LEASE_S if ok else 0.0
+        return ok
+
+    def _leading(self) -> bool:
+        return time.time() < self._lease_until
+
+    def _release_lease(self) -> None:
+        ref = LEASE()
+
+        @firestore.transactional
+        def release(txn) -> None:
+            if (ref.get(transaction=txn).to_dict() or {}).get("owner") == self.owner:
+                txn.delete(ref)
+
+        self._lease_until = 0.0
+        release(get_firestore_client().transaction())
+
+    # ---------------- settlement ----------------
+    def _groups(self, transfers: list) -> Iterator[list]:
+        for i in range(0, len(transfers), GROUP_SIZE):
+            yield transfers[i : i + GROUP_SIZE]
+
+    def _claim(self, sid: str) -> list[dict]:
+        """Claim unclaimed unsettled entries for run `sid` and create its record."""
+        unsettled = JOURNAL().where(filter=FieldFilter("settled", "==", None))
+
+        @firestore.transactional
+        def claim(txn) -> list[dict]:
+            entries = [d.to_dict() for d in txn.get(unsettled)]
+            self._unsettled_seen = len(entries)
+            free = [e for e in entries if not e.get("claim")][:SETTLE_MAX_ENTRIES]
+            if free:
+                for e in free:
+                    txn.update(JOURNAL().document(e["id"]), {"claim": sid})
+                txn.set(
+                    SETTLEMENTS().document(sid),
+                    {
+                        "id": sid,
+                        "ts": time.time(),
+                        "owner": self.owner,
+                        "status": RUNNING,
+                        "entries": len(free),
+                        "gross": sum(e["amount"] for e in free),
+                        "sent": {},
+                    },
+                )
+            return free
+
+        return claim(get_firestore_client().transaction())
+
+    def _book(self, sid: str, txid: str, debtor: str, creditor: str, amt: int) -> None:
+        """Reversing entry for one confirmed settlement transfer (claimed by `sid`)."""
+        entry = {
+            "id": txid,
+            "ts": time.time(),
+            "memo": f"settlement {sid}",
+            "kind": "settlement",
+            "amount": amt,
+            "lines": [
+                {"address": debtor, "amount": amt},
+                {"address": creditor, "amount": -amt},
+            ],
+            "claim": sid,
+            "settled": None,
+        }
+        batch = get_firestore_client().batch()
+        batch.create(JOURNAL().document(txid), entry)
+        batch.set(
+            POSITIONS().document(debtor),
+            {"position": firestore.Increment(amt)},
+            merge=True,
+        )
+        batch.set(
+            POSITIONS().document(creditor),
+            {"position": firestore.Increment(-amt)},
+            merge=True,
+        )
+        try:
+            batch.commit()
+        except AlreadyExists:
+            pass  # booked already (the follower and the run both saw it)
+
+    def _finish(self, sid: str, release: bool) -> None:
+        """
+        Close a run. Its originals and their reversals sum to zero per address:
+        retire them all (positions are unchanged). With a transfer that did
+        not go through they do not, so `release` drops the claims instead and
+        the next run nets down to just what is still owed.
+        """
+        ids = [
+            d.id
+            for d in JOURNAL().where(filter=FieldFilter("claim", "==", sid)).stream()
+        ]
+        change = {"claim": None} if release else {"settled": sid}
+        for i in range(0, len(ids), 400):
+            batch = get_firestore_client().batch()
+            for eid in ids[i : i + 400]:
+                batch.update(JOURNAL().document(eid), change)
+            batch.commit()
+        SETTLEMENTS().document(sid).update({"status": DONE})
+        with self._lock:
+            self._open.discard(sid)
+
+    def _resolve(self, txid: str, rnd: Optional[int]) -> None:
+        """Outcome of an in-flight transfer: confirmed in `rnd`, or dead (None)."""
+        with self._lock:
+            t = self._inflight.pop(txid, None)
+            if t is None:
+                return  # not ours, or already resolved
+        sid = t["sid"]
+        if rnd:
+            self._book(sid, txid, t["from"], t["to"], t["amount"])
+        SETTLEMENTS().document(sid).update(
+            {f"sent.{txid}.state": CONFIRMED if rnd else DEAD}
+        )
+        self._close_if_resolved(sid)
+
+    def _close_if_resolved(self, sid: str) -> None:
+        with self._lock:
+            if any(t["sid"] == sid for t in self._inflight.values()):
+                return
+        run = SETTLEMENTS().document(sid).get().to_dict() or {}
+        if run.get("status") != PENDING:
+            return  # still running (it closes itself), or done
+        dead = any(t["state"] == DEAD for t in (run.get("sent") or {}).values())
+        self._finish(sid, release=dead or bool(run.get("aborted")))
+
+    def on_chain_event(self, ev: dict) -> None:
+        """Chain follower subscriber: books in-flight settlement transfers."""
+        txid = ev.get("txid")
+        if ev["kind"] == "transfer" and txid in self._inflight and self._leading():
+            self._resolve(txid, ev["round"])
+
+    def _recover(self) -> None:
+        """Reload runs not done yet, including those of a worker that died."""
+        runs = [
+            d.to_dict()
+            for d in SETTLEMENTS()
+            .where(filter=FieldFilter("status", "in", [RUNNING, PENDING]))
+            .stream()
+        ]
+        inflight: dict[str, dict] = {}
+        for run in runs:
+            if run["status"] == RUNNING:
+                # its worker lost the lease mid-run: written-ahead groups may
+                # or may not have gone out, so they resolve like unknown ones
+                SETTLEMENTS().document(run["id"]).update(
+                    {"status": PENDING, "aborted": True}
+                )
+            for txid, t in (run.get("sent") or {}).items():
+                if t["state"] == UNKNOWN:
+                    inflight[txid] = {**t, "sid": run["id"]}
+        with self._lock:
+            self._inflight = inflight
+            self._open = {run["id"] for run in runs}
+
+    def _expire_inflight(
+        self, algod, landed: Callable[[str, int, int], Optional[int]]
+    ) -> None:
+        """Decide transfers whose validity window closed, by txid lookup."""
+        with self._lock:
+            inflight = dict(self._inflight)
+            open_runs = set(self._open)
+        if inflight:
+            tip = int(algod.status().get("last-round", 0))
+            for txid, t in inflight.items():
+                if tip > t["last"]:
+                    self._resolve(txid, landed(txid, t["first"], t["last"]))
+        for sid in open_runs - {t["sid"] for t in inflight.values()}:
+            self._close_if_resolved(sid)  # resolved before a restart
+
+    def settle(
+        self,
+        algod,
+        asset_id: int,
+        signer_for: Callable[[str], bytes],
+        build_params: Callable[[], transaction.SuggestedParams],
+        finish_txn: Callable[[transaction.Transaction], None],
+        on_confirmed: Callable[[str, int, str, str, int], None],
+        landed: Callable[[str, int, int], Optional[int]],
+    ) -> Optional[dict]:
+        """
+        On the lease holder only: net the unclaimed unsettled entries and push
+        the deltas on chain. Each confirmed transfer is booked as a reversing
+        "settlement" entry, so positions and chain balances move together. A
+        transfer algod rejects is recorded under "failed" and does not hold up
+        the others; one sent but not confirmed in time is left "unknown" (see
+        the header). Entries posted meanwhile wait their turn.
+        """
+        with self._lock:
+            if self._settling:
+                return None
+            self._settling = True
+        try:
+            if not self._lead():
+                return None
+            self._recover()
+            self._expire_inflight(algod, landed)
+            sid = uuid.uuid4().hex
+            entries = self._claim(sid)
+            if not entries:
+                return None
+            with self._lock:
+                self._open.add(sid)
+
+            net: dict[str, int] = {}
+            emails: dict[str, str] = {}
+            for e in entries:
+                for line in e["lines"]:
+                    a = line["address"]
+                    net[a] = net.get(a, 0) + line["amount"]
+                    if line.get("email"):
+                        emails[a] = line["email"]
+            transfers = net_transfers(net)
+
+            failed: list[dict] = []
+            txids: list[str] = []
+            aborted = False
+            rnd = 0
+            queue = list(self._groups(transfers))
+            while queue:
+                if self._lease_until - time.time() < SETTLE_LEASE_S / 2:
+                    if not self._lead():
+                        log.warning("settlement %s: lease lost, stopping", sid)
+                        aborted = True
+                        break
+                group = queue.pop(0)
+                sp = build_params()
+                txns = []
+                for debtor, creditor, amt in group:
+                    t = transaction.AssetTransferTxn(
+                        sender=debtor, sp=sp, receiver=creditor, amt=amt, index=asset_id
+                    )
+                    finish_txn(t)
+                    txns.append(t)
+                if len(txns) > 1:
+                    transaction.assign_group_id(txns)
+                signed = [t.sign(signer_for(emails[t.sender])) for t in txns]
+                gtxids = [t.get_txid() for t in txns]
+                sent = {
+                    txid: {
+                        "from": debtor,
+                        "to": creditor,
+                        "amount": amt,
+                        "first": sp.first,
+                        "last": sp.last,
+                        "state": UNKNOWN,
+                    }
+                    for (debtor, creditor, amt), txid in zip(group, gtxids)
+                }
+                # written ahead: if this worker dies, the next one looks for it
+                SETTLEMENTS().document(sid).update(
+                    {f"sent.{txid}": t for txid, t in sent.items()}
+                )
+                with self._lock:
+                    self._inflight.update(
+                        {txid: {**t, "sid": sid} for txid, t in sent.items()}
+                    )
+                try:
+                    algod.send_transactions(signed)
+                except Exception as e:
+                    for txid in gtxids:
+                        self._resolve(txid, None)
+                    if len(group) > 1:
+                        # one bad transfer (say, a creditor who opted out) sinks
+                        # its atomic group: retry that group's transfers singly
+                        queue[:0] = [[t] for t in group]
+                        continue
+                    debtor, creditor, amt = group[0]
+                    log.warning(
+                        "settlement %s -> %s (%s) rejected: %s",
+                        debtor,
+                        creditor,
+                        amt,
+                        e,
+                    )
+                    failed.append(
+                        {"from": debtor, "to": creditor, "amount": amt, "error": str(e)}
+                    )
+                    continue
+                txids += gtxids
+                try:
+                    info = transaction.wait_for_confirmation(algod, gtxids[0], 10)
+                except Exception as e:
+                    # sent: it may still land, so never re-send it
+                    log.warning("settlement group %s unconfirmed: %s", gtxids[0], e)
+                    continue
+                rnd = int(info.get("confirmed-round", 0))
+                for (debtor, creditor, amt), txid in zip(group, gtxids):
+                    on_confirmed(txid, rnd, debtor, creditor, amt)
+                    self._resolve(txid, rnd)
+
+            with self._lock:
+                unknown = [t for t in self._inflight.values() if t["sid"] == sid]
+            record = {
+                "status": PENDING,
+                "transfers": [
+                    {"from": d, "to": c, "amount": a} for d, c, a in transfers
+                ],
+                "txids": txids,
+                "failed": failed,
+                "round": rnd,
+            }
+            if aborted:
+                record["aborted"] = True
+            SETTLEMENTS().document(sid).update(record)
+            self._close_if_resolved(sid)
+            record = SETTLEMENTS().document(sid).get().to_dict()
+            self.last_settlement = record
+            log.info(
+                "settled %s entries (gross %s) with %s on-chain transfers, "
+                "%s rejected, %s unconfirmed",
+                record["entries"],
+                record["gross"],
+                len(txids) - len(unknown),
+                len(failed),
+                len(unknown),
+            )
+            return record
+        finally:
+            with self._lock:
+                self._settling = False
+
+    # ---------------- lifecycle ----------------
+    async def _loop(self, settle_kwargs: Callable[[], dict]) -> None:
+        while True:
+            await asyncio.sleep(SETTLE_INTERVAL_S)
+            try:
+                await asyncio.to_thread(lambda: self.settle(**settle_kwargs()))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("net settlement failed (will retry): %s", e)
+
+    def start(self, settle_kwargs: Callable[[], dict]) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(
+                self._loop(settle_kwargs), name="net-settlement"
+            )
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._leading():
+            try:  # hand over now rather than after SETTLE_LEASE_S
+                await asyncio.to_thread(self._release_lease)
+            except Exception as e:
+                log.warning("settlement lease release failed: %s", e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "leader": self._leading(),
+                "unsettled_entries": self._unsettled_seen,  # at the last claim
+                "inflight_transfers": len(self._inflight),
+                "last_settlement": self.last_settlement,
+            }
+
+
+internal_ledger = InternalLedger()
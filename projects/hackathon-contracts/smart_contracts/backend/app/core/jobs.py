@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+from google.cloud import firestore
+
+from app.core import tracing
+from app.core.events import bus, user_topic
+from app.core.firebase import get_firestore_client
+
+log = logging.getLogger("jobs")
+
+# ─────────────────────────────────────────────────────────────
+# Persistent background jobs
+# ─────────────────────────────────────────────────────────────
+# jobs/{id}: {id, kind, email, payload, status, checkpoint, history, result,
+#             error, attempts, owner, leaseUntil, createdAt, updatedAt}
+#
+# A fixed number of asyncio workers drain an in-memory queue. Every status
+# change is written to Firestore and published on the event bus topic
+# "job:<id>". A worker runs a job only after claiming it in a transaction
+# (owner + leaseUntil), and a heartbeat renews the leases it holds. Every
+# JOB_LEASE_S the heartbeat also picks up unfinished jobs whose lease ran out
+# (those of a process that died, or all of them at start) and queues them,
+# with their checkpoint so the handler can skip work already done.
+#
+# FAILED is terminal and only for jobs that have not committed anything
+# irreversible yet (`committed`, per runner). A committed job that fails is
+# "retrying" instead: it re-enters from its checkpoint after a backoff, for
+# as long as it takes.
+
+JOBS = lambda: get_firestore_client().collection("jobs")
+
+JOB_LEASE_S = float(os.getenv("JOB_LEASE_S", "60"))
+JOB_RETRY_BASE_S = float(os.getenv("JOB_RETRY_BASE_S", "5"))
+JOB_RETRY_MAX_S = float(os.getenv("JOB_RETRY_MAX_S", "300"))
+
+QUEUED = "queued"
+RUNNING = "running"
+RETRYING = "retrying"
+FAILED = "failed"
+
+Progress = Callable[..., Awaitable[None]]
+Handler = Callable[[dict, Progress], Awaitable[Any]]
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+def job_topic(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+class JobRunner:
+    def __init__(
+        self,
+        kind: str,
+        handler: Handler,
+        workers: int = 4,
+        max_queue: int = 1000,
+        terminal: tuple[str, ...] = ("done",),
+        committed: Callable[[dict], bool] = lambda job: False,
+    ):
+        self.kind = kind
+        self.handler = handler
+        self.workers = workers
+        self.max_queue = max_queue
+        self.terminal = set(terminal) | {FAILED}
+        self.committed = committed  # job -> a failure must be retried
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._retries: set[asyncio.Task] = set()
+        self._jobs: dict[str, dict] = {}  # in-flight + recently finished
+        self._held: set[str] = set()  # leased by this runner, not finished
+
+    # ---------------- lifecycle ----------------
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"{self.kind}-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._tasks.append(
+            asyncio.create_task(self._heartbeat(), name=f"{self.kind}-heartbeat")
+        )
+
+    async def stop(self) -> None:
+        tasks = [*self._tasks, *self._retries]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._retries.clear()
+        try:  # hand our jobs over now rather than after JOB_LEASE_S
+            await asyncio.to_thread(self._release)
+        except Exception as e:
+            log.warning("could not release %s job leases: %s", self.kind, e)
+
+    def _load_unfinished(self) -> list[dict]:
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        q = JOBS().where(filter=FieldFilter("kind", "==", self.kind))
+        q = q.where(filter=FieldFilter("status", "not-in", sorted(self.terminal)))
+        return [d.to_dict() for d in q.stream()]
+
+    # ---------------- leases ----------------
+    def _claim(self, job_id: str) -> Optional[dict]:
+        """Take or renew the job's lease; the stored job, None if leased elsewhere."""
+        ref = JOBS().document(job_id)
+
+        @firestore.transactional
+        def claim(txn) -> Optional[dict]:
+            job = ref.get(transaction=txn).to_dict()
+            now = time.time()
+            if job is None or (
+                job.get("owner") not in (None, self.owner)
+                and (job.get("leaseUntil") or 0) > now
+            ):
+                return None
+            if job.get("status") not in self.terminal:
+                lease = {"owner": self.owner, "leaseUntil": now + JOB_LEASE_S}
+                txn.update(ref, lease)
+                job.update(lease)
+            return job
+
+        return claim(get_firestore_client().transaction())
+
+    def _renew(self) -> list[str]:
+        """Extend the leases still ours; returns the jobs whose lease was lost."""
+        lost: list[str] = []
+        held = sorted(self._held)
+        for i in range(0, len(held), 200):
+            refs = [JOBS().document(job_id) for job_id in held[i : i + 200]]
+
+            @firestore.transactional
+            def renew(txn) -> list[str]:
+                gone = []
+                until = time.time() + JOB_LEASE_S
+                for ref in refs:
+                    if (ref.get(transaction=txn).to_dict() or {}).get(
+                        "owner"
+                    ) != self.owner:
+                        gone.append(ref.id)
+                    else:
+                        txn.update(ref, {"leaseUntil": until})
+                return gone
+
+            lost += renew(get_firestore_client().transaction())
+        return lost
+
+    def _release(self) -> None:
+        held, self._held = sorted(self._held), set()
+        for i in range(0, len(held), 400):
+            batch = get_firestore_client().batch()
+            for job_id in held[i : i + 400]:
+                batch.update(JOBS().document(job_id), {"owner": None, "leaseUntil": 0})
+            batch.commit()
+
+    async def _adopt(self) -> None:
+        """Queue unfinished jobs nobody holds, waiting for room in the queue."""
+        unfinished = await asyncio.to_thread(self._load_unfinished)
+        now = time.time()
+        free = [
+            job
+            for job in unfinished
+            if job["id"] not in self._jobs
+            and (job.get("leaseUntil") or 0) < now
+            and (job["status"] != RETRYING or (job.get("retryAt") or 0) <= now)
+        ]
+        for job in free:
+            self._jobs[job["id"]] = job
+            await self._queue.put(job["id"])
+        if free:
+            log.info("picked up %s unfinished %s jobs", len(free), self.kind)
+
+    async def _heartbeat(self) -> None:
+        last_adopt = None
+        while True:
+            try:
+                for job_id in await asyncio.to_thread(self._renew):
+                    log.warning("lost the lease on %s job %s", self.kind, job_id)
+                    self._held.discard(job_id)
+                if last_adopt is None or time.monotonic() - last_adopt >= JOB_LEASE_S:
+                    last_adopt = time.monotonic()
+                    await self._adopt()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("%s job heartbeat failed: %s", self.kind, e)
+            await asyncio.sleep(JOB_LEASE_S / 3)
+
+    # ---------------- API ----------------
+    async def submit(self, email: str, payload: dict) -> dict:
+        if self._queue is None:
+            raise RuntimeError(f"{self.kind} job runner is not started")
+        if self._queue.full():
+            raise QueueFull(f"{self.kind} queue is full")
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": self.kind,
+            "email": email,
+            "payload": payload,
+            "status": QUEUED,
+            "checkpoint": {},
+            "history": [{"status": QUEUED, "ts": now}],
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "traceId": tracing.current_trace_id(),  # the worker continues it
+            "owner": self.owner,
+            "leaseUntil": now + JOB_LEASE_S,
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        await asyncio.to_thread(JOBS().document(job["id"]).set, job)
+        self._jobs[job["id"]] = job
+        self._held.add(job["id"])
+        self._queue.put_nowait(job["id"])  # room checked above, nothing awaited since
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        snap = await asyncio.to_thread(JOBS().document(job_id).get)
+        data = snap.to_dict()
+        return data if data and data.get("kind") == self.kind else None
+
+    def is_terminal(self, job: dict) -> bool:
+        return job.get("status") in self.terminal
+
+    async def update(self, job_id: str, status: Optional[str] = None, **fields) -> None:
+        """Merge `fields` (and a new status) into the job, persist and publish."""
+        job = self._jobs[job_id]
+        now = time.time()
+        patch: dict[str, Any] = {"updatedAt": now, **fields}
+        if "checkpoint" in fields:
+            job["checkpoint"] = {**job.get("checkpoint", {}), **fields["checkpoint"]}
+            patch["checkpoint"] = job["checkpoint"]
+        if status and status != job.get("status"):
+            job["history"] = [*job.get("history", []), {"status": status, "ts": now}]
+            patch["status"] = status
+            patch["history"] = job["history"]
+        job.update(patch)
+        await asyncio.to_thread(JOBS().document(job_id).set, patch, merge=True)
+        view = public_view(job)
+        bus.publish(job_topic(job_id), view)
+        if job.get("email"):
+            bus.publish(user_topic(job["email"]), {"kind": self.kind, **view})
+
+    # ---------------- worker ----------------
+    def _retry_later(self, job_id: str, delay: float) -> None:
+        async def requeue() -> None:
+            await asyncio.sleep(delay)
+            await self._queue.put(job_id)
+
+        task = asyncio.create_task(requeue(), name=f"{self.kind}-retry-{job_id}")
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _fail(self, job: dict, e: Exception) -> None:
+        job_id = job["id"]
+        detail = str(getattr(e, "detail", None) or e)
+        stage = getattr(e, "stage", None)
+        if not self.committed(job):
+            log.warning("%s job %s failed: %s", self.kind, job_id, detail)
+            await self.update(job_id, status=FAILED, error=detail, failedStage=stage)
+            return
+        attempts = job.get("attempts", 1)
+        delay = min(JOB_RETRY_MAX_S, JOB_RETRY_BASE_S * 2 ** min(attempts - 1, 16))
+        self._retry_later(job_id, delay)  # even if recording this fails
+        log.warning(
+            "%s job %s failed (attempt %s), retrying in %.0fs: %s",
+            self.kind,
+            job_id,
+            attempts,
+            delay,
+            detail,
+        )
+        await self.update(
+            job_id,
+            status=RETRYING,
+            error=detail,
+            failedStage=stage,
+            retryAt=time.time() + delay,
+        )
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = await asyncio.to_thread(self._claim, job_id)
+            except Exception as e:
+                log.warning("could not claim %s job %s: %s", self.kind, job_id, e)
+                self._retry_later(job_id, JOB_RETRY_BASE_S)
+                self._queue.task_done()
+                continue
+            if job is None:  # another worker has it
+                self._jobs.pop(job_id, None)
+                self._held.discard(job_id)
+                self._queue.task_done()
+                continue
+            self._jobs[job_id] = job
+            try:
+                if self.is_terminal(job):
+                    continue
+                self._held.add(job_id)
+                # back to where the checkpoint left it ("bought", ...)
+                status = RUNNING
+                if job["checkpoint"]:
+                    status = next(
+                        h["status"]
+                        for h in reversed(job["history"])
+                        if h["status"] != RETRYING
+                    )
+                await self.update(
+                    job_id,
+                    status=status,
+                    attempts=job.get("attempts", 0) + 1,
+                    error=None,
+                )
+                progress = lambda status=None, **kw: self.update(job_id, status, **kw)
+                with tracing.span(
+                    f"{self.kind}.job",
+                    trace_id=job.get("traceId"),
+                    job_id=job_id,
+                    attempt=job.get("attempts", 0),
+                ):
+                    await self.handler(job, progress)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                try:
+                    await self._fail(job, e)
+                except Exception:
+                    log.exception("could not record failure of job %s", job_id)
+            finally:
+                self._queue.task_done()
+                if self.is_terminal(job):
+                    self._held.discard(job_id)
+                    # keep the finished view around briefly for status polls
+                    asyncio.get_running_loop().call_later(
+                        300, self._jobs.pop, job_id, None
+                    )
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "retrying": len(self._retries),
+            "leased": len(self._held),
+            "tracked": len(self._jobs),
+        }
+
+
+def public_view(job: dict) -> dict:
+    return {
+        "job_id": job["id"],
+        "status": job.get("status"),
+        "history": job.get("history", []),
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "timings": job.get("timings"),
+        "updatedAt": job.get("updatedAt"),
+    }
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from algosdk.error import AlgodHTTPError
+
+from app.core.firebase import get_firestore_client
+
+log = logging.getLogger("ledger")
+
+# ─────────────────────────────────────────────────────────────
+# USDC ledger projection
+# ─────────────────────────────────────────────────────────────
+# ledger/{address}: {balance, nIn, nOut, round, reconciledAt, updatedAt}
+#                                                      (all amounts μUSDC)
+#
+# `submitted` moves an amount into pendingOut/pendingIn as soon as a transfer
+# is sent; `confirmed` (from the sender path or the chain follower, whichever
+# comes first) settles it into the balances. Pending amounts live in memory
+# only, next to the txids that clear them: a restarted process starts with
+# none, and reconciliation picks up whatever landed meanwhile. `round` is the algod round of the
+# last reconciliation, so a confirmation at or below it - already included in
+# the reconciled balance - only clears the pending amounts.
+# Changes are applied in memory and flushed to Firestore in the background.
+
+LEDGER = lambda: get_firestore_client().collection("ledger")
+
+LEDGER_FLUSH_S = float(os.getenv("LEDGER_FLUSH_S", "2"))
+LEDGER_RECONCILE_S = float(os.getenv("LEDGER_RECONCILE_S", "300"))
+LEDGER_PENDING_TTL = float(os.getenv("LEDGER_PENDING_TTL", "120"))
+
+_FIELDS = ("balance", "pendingIn", "pendingOut", "nIn", "nOut", "round")
+_VOLATILE = ("pendingIn", "pendingOut")  # not persisted
+
+
+def _blank() -> dict:
+    return {k: 0 for k in _FIELDS} | {"reconciledAt": None}
+
+
+class Ledger:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._state: dict[str, dict] = {}
+        self._pending: dict[str, tuple] = {}  # txid -> (sender, receiver, amt, ts)
+        self._settled: OrderedDict[str, None] = OrderedDict()
+        self._dirty: set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.drift_corrections = 0
+
+    # ---------------- state ----------------
+    def _get(self, address: str) -> dict:
+        # caller holds the lock
+        st = self._state.get(address)
+        if st is None:
+            doc = None
+            try:
+                doc = LEDGER().document(address).get().to_dict()
+            except Exception as e:
+                log.warning("ledger load for %s failed: %s", address, e)
+            doc = {k: v for k, v in (doc or {}).items() if k not in _VOLATILE}
+            st = _blank() | doc
+            self._state[address] = st
+        return st
+
+    def _touch(self, *addresses: str) -> None:
+        self._dirty.update(addresses)
+
+    # ---------------- events ----------------
+    def submitted(self, txid: str, sender: str, receiver: str, amount: int) -> None:
+        with self._lock:
+            if txid in self._pending or txid in self._settled:
+                return
+            self._pending[txid] = (sender, receiver, amount, time.time())
+            self._get(sender)["pendingOut"] += amount
+            self._get(receiver)["pendingIn"] += amount
+            self._touch(sender, receiver)
+
+    def confirmed(
+        self,
+        txid: str,
+        rnd: int,
+        sender: Optional[str] = None,
+        receiver: Optional[str] = None,
+        amount: Optional[int] = None,
+    ) -> bool:
+        """
+        Settle `txid`. Parties/amount may be omitted if it was `submitted`
+        here. Returns False if already settled or unknown.
+        """
+        with self._lock:
+            if txid in self._settled:
+                return False
+            pending = self._pending.pop(txid, None)
+            if pending:
+                sender, receiver, amount, _ = pending
+                self._get(sender)["pendingOut"] -= amount
+                self._get(receiver)["pendingIn"] -= amount
+            if sender is None or receiver is None or amount is None:
+                return False
+            self._settled[txid] = None
+            if len(self._settled) > 100_000:
+                self._settled.popitem(last=False)
+            for addr, sign, count in ((sender, -1, "nOut"), (receiver, 1, "nIn")):
+                st = self._get(addr)
+                if rnd > st["round"] or not st["reconciledAt"]:
+                    st["balance"] += sign * amount
+                st[count] += 1
+            self._touch(sender, receiver)
+            return True
+
+    def on_chain_event(self, ev: dict) -> None:
+        if ev["kind"] == "transfer" and ev.get("txid"):
+            self.confirmed(
+                ev["txid"], ev["round"], ev["sender"], ev["receiver"], ev["amount"]
+            )
+
+    # ---------------- reads ----------------
+    def balance(self, address: str) -> dict:
+        with self._lock:
+            st = dict(self._get(address))
+        return {
+            "address": address,
+            "balance": st["balance"],
+            "pending_in": st["pendingIn"],
+            "pending_out": st["pendingOut"],
+            "available": st["balance"] - st["pendingOut"],
+            "count_in": st["nIn"],
+            "count_out": st["nOut"],
+            "round": st["round"],
+            "reconciled_at": st["reconciledAt"],
+        }
+
+    def is_reconciled(self, address: str) -> bool:
+        with self._lock:
+            return bool(self._get(address)["reconciledAt"])
+
+    # ---------------- reconciliation ----------------
+    def reconcile(self, address: str, algod, asset_id: int) -> None:
+        """
+        Overwrite `balance` with algod's holding as of algod's round; later
+        confirmations still apply on top, earlier ones are already included.
+        Only a 404 (not opted in) reads as zero; any other algod error is
+        raised and the projection is left as it was. Pending amounts of this
+        address older than LEDGER_PENDING_TTL are dropped: the chain balance
+        now includes them if they landed.
+        """
+        try:
+            info = algod.account_asset_info(address, asset_id)
+            amount = int((info.get("asset-holding") or {}).get("amount", 0))
+        except AlgodHTTPError as e:
+            if e.code != 404:
+                raise
+            amount = 0  # not opted in
+            info = {"round": int(algod.status().get("last-round", 0))}
+        at_round = int(info.get("round", 0))
+        with self._lock:
+            st = self._get(address)
+            if st["reconciledAt"] and st["balance"] != amount:
+                self.drift_corrections += 1
+                log.warning(
+                    "ledger drift for %s: %s -> %s", address, st["balance"], amount
+                )
+            st["balance"] = amount
+            st["round"] = max(st["round"], at_round)
+            st["reconciledAt"] = time.time()
+            self._touch(address)
+            self._expire_pending(address)
+
+    def _expire_pending(self, address: Optional[str] = None) -> None:
+        cutoff = time.time() - LEDGER_PENDING_TTL
+        with self._lock:
+            for txid, (s, r, amt, ts) in list(self._pending.items()):
+                if ts < cutoff and address in (None, s, r):
+                    # never saw a confirmation; the next reconcile settles it
+                    del self._pending[txid]
+                    self._get(s)["pendingOut"] -= amt
+                    self._get(r)["pendingIn"] -= amt
+                    self._touch(s, r)
+
+    def flush(self) -> int:
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            docs = {
+                a: {k: v for k, v in self._state[a].items() if k not in _VOLATILE}
+                for a in dirty
+                if a in self._state
+            }
+        if not docs:
+            return 0
+        batch = get_firestore_client().batch()
+        for addr, st in docs.items():
+            batch.set(LEDGER().document(addr), {**st, "updatedAt": time.time()})
+        try:
+            batch.commit()
+        except Exception:
+            with self._lock:
+                self._dirty |= set(docs)
+            raise
+        return len(docs)
+
+    # ---------------- lifecycle ----------------
+    async def _loop(self, algod_factory: Callable, resolve_asset: Callable) -> None:
+        last_reconcile = 0.0
+        while True:
+            try:
+                await asyncio.to_thread(self.flush)
+                if time.monotonic() - last_reconcile >= LEDGER_RECONCILE_S:
+                    last_reconcile = time.monotonic()
+                    await asyncio.to_thread(self._expire_pending)
+                    algod, asset_id = algod_factory(), resolve_asset()
+                    for addr in list(self._state):
+                        try:
+                            await asyncio.to_thread(
+                                self.reconcile, addr, algod, asset_id
+                            )
+                        except Exception as e:  # keep the rest; retried next pass
+                            log.warning("ledger reconcile of %s failed: %s", addr, e)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("ledger maintenance failed: %s", e)
+            await asyncio.sleep(LEDGER_FLUSH_S)
+
+    def start(self, algod_factory: Callable, resolve_asset: Callable) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(
+                self._loop(algod_factory, resolve_asset), name="ledger"
+            )
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await asyncio.to_thread(self.flush)
+        except Exception as e:
+            log.warning("final ledger flush failed: %s", e)
+
+
+ledger = Ledger()
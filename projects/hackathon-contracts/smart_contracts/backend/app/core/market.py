@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Callable, Optional
+
+log = logging.getLogger("market")
+
+# ─────────────────────────────────────────────────────────────
+# Local kline (OHLCV) history
+# ─────────────────────────────────────────────────────────────
+# One columnar store per symbol: six typed arrays (open time + OHLCV) kept in
+# memory and mirrored to .cache/market/<SYMBOL>-<interval>.<gen>.<col>. Chart
+# requests are answered from memory only; a background task backfills once
+# and then appends new candles incrementally.
+#
+# On disk the columns only grow: a save appends the new tail, and rows trimmed
+# off the front are skipped rather than rewritten. <SYMBOL>-<interval>.json
+# ({gen, skip, rows}) says which of those rows are live and is replaced last,
+# so a crash mid-save leaves the previous save readable. Once trimmed rows
+# outnumber live ones, a save compacts into the next generation.
+
+MARKET_DATA_DIR = Path(os.getenv("MARKET_DATA_DIR", ".cache/market"))
+MARKET_INTERVAL = "1m"
+MARKET_BACKFILL_DAYS = float(os.getenv("MARKET_BACKFILL_DAYS", "7"))
+MARKET_RETENTION_DAYS = float(os.getenv("MARKET_RETENTION_DAYS", "30"))
+MARKET_REFRESH_S = float(os.getenv("MARKET_REFRESH_S", "60"))
+MARKET_MAX_POINTS = 2000
+
+STEP_MS = 60_000  # one 1m candle
+FETCH_LIMIT = 1000  # klines per request
+
+_COLUMNS = (
+    ("t", "q"),  # open time, ms
+    ("o", "d"),
+    ("h", "d"),
+    ("l", "d"),
+    ("c", "d"),
+    ("v", "d"),  # base volume
+)
+
+# (start_ms, end_ms, limit) -> raw Binance kline rows
+Fetcher = Callable[[int, Optional[int], int], list]
+
+
+class KlineStore:
+    def __init__(self, symbol: str, interval: str = MARKET_INTERVAL):
+        self.symbol = symbol
+        self.interval = interval
+        self.cols: dict[str, array] = {name: array(code) for name, code in _COLUMNS}
+        self.version = 0  # bumped on every change; keys the series cache
+        self._lock = threading.RLock()
+        self._cache: dict[tuple, dict] = {}
+        self._disk: Optional[dict] = None  # head of the last save / load
+        self._clean = 0  # leading rows in memory that match the disk
+
+    # ---------------- persistence ----------------
+    def _path(self, col: str, gen: int) -> Path:
+        return MARKET_DATA_DIR / f"{self.symbol}-{self.interval}.{gen}.{col}"
+
+    def _head_path(self) -> Path:
+        return MARKET_DATA_DIR / f"{self.symbol}-{self.interval}.json"
+
+    def load(self) -> int:
+        with self._lock:
+            try:
+                head = json.loads(self._head_path().read_text())
+                cols = {}
+                for name, code in _COLUMNS:
+                    arr = array(code)
+                    with self._path(name, head["gen"]).open("rb") as f:
+                        arr.frombytes(f.read(head["rows"] * arr.itemsize))
+                    del arr[: head["skip"]]
+                    cols[name] = arr
+            except FileNotFoundError:
+                return 0
+            except (ValueError, KeyError) as e:
+                log.warning(
+                    "kline store %s is unreadable (%s); discarding", self.symbol, e
+                )
+                return 0
+            if len({len(a) for a in cols.values()}) != 1:
+                log.warning("kline store %s is inconsistent; discarding", self.symbol)
+                return 0
+            self.cols = cols
+            self._disk, self._clean = head, len(cols["t"])
+            self.version += 1
+            return len(self)
+
+    def save(self) -> None:
+        MARKET_DATA_DIR.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            old, n = self._disk, len(self)
+            if old is None or old["skip"] > n:
+                gen = old["gen"] + 1 if old else 0
+                for name, _ in _COLUMNS:
+                    self._path(name, gen).write_bytes(self.cols[name].tobytes())
+                head = {"gen": gen, "skip": 0, "rows": n}
+            else:
+                # rows from the first changed one (the candle that was still
+                # forming) on; never shorter than what the old head covers
+                at = old["skip"] + self._clean
+                for name, _ in _COLUMNS:
+                    col = self.cols[name]
+                    with self._path(name, old["gen"]).open("r+b") as f:
+                        f.seek(at * col.itemsize)
+                        f.write(col[self._clean :].tobytes())
+                head = {**old, "rows": at + n - self._clean}
+            tmp = self._head_path().with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(head))
+            os.replace(tmp, self._head_path())
+            if old is not None and old["gen"] != head["gen"]:
+                for name, _ in _COLUMNS:
+                    self._path(name, old["gen"]).unlink(missing_ok=True)
+            self._disk, self._clean = head, n
+
+    # ---------------- writes ----------------
+    def __len__(self) -> int:
+        return len(self.cols["t"])
+
+    @property
+    def last_open_ms(self) -> Optional[int]:
+        t = self.cols["t"]
+        return t[-1] if t else None
+
+    def extend(self, rows: list) -> int:
+        """
+        Append raw kline rows ([openTime, o, h, l, c, v, ...]) in time order.
+        A row for the last stored minute replaces it (that candle was still
+        forming); older rows are ignored. Returns how many rows were new.
+        """
+        added = 0
+        with self._lock:
+            t = self.cols["t"]
+            for row in rows:
+                ts = int(row[0])
+                vals = (float(row[1]), float(row[2]), float(row[3]), float(row[4]))
+                vol = float(row[5])
+                if t and ts < t[-1]:
+                    continue
+                if t and ts == t[-1]:
+                    for (name, _), v in zip(_COLUMNS[1:], (*vals, vol)):
+                        self.cols[name][-1] = v
+                    self._clean = min(self._clean, len(t) - 1)
+                    continue
+                t.append(ts)
+                for (name, _), v in zip(_COLUMNS[1:], (*vals, vol)):
+                    self.cols[name].append(v)
+                added += 1
+            if rows:
+                self.version += 1
+                self._cache.clear()
+        return added
+
+    def trim(self, keep_from_ms: int) -> int:
+        with self._lock:
+            cut = bisect.bisect_left(self.cols["t"], keep_from_ms)
+            if cut:
+                for name, _ in _COLUMNS:
+                    del self.cols[name][:cut]
+                if self._disk is not None:  # skipped on disk, not rewritten
+                    self._disk = {**self._disk, "skip": self._disk["skip"] + cut}
+                self._clean = max(0, self._clean - cut)
+                self.version += 1
+                self._cache.clear()
+            return cut
+
+    # ---------------- reads ----------------
+    def series(self, start_ms: int, end_ms: int, step_ms: int) -> dict:
+        """
+        OHLCV in [start_ms, end_ms) re-bucketed to `step_ms` (a multiple of
+        one minute). Columnar output, like the store itself. The bounds are
+        widened to whole steps, so requests within the same steps share one
+        cached result.
+        """
+        step_ms = max(STEP_MS, step_ms - step_ms % STEP_MS)
+        start_ms -= start_ms % step_ms
+        end_ms += -end_ms % step_ms
+        key = (start_ms, end_ms, step_ms, self.version)
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                return hit
+            c = self.cols
+            lo = bisect.bisect_left(c["t"], start_ms)
+            hi = bisect.bisect_left(c["t"], end_ms)
+            out: dict[str, list] = {name: [] for name, _ in _COLUMNS}
+            bucket = None
+            for i in range(lo, hi):
+                b = c["t"][i] - c["t"][i] % step_ms
+                if b != bucket:
+                    bucket = b
+                    out["t"].append(b)
+                    out["o"].append(c["o"][i])
+                    out["h"].append(c["h"][i])
+                    out["l"].append(c["l"][i])
+                    out["c"].append(c["c"][i])
+                    out["v"].append(c["v"][i])
+                else:
+                    out["h"][-1] = max(out["h"][-1], c["h"][i])
+                    out["l"][-1] = min(out["l"][-1], c["l"][i])
+                    out["c"][-1] = c["c"][i]
+                    out["v"][-1] += c["v"][i]
+            result = {
+                "symbol": self.symbol,
+                "step_ms": step_ms,
+                "points": len(out["t"]),
+                **out,
+            }
+            if len(self._cache) > 64:
+                self._cache.clear()
+            self._cache[key] = result
+            return result
+
+
+class MarketHistory:
+    """Owns the store for the active symbol and keeps it fresh."""
+
+    def __init__(self, resolve_symbol: Callable[[], str], fetch: Callable[..., list]):
+        self._resolve_symbol = resolve_symbol
+        self._fetch = fetch  # fetch(symbol, start_ms, limit) -> kline rows
+        self.store: Optional[KlineStore] = None
+        self.last_refresh: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_store(self) -> KlineStore:
+        symbol = self._resolve_symbol()
+        if self.store is None or self.store.symbol != symbol:
+            store = KlineStore(symbol)
+            n = store.load()
+            log.info("loaded %s cached %s klines", n, symbol)
+            self.store = store
+        return self.store
+
+    def refresh(self) -> int:
+        """Backfill / catch up to now. Blocking; returns rows appended."""
+        store = self._ensure_store()
+        now_ms = int(time.time() * 1000)
+        start = store.last_open_ms
+        if start is None:
+            start = now_ms - int(MARKET_BACKFILL_DAYS * 86400_000)
+        added = 0
+        while start <= now_ms:
+            rows = self._fetch(store.symbol, start, FETCH_LIMIT)
+            if not rows:
+                break
+            added += store.extend(rows)
+            if len(rows) < FETCH_LIMIT:
+                break
+            start = int(rows[-1][0]) + STEP_MS
+        store.trim(now_ms - int(MARKET_RETENTION_DAYS * 86400_000))
+        if added:
+            store.save()
+        self.last_refresh = time.time()
+        return added
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                added = await asyncio.to_thread(self.refresh)
+                self.last_error = None
+                if added:
+                    log.debug("appended %s klines", added)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                log.warning("kline refresh failed: %s", e)
+            await asyncio.sleep(MARKET_REFRESH_S)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="market-history")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def series(
+        self,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None,
+        step_ms: Optional[int] = None,
+        points: int = 300,
+    ) -> dict:
+        """
+        Memory-only read. Defaults: the last 24h, bucketed so that at most
+        `points` candles come back.
+        """
+        store = self.store
+        if store is None or not len(store):
+            raise LookupError("market history is not loaded yet")
+        end_ms = end_ms or int(time.time() * 1000) + STEP_MS
+        start_ms = start_ms or end_ms - 86400_000
+        if end_ms <= start_ms:
+            raise ValueError("end must be after start")
+        points = max(1, min(points, MARKET_MAX_POINTS))
+        if not step_ms:
+            step_ms = -(-(end_ms - start_ms) // points)
+        step_ms = -(-step_ms // STEP_MS) * STEP_MS
+        if (end_ms - start_ms) // step_ms > MARKET_MAX_POINTS:
+            raise ValueError("too many points; use a coarser step")
+        return store.series(start_ms, end_ms, step_ms)
+
+    def stats(self) -> dict:
+        store = self.store
+        return {
+            "symbol": store.symbol if store else None,
+            "candles": len(store) if store else 0,
+            "first": store.cols["t"][0] if store and len(store) else None,
+            "last": store.last_open_ms if store else None,
+            "last_refresh": self.last_refresh,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,396 @@
+from __future__ import annotations
+
+import functools
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+# ─────────────────────────────────────────────────────────────
+# In-process metrics, Prometheus text exposition
+# ─────────────────────────────────────────────────────────────
+# upstream_request_seconds{upstream,op}        histogram
+# upstream_errors_total{upstream,op,error}     counter
+# upstream_inflight{upstream}                  gauge
+# http_request_seconds{method,route,status}    histogram (time to first byte)
+#
+# Recording is a bisect into fixed buckets plus two adds under a per-metric
+# lock; nothing is formatted, sorted or allocated per sample. All rendering
+# happens in `render()` when /metrics is scraped. METRICS_ENABLED=0 turns every
+# hook into a no-op.
+#
+# Upstreams are instrumented where their calls funnel through one place:
+#   binance   binance._http
+#   paypal    utils.paypal (_get_app_token / _pp_request)
+#   algod / indexer / kmd   algosdk *_request methods (patched once)
+#   firestore DocumentReference / Query / WriteBatch methods (patched once)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+_Labels = tuple  # label values, in the metric's label-name order
+
+
+def _esc(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_esc(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple = (),
+        fn: Optional[Callable[[], dict]] = None,
+    ):
+        super().__init__(name, help, labels)
+        self._values: dict[_Labels, float] = {}
+        self._fn = fn  # scrape-time callback over a count kept elsewhere
+
+    def inc(self, *labels, n: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + n
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self._fn is not None:
+            try:
+                values.update(self._fn())
+            except Exception:
+                pass  # a broken collector must not break the scrape
+        return self.header() + [
+            f"{self.name}{_fmt_labels(self.labels, k)} {_num(v)}"
+            for k, v in sorted(values.items())
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple = (),
+        fn: Optional[Callable[[], dict]] = None,
+    ):
+        super().__init__(name, help, labels)
+        self._values: dict[_Labels, float] = {}
+        self._fn = fn  # scrape-time callback: {label values: value}
+
+    def add(self, *labels, n: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + n
+
+    def set(self, *labels, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self._fn is not None:
+            try:
+                values.update(self._fn())
+            except Exception:
+                pass  # a broken collector must not break the scrape
+        return self.header() + [
+            f"{self.name}{_fmt_labels(self.labels, k)} {_num(v)}"
+            for k, v in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple = (),
+        buckets: tuple = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket (+Inf last), sum]
+        self._series: dict[_Labels, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None:
+                s = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            s[0][i] += 1
+            s[1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(
+                (k, (list(c), total)) for k, (c, total) in self._series.items()
+            )
+        out = self.header()
+        for k, (counts, total) in items:
+            acc = 0
+            for le, c in zip(self.buckets + ("+Inf",), counts):
+                acc += c
+                le = le if isinstance(le, str) else _num(float(le))
+                labels = _fmt_labels(self.labels, k, 'le="%s"' % le)
+                out.append(f"{self.name}_bucket{labels} {acc}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labels, k)} {_num(total)}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labels, k)} {acc}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for m in self._metrics:
+            lines += m.render()
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+UPSTREAM_SECONDS = registry.register(
+    Histogram(
+        "upstream_request_seconds",
+        "Latency of calls to upstream services.",
+        ("upstream", "op"),
+    )
+)
+UPSTREAM_ERRORS = registry.register(
+    Counter(
+        "upstream_errors_total",
+        "Failed upstream calls (exception or HTTP >= 400).",
+        ("upstream", "op", "error"),
+    )
+)
+UPSTREAM_INFLIGHT = registry.register(
+    Gauge("upstream_inflight", "Upstream calls currently in flight.", ("upstream",))
+)
+HTTP_SECONDS = registry.register(
+    Histogram(
+        "http_request_seconds",
+        "Time from request to response start, per route template.",
+        ("method", "route", "status"),
+    )
+)
+
+
+# ---------------- recording ----------------
+@contextmanager
+def timed(upstream: str, op: str) -> Iterator[None]:
+    """
+    Time one upstream call; exceptions count as errors and propagate. A
+    stream closed early by its consumer (GeneratorExit) completed normally.
+    """
+    if not METRICS_ENABLED:
+        yield
+        return
+    UPSTREAM_INFLIGHT.add(upstream)
+    t0 = time.perf_counter()
+    try:
+        yield
+    except GeneratorExit:
+        raise
+    except BaseException as e:
+        UPSTREAM_ERRORS.inc(upstream, op, type(e).__name__)
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - t0, upstream, op)
+        UPSTREAM_INFLIGHT.add(upstream, n=-1)
+
+
+def http_error(upstream: str, op: str, status: int) -> None:
+    """Count an HTTP error status from an upstream that did not raise."""
+    if METRICS_ENABLED:
+        UPSTREAM_ERRORS.inc(upstream, op, f"http_{status}")
+
+
+# ---------------- label hygiene ----------------
+# ids in paths would explode the label set: addresses, txids, numbers, hashes,
+# PayPal order / payout ids (mixed letters and digits)
+_ID_SEGMENT = re.compile(r"^(\d+|[A-Za-z0-9_-]{40,}|(?=.*\d)[A-Za-z0-9_-]{10,})$")
+
+
+def path_op(method: str, path: str) -> str:
+    path = path.split("?", 1)[0]
+    segs = [":id" if _ID_SEGMENT.match(s) else s for s in path.split("/")]
+    return f"{method.upper()} {'/'.join(segs)}"
+
+
+# ---------------- instrumentation ----------------
+def _wrap(fn: Callable, upstream: str, op: Callable[..., str]) -> Callable:
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with timed(upstream, op(*args, **kwargs)):
+            return fn(*args, **kwargs)
+
+    wrapper.__metrics_wrapped__ = True
+    return wrapper
+
+
+def _wrap_iter(fn: Callable, upstream: str, op: str) -> Callable:
+    """For generators (Query.stream): time until the stream is exhausted."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with timed(upstream, op):
+            yield from fn(*args, **kwargs)
+
+    wrapper.__metrics_wrapped__ = True
+    return wrapper
+
+
+def _patch(cls, name: str, make: Callable[[Callable], Callable]) -> None:
+    fn = getattr(cls, name, None)
+    if fn is not None and not getattr(fn, "__metrics_wrapped__", False):
+        setattr(cls, name, make(fn))
+
+
+_installed = set()
+_install_lock = threading.Lock()
+
+
+def instrument_algosdk() -> None:
+    if not METRICS_ENABLED or "algosdk" in _installed:
+        return
+    with _install_lock:
+        if "algosdk" in _installed:
+            return
+        from algosdk import kmd
+        from algosdk.v2client import algod, indexer
+
+        for cls, name, upstream in (
+            (algod.AlgodClient, "algod_request", "algod"),
+            (indexer.IndexerClient, "indexer_request", "indexer"),
+            (kmd.KMDClient, "kmd_request", "kmd"),
+        ):
+            _patch(
+                cls,
+                name,
+                lambda fn, u=upstream: _wrap(
+                    fn,
+                    u,
+                    lambda self, method, requrl, *a, **kw: path_op(method, requrl),
+                ),
+            )
+        _installed.add("algosdk")
+
+
+def instrument_firestore() -> None:
+    if not METRICS_ENABLED or "firestore" in _installed:
+        return
+    with _install_lock:
+        if "firestore" in _installed:
+            return
+        from google.cloud.firestore_v1 import batch, collection, document, query
+
+        for name in ("get", "set", "update", "create", "delete"):
+            _patch(
+                document.DocumentReference,
+                name,
+                lambda fn, n=name: _wrap(fn, "firestore", lambda *a, **kw: f"doc.{n}"),
+            )
+        for cls in (query.Query, collection.CollectionReference):
+            _patch(
+                cls, "stream", lambda fn: _wrap_iter(fn, "firestore", "query.stream")
+            )
+        _patch(
+            batch.WriteBatch,
+            "commit",
+            lambda fn: _wrap(fn, "firestore", lambda *a, **kw: "batch.commit"),
+        )
+        _installed.add("firestore")
+
+
+# ---------------- HTTP middleware ----------------
+class MetricsMiddleware:
+    """
+    Pure ASGI (no BaseHTTPMiddleware), so streaming responses pass straight
+    through. Records time to `http.response.start`, labelled by the matched
+    route template rather than the raw path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+        done = False
+
+        def record(status) -> None:
+            nonlocal done
+            if done:
+                return
+            done = True
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            HTTP_SECONDS.observe(
+                time.perf_counter() - t0, scope["method"], template, str(status)
+            )
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            record(500)
+            raise
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import struct
+from functools import lru_cache
+from typing import Any, Optional
+
+from algosdk import encoding as algo_encoding
+
+# ─────────────────────────────────────────────────────────────
+# On-chain receipt notes
+# ─────────────────────────────────────────────────────────────
+# v1: minified JSON  {"k":"rad/ramp","v":1,"h":<32 hex>,"usd":...}
+# v2: compact binary with fixed field tags. A 16-bit presence mask (bit = tag)
+# is followed by the present fixed-width fields in tag order, then `sym`:
+#
+#   b"RR\x02" | mask:u16 | fields... | [sym_len:u8 sym]
+#
+#   tag  field  encoding
+#   0    h      32 raw bytes (full SHA-256 of the minified receipt)
+#   1    to     32 raw bytes (recipient address)
+#   2    usd    u64, cents
+#   3    usdc   u64, 10^-6 units
+#   4    px     u64, 10^-6 USDT per USDC
+#   5    oid    u64 (Binance orderId)
+#   6    ts     u32, unix seconds
+#   7    sym    u8 length + ASCII (max 16)
+#
+# Integers are big-endian. Each mask maps to one precompiled struct, so
+# decoding is a single unpack_from over the note buffer. New tags may only be
+# appended; decoders ignore bits they do not know.
+
+NOTE_NS = "rad/ramp"
+NOTE_LIMIT = 1024  # Algorand hard cap
+MAGIC_V2 = b"RR\x02"
+
+T_HASH, T_TO, T_USD, T_USDC, T_PX, T_OID, T_TS, T_SYM = range(8)
+_FIELDS = (  # (tag, key, struct code)
+    (T_HASH, "h", "32s"),
+    (T_TO, "to", "32s"),
+    (T_USD, "usd", "Q"),
+    (T_USDC, "usdc", "Q"),
+    (T_PX, "px", "Q"),
+    (T_OID, "oid", "Q"),
+    (T_TS, "ts", "I"),
+)
+_FIXED_MASK = (1 << T_SYM) - 1
+_HEADER = struct.Struct(">3sH")
+_SYM_MAX = 16
+
+
+@lru_cache(maxsize=256)
+def _layout(mask: int) -> tuple[struct.Struct, tuple[str, ...]]:
+    codes = "".join(code for tag, _, code in _FIELDS if mask & (1 << tag))
+    keys = tuple(key for tag, key, _ in _FIELDS if mask & (1 << tag))
+    return struct.Struct(">" + codes), keys
+
+
+@lru_cache(maxsize=4096)
+def _address(raw: bytes) -> str:
+    # base32 + checksum dominates decode cost; history pages repeat addresses
+    return algo_encoding.encode_address(raw)
+
+
+def _minify(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def content_hash(receipt_full: dict) -> str:
+    """SHA-256 (hex) of the minified full receipt; the receipt's content address."""
+    return hashlib.sha256(_minify(receipt_full)).hexdigest()
+
+
+def _fixed_to_int(value: Any, places: int) -> Optional[int]:
+    """'12.34' -> 1234 (places=2) without going through float."""
+    if value is None:
+        return None
+    s = str(value).strip()
+    whole, _, frac = s.partition(".")
+    if not (whole or frac) or not (whole + frac).isdigit():
+        return None
+    return int(whole or 0) * 10**places + int((frac + "0" * places)[:places] or 0)
+
+
+def _get(d: dict, *path: str) -> Any:
+    for key in path:
+        if not isinstance(d, dict):
+            return None
+        d = d.get(key)
+    return d
+
+
+# ---------------- encode ----------------
+def encode_note_v2(receipt_full: dict) -> tuple[bytes, str]:
+    """
+    Single pass: hash the full receipt, then pack whichever summary fields are
+    present. Output is bounded (<= 130 bytes) so it always fits NOTE_LIMIT.
+    """
+    h = content_hash(receipt_full)
+    values: dict[int, Any] = {T_HASH: bytes.fromhex(h)}
+
+    to_wallet = _get(receipt_full, "recipient", "wallet")
+    if to_wallet:
+        try:
+            values[T_TO] = algo_encoding.decode_address(to_wallet)
+        except Exception:
+            pass
+
+    for tag, value, places in (
+        (T_USD, _get(receipt_full, "payment", "usd"), 2),
+        (T_USDC, _get(receipt_full, "payment", "usdc_bought"), 6),
+        (T_PX, _get(receipt_full, "exchange", "effective_price_usdt_per_usdc"), 6),
+    ):
+        n = _fixed_to_int(value, places)
+        if n is not None and n < 1 << 64:
+            values[tag] = n
+
+    oid = _get(receipt_full, "binance", "orderId")
+    if isinstance(oid, int) and 0 <= oid < 1 << 64:
+        values[T_OID] = oid
+
+    ts = receipt_full.get("ts")
+    if isinstance(ts, int) and 0 <= ts < 1 << 32:
+        values[T_TS] = ts
+
+    mask = 0
+    for tag in values:
+        mask |= 1 << tag
+    layout, _ = _layout(mask)
+
+    sym = _get(receipt_full, "exchange", "symbol")
+    sym_raw = b""
+    if isinstance(sym, str) and sym.isascii():
+        sym_raw = sym.encode("ascii")[:_SYM_MAX]
+    if sym_raw:  # the bit promises a length byte
+        mask |= 1 << T_SYM
+
+    out = bytearray(_HEADER.pack(MAGIC_V2, mask))
+    out += layout.pack(*(values[tag] for tag, _, _ in _FIELDS if tag in values))
+    if sym_raw:
+        out.append(len(sym_raw))
+        out += sym_raw
+    return bytes(out), h
+
+
+# ---------------- decode ----------------
+@lru_cache(maxsize=8192)
+def _decode_v2_cached(data: bytes) -> dict:
+    # Notes are immutable and history pages re-read the same ones on every poll.
+    return decode_note_v2(data)
+
+
+def decode_note_v2(data: bytes) -> dict:
+    _, mask = _HEADER.unpack_from(data)
+    layout, keys = _layout(mask & _FIXED_MASK)
+    out: dict[str, Any] = {"k": NOTE_NS, "v": 2}
+    out.update(zip(keys, layout.unpack_from(data, _HEADER.size)))
+
+    if "h" in out:
+        out["h"] = out["h"].hex()
+    if "to" in out:
+        out["to"] = _address(out["to"])
+    if "usd" in out:
+        n = out["usd"]
+        out["usd"] = f"{n // 100}.{n % 100:02d}"
+    if "usdc" in out:
+        n = out["usdc"]
+        out["usdc"] = f"{n // 1000000}.{n % 1000000:06d}"
+    if "px" in out:
+        n = out["px"]
+        out["px"] = f"{n // 1000000}.{n % 1000000:06d}"
+    if mask & (1 << T_SYM):
+        i = _HEADER.size + layout.size
+        out["sym"] = data[i + 1 : i + 1 + data[i]].decode("ascii")
+    return out
+
+
+def decode_note(data: bytes) -> Optional[dict]:
+    """Decode a raw note of any known version (v2 binary or v1 JSON)."""
+    if not data:
+        return None
+    try:
+        if data[:3] == MAGIC_V2:
+            return dict(_decode_v2_cached(bytes(data)))
+        if data[:1] == b"{":
+            return json.loads(data)
+    except Exception:
+        return None
+    return None
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+from app.core import tracing
+
+# ─────────────────────────────────────────────────────────────
+# Tiny async DAG runner
+# ─────────────────────────────────────────────────────────────
+# Each stage receives the dict of results produced so far and returns its
+# own result. A stage starts as soon as all of its deps are done, so
+# independent legs overlap and the wall time approaches the critical path.
+# Plain (sync) functions run in the default threadpool. Each stage runs in a
+# "stage.<name>" span under whatever span started the run.
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[dict], Any]
+    deps: tuple[str, ...] = ()
+
+
+@dataclass
+class PipelineResult:
+    results: dict = field(default_factory=dict)
+    timings: dict = field(default_factory=dict)  # stage -> ms, plus "total"
+
+
+StageHook = Callable[[str, Any, float], Optional[Awaitable[None]]]
+
+
+class Pipeline:
+    def __init__(self, stages: list[Stage]):
+        names = {s.name for s in stages}
+        for s in stages:
+            missing = set(s.deps) - names
+            if missing:
+                raise ValueError(
+                    f"stage {s.name!r} depends on unknown {sorted(missing)}"
+                )
+        self.stages = stages
+        self._check_acyclic()
+
+    def _check_acyclic(self) -> None:
+        deps = {s.name: set(s.deps) for s in self.stages}
+        done: set[str] = set()
+        while deps:
+            ready = [n for n, d in deps.items() if d <= done]
+            if not ready:
+                raise ValueError(f"dependency cycle among {sorted(deps)}")
+            for n in ready:
+                done.add(n)
+                del deps[n]
+
+    async def run(
+        self,
+        seed: Optional[dict] = None,
+        on_stage: Optional[StageHook] = None,
+    ) -> PipelineResult:
+        """
+        Run every stage. Results in `seed` are taken as already computed and
+        their stages are skipped. The first failing stage cancels the rest and
+        its exception propagates unchanged (with `.stage` set to its name).
+        """
+        out = PipelineResult(results=dict(seed or {}))
+        futures: dict[str, asyncio.Future] = {}
+        loop = asyncio.get_running_loop()
+        t_start = time.perf_counter()
+
+        for s in self.stages:
+            futures[s.name] = loop.create_future()
+            if s.name in out.results:
+                futures[s.name].set_result(out.results[s.name])
+
+        async def _run(stage: Stage) -> None:
+            if futures[stage.name].done():
+                return
+            for dep in stage.deps:
+                await futures[dep]
+            t0 = time.perf_counter()
+            try:
+                with tracing.span(f"stage.{stage.name}"):
+                    if inspect.iscoroutinefunction(stage.fn):
+                        value = await stage.fn(out.results)
+                    else:
+                        value = await asyncio.to_thread(stage.fn, out.results)
+            except BaseException as e:
+                if isinstance(e, Exception):
+                    try:
+                        e.stage = stage.name  # type: ignore[attr-defined]
+                    except Exception:
+                        pass
+                futures[stage.name].set_exception(e)
+                raise
+            elapsed = (time.perf_counter() - t0) * 1000
+            out.results[stage.name] = value
+            out.timings[stage.name] = round(elapsed, 2)
+            futures[stage.name].set_result(value)
+            if on_stage is not None:
+                maybe = on_stage(stage.name, value, elapsed)
+                if inspect.isawaitable(maybe):
+                    await maybe
+
+        tasks = [asyncio.ensure_future(_run(s)) for s in self.stages]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for f in futures.values():
+                if f.done() and not f.cancelled():
+                    f.exception()  # mark retrieved
+            raise
+        out.timings["total"] = round((time.perf_counter() - t_start) * 1000, 2)
+        return out
@@ -0,0 +1,415 @@
+from __future__ import annotations
+
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Optional
+
+# ─────────────────────────────────────────────────────────────
+# Statistical CPU sampler + tracemalloc snapshots (admin only)
+# ─────────────────────────────────────────────────────────────
+# A daemon thread wakes every `interval` and walks sys._current_frames() of
+# every other thread, counting each stack once. Nothing is installed in the
+# profiled threads (no settrace/setprofile), so the cost is that one thread
+# running a few hundred times a second, and only while a session is active.
+#
+# Whole-process profiles are CPU by default: a thread whose innermost Python
+# frame is parked in a lock/condition wait, a queue get or a selector poll is
+# counted as idle and left out of the stacks. `wall=True` keeps those stacks
+# (wall-clock profile, e.g. to see what an executor is waiting on).
+#
+# Route mode samples only while a selected request to one route template is
+# in flight, and keeps only stacks that pass through that route's endpoint
+# function, blocked or not: it is a wall-clock profile of the request.
+# Concurrent unselected requests to the same route can still land in the
+# profile; the fraction throttles how often sampling is on at all.
+#
+# Output: collapsed stacks ("root;caller;callee N", for flamegraph.pl and
+# speedscope import) or speedscope's sampled-profile JSON.
+
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "120"))
+PROFILE_DEFAULT_INTERVAL = 0.005  # s
+_BASE = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+
+# Innermost frames of a thread that is blocked, not running: (file, function)
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),  # concurrent.futures worker between work items
+}
+
+
+class Busy(RuntimeError):
+    pass
+
+
+def _label(code) -> str:
+    path = code.co_filename
+    if path.startswith(_BASE):
+        path = os.path.relpath(path, _BASE)
+    elif "site-packages" in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+def _stack(frame, through: Optional[set] = None) -> Optional[tuple]:
+    """Root-first frame labels; None unless a code in `through` is on it."""
+    codes = []
+    found = through is None
+    while frame is not None:
+        codes.append(frame.f_code)
+        if not found and frame.f_code in through:
+            found = True
+        frame = frame.f_back
+    if not found:
+        return None
+    return tuple(_label(c) for c in reversed(codes))
+
+
+def _idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES
+
+
+def _endpoint_code(scope):
+    fn = scope.get("endpoint")  # set in place by the router once matched
+    fn = getattr(fn, "__wrapped__", fn)
+    return getattr(fn, "__code__", None)
+
+
+class Profile:
+    def __init__(self, name: str, interval: float, clock: str = "cpu"):
+        self.name = name
+        self.interval = interval
+        self.clock = clock  # "cpu": idle threads skipped; "wall": all stacks
+        self.started = time.time()
+        self.ended: Optional[float] = None
+        self.samples = 0
+        self.idle = 0  # thread samples skipped as blocked (cpu clock only)
+        self.stacks: Counter[tuple] = Counter()
+
+    # ---------------- output ----------------
+    def collapsed(self) -> str:
+        return "\n".join(
+            f"{';'.join(stack)} {n}" for stack, n in self.stacks.most_common()
+        )
+
+    def speedscope(self) -> dict:
+        frames: list[dict] = []
+        index: dict[str, int] = {}
+        samples, weights = [], []
+        for stack, n in self.stacks.items():
+            ids = []
+            for label in stack:
+                i = index.get(label)
+                if i is None:
+                    i = index[label] = len(frames)
+                    frames.append({"name": label})
+                ids.append(i)
+            samples.append(ids)
+            weights.append(n * self.interval)
+        end = sum(weights)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": self.name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": end,
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+            "name": self.name,
+            "exporter": "hackathon-backend",
+        }
+
+    def summary(self) -> dict:
+        return {
+            "name": self.name,
+            "clock": self.clock,
+            "interval_ms": self.interval * 1000,
+            "started": self.started,
+            "ended": self.ended,
+            "samples": self.samples,
+            "idle_samples": self.idle,
+            "distinct_stacks": len(self.stacks),
+        }
+
+
+class Sampler:
+    """One sampling session at a time, process-wide."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = False
+        self.route: Optional[RouteProfile] = None  # read lock-free by middleware
+
+    def _claim(self) -> None:
+        with self._lock:
+            if self._active:
+                raise Busy("a profiling session is already running")
+            self._active = True
+
+    def _release(self) -> None:
+        with self._lock:
+            self._active = False
+
+    def run(
+        self,
+        seconds: float,
+        interval: float = PROFILE_DEFAULT_INTERVAL,
+        name: str = "cpu",
+        threads: Optional[str] = None,
+        wall: bool = False,
+    ) -> Profile:
+        """
+        Sample every thread (or those whose name contains `threads`) for
+        `seconds`, skipping blocked threads unless `wall`. Blocks the caller;
+        run it via asyncio.to_thread.
+        """
+        self._claim()
+        try:
+            prof = Profile(name, interval, "wall" if wall else "cpu")
+            me = threading.get_ident()
+            deadline = time.monotonic() + min(seconds, PROFILE_MAX_SECONDS)
+            names = {}
+            while time.monotonic() < deadline:
+                if threads:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    if threads and threads not in names.get(ident, ""):
+                        continue
+                    if not wall and _idle(frame):
+                        prof.idle += 1
+                        continue
+                    prof.stacks[_stack(frame)] += 1
+                    prof.samples += 1
+                time.sleep(interval)
+            prof.ended = time.time()
+            return prof
+        finally:
+            self._release()
+
+    # ---------------- route mode ----------------
+    def arm_route(
+        self,
+        route: str,
+        fraction: float,
+        seconds: float,
+        max_requests: int,
+        interval: float = PROFILE_DEFAULT_INTERVAL,
+    ) -> "RouteProfile":
+        self._claim()
+        rp = RouteProfile(
+            self,
+            route,
+            fraction,
+            time.monotonic() + min(seconds, PROFILE_MAX_SECONDS),
+            max_requests,
+            interval,
+        )
+        self.route = rp
+        threading.Thread(target=rp._run, name="route-profiler", daemon=True).start()
+        return rp
+
+    def disarm_route(self) -> Optional["RouteProfile"]:
+        rp = self.route
+        if rp is not None:
+            rp.stop()
+        return rp
+
+
+class RouteProfile:
+    def __init__(
+        self,
+        sampler: Sampler,
+        route: str,
+        fraction: float,
+        deadline: float,
+        max_requests: int,
+        interval: float,
+    ):
+        from starlette.routing import compile_path
+
+        self._sampler = sampler
+        self.route = route
+        self.path_regex = compile_path(route)[0]
+        self.fraction = fraction
+        self.deadline = deadline
+        self.max_requests = max_requests
+        self.profile = Profile(f"route {route}", interval, "wall")
+        self.selected = 0
+        self.seen = 0
+        self._scopes: dict[int, dict] = {}  # selected requests in flight
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def select(self, scope) -> bool:
+        """Called by the middleware for each request matching `route`."""
+        with self._lock:
+            if self.done or self.selected >= self.max_requests:
+                return False
+            self.seen += 1
+            if random.random() >= self.fraction:
+                return False
+            self.selected += 1
+            self._scopes[id(scope)] = scope
+            return True
+
+    def finish(self, scope) -> None:
+        with self._lock:
+            self._scopes.pop(id(scope), None)
+            if self.selected >= self.max_requests and not self._scopes:
+                self._done.set()
+
+    def stop(self) -> None:
+        self._done.set()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        prof = self.profile
+        try:
+            while not self._done.is_set() and time.monotonic() < self.deadline:
+                with self._lock:
+                    codes = {_endpoint_code(s) for s in self._scopes.values()}
+                codes.discard(None)
+                if codes:
+                    for ident, frame in sys._current_frames().items():
+                        if ident == me:
+                            continue
+                        stack = _stack(frame, through=codes)
+                        if stack is not None:
+                            prof.stacks[stack] += 1
+                            prof.samples += 1
+                self._done.wait(prof.interval)
+        finally:
+            self._done.set()
+            prof.ended = time.time()
+            self._sampler._release()
+
+    def status(self) -> dict:
+        return {
+            "route": self.route,
+            "fraction": self.fraction,
+            "done": self.done,
+            "requests_seen": self.seen,
+            "requests_profiled": self.selected,
+            "max_requests": self.max_requests,
+            **self.profile.summary(),
+        }
+
+
+sampler = Sampler()
+
+
+class RouteProfilerMiddleware:
+    """
+    Pure ASGI. With nothing armed it costs one attribute read per request;
+    when armed, one regex match against the armed route template.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        rp = sampler.route
+        if rp is None or rp.done or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if not rp.path_regex.match(scope["path"]) or not rp.select(scope):
+            return await self.app(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            rp.finish(scope)
+
+
+# ---------------- tracemalloc ----------------
+class MemoryProfiler:
+    def __init__(self):
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+
+    def start(self, frames: int = 10) -> dict:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._baseline = None
+        return self.status()
+
+    def stop(self) -> dict:
+        tracemalloc.stop()
+        self._baseline = None
+        return self.status()
+
+    def status(self) -> dict:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            "tracing": tracing,
+            "frames": tracemalloc.get_traceback_limit() if tracing else 0,
+            "current_bytes": current,
+            "peak_bytes": peak,
+            "has_baseline": self._baseline is not None,
+        }
+
+    def snapshot(
+        self, limit: int = 30, group: str = "lineno", compare: bool = False
+    ) -> dict:
+        """
+        Top allocation sites. With `compare`, the diff against the previous
+        snapshot taken with compare=True (the first call sets the baseline).
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        snap = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            )
+        )
+        out = {**self.status(), "group": group}
+        if compare and self._baseline is not None:
+            stats = snap.compare_to(self._baseline, group)[:limit]
+            out["top"] = [
+                {
+                    "where": _where(s.traceback, group),
+                    "size": s.size,
+                    "size_diff": s.size_diff,
+                    "count": s.count,
+                    "count_diff": s.count_diff,
+                }
+                for s in stats
+            ]
+        else:
+            stats = snap.statistics(group)[:limit]
+            out["top"] = [
+                {"where": _where(s.traceback, group), "size": s.size, "count": s.count}
+                for s in stats
+            ]
+        if compare:
+            self._baseline = snap
+        return out
+
+
+def _where(tb: tracemalloc.Traceback, group: str):
+    if group == "traceback":
+        return [f"{f.filename}:{f.lineno}" for f in tb]
+    f = tb[0]
+    return f"{f.filename}:{f.lineno}" if group == "lineno" else f.filename
+
+
+memory = MemoryProfiler()
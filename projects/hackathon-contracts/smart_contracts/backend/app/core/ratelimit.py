@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Mapping, Optional
+
+# ─────────────────────────────────────────────────────────────
+# Client-side request-weight scheduler (Binance-style limits)
+# ─────────────────────────────────────────────────────────────
+# Two token buckets mirror the exchange's counters: request weight per minute
+# and orders per 10 seconds. Each response's X-MBX-USED-WEIGHT-1M /
+# X-MBX-ORDER-COUNT-10S headers pull our estimate back in line with the
+# server's. A 429/418 with Retry-After freezes everything until it expires.
+#
+# Priorities (lower = more important):
+#   ORDER     order placement; may drain the bucket, waits if it must
+#   ACCOUNT   signed reads (order lookup, balances)
+#   QUOTE     tickers / book; shed once headroom drops under quote_reserve
+#   BACKFILL  history backfill; shed under backfill_reserve
+
+ORDER, ACCOUNT, QUOTE, BACKFILL = range(4)
+PRIORITY_NAMES = {
+    ORDER: "order",
+    ACCOUNT: "account",
+    QUOTE: "quote",
+    BACKFILL: "backfill",
+}
+
+
+class RateLimited(RuntimeError):
+    """Raised when a request is shed (or would wait past its deadline)."""
+
+    def __init__(self, msg: str, retry_after: float = 0.0):
+        super().__init__(msg)
+        self.retry_after = retry_after
+
+
+class _Bucket:
+    def __init__(self, capacity: int, window: float):
+        self.capacity = capacity
+        self.rate = capacity / window
+        self.tokens = float(capacity)
+        self.stamp = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def sync_used(self, used: int) -> None:
+        # the server knows best; never let our estimate be more optimistic
+        self.tokens = min(self.tokens, float(self.capacity - used))
+
+    def wait_for(self, amount: float) -> float:
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+
+class WeightLimiter:
+    def __init__(
+        self,
+        weight_per_min: int = 6000,
+        orders_per_10s: int = 100,
+        quote_reserve: float = 0.2,
+        backfill_reserve: float = 0.4,
+        max_wait: float = 5.0,  # keep well inside recvWindow of signed calls
+    ):
+        self.weight = _Bucket(weight_per_min, 60.0)
+        self.orders = _Bucket(orders_per_10s, 10.0)
+        self.reserve = {
+            ORDER: 0.0,
+            ACCOUNT: 0.05 * weight_per_min,
+            QUOTE: quote_reserve * weight_per_min,
+            BACKFILL: backfill_reserve * weight_per_min,
+        }
+        self.max_wait = max_wait
+        self.banned_until = 0.0
+        self._cond = threading.Condition()
+        self._waiting = {p: 0 for p in PRIORITY_NAMES}
+        self.shed = {p: 0 for p in PRIORITY_NAMES}
+        self.used_weight_1m: Optional[int] = None
+        self.order_count_10s: Optional[int] = None
+
+    # ---------------- acquire ----------------
+    def _higher_waiting(self, priority: int) -> bool:
+        return any(self._waiting[p] for p in PRIORITY_NAMES if p < priority)
+
+    def acquire(
+        self,
+        weight: int,
+        priority: int = QUOTE,
+        is_order: bool = False,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """
+        Take `weight` (and one order slot if `is_order`) from the buckets.
+        QUOTE/BACKFILL requests are shed immediately when they would dip into
+        their reserve; ORDER/ACCOUNT requests wait up to `timeout`.
+        """
+        deadline = time.monotonic() + (self.max_wait if timeout is None else timeout)
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.weight.refill(now)
+                    self.orders.refill(now)
+
+                    wait = 0.0
+                    if now < self.banned_until:
+                        wait = self.banned_until - now
+                    else:
+                        need = weight + self.reserve[priority]
+                        if self.weight.tokens < need:
+                            wait = self.weight.wait_for(need)
+                        if is_order and self.orders.tokens < 1:
+                            wait = max(wait, self.orders.wait_for(1))
+                        if not wait and self._higher_waiting(priority):
+                            wait = 0.05
+
+                    if not wait:
+                        self.weight.tokens -= weight
+                        if is_order:
+                            self.orders.tokens -= 1
+                        return
+
+                    if priority >= QUOTE or now + wait > deadline:
+                        self.shed[priority] += 1
+                        raise RateLimited(
+                            f"{PRIORITY_NAMES[priority]} request shed "
+                            f"(headroom {self.headroom()}, retry in {wait:.1f}s)",
+                            retry_after=wait,
+                        )
+                    self._cond.wait(min(wait, deadline - now))
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+    # ---------------- feedback ----------------
+    def observe(self, status: int, headers: Mapping[str, str]) -> None:
+        """Feed a response's status and headers back into the buckets."""
+        with self._cond:
+            for key, value in headers.items():
+                k = key.lower()
+                try:
+                    if k == "x-mbx-used-weight-1m":
+                        self.used_weight_1m = int(value)
+                        self.weight.sync_used(self.used_weight_1m)
+                    elif k == "x-mbx-order-count-10s":
+                        self.order_count_10s = int(value)
+                        self.orders.sync_used(self.order_count_10s)
+                except ValueError:
+                    pass
+            if status in (418, 429):
+                try:
+                    retry_after = float(headers.get("Retry-After") or 0)
+                except ValueError:
+                    retry_after = 0.0
+                retry_after = retry_after or (120.0 if status == 418 else 60.0)
+                self.banned_until = max(
+                    self.banned_until, time.monotonic() + retry_after
+                )
+                self.weight.tokens = 0.0
+            self._cond.notify_all()
+
+    # ---------------- reporting ----------------
+    def headroom(self) -> int:
+        self.weight.refill(time.monotonic())
+        return max(0, int(self.weight.tokens))
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            now = time.monotonic()
+            return {
+                "weight_limit_1m": self.weight.capacity,
+                "weight_headroom": self.headroom(),
+                "server_used_weight_1m": self.used_weight_1m,
+                "order_limit_10s": self.orders.capacity,
+                "server_order_count_10s": self.order_count_10s,
+                "banned_for_s": round(max(0.0, self.banned_until - now), 1),
+                "shed": {PRIORITY_NAMES[p]: n for p, n in self.shed.items()},
+            }
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Optional
+
+from google.api_core.exceptions import AlreadyExists
+
+from app.core.firebase import get_firestore_client
+
+log = logging.getLogger("receipts")
+
+# ─────────────────────────────────────────────────────────────
+# Content-addressed receipt store
+# ─────────────────────────────────────────────────────────────
+# receipts/{sha256}   {"z": <compressed minified JSON>, "c": codec, "ts": int}
+# receipt_ptr/{txid}  {"h": sha256, "round": confirmed round (chain follower)}
+#
+# A receipt is written once under its content hash; the txid pointer is a
+# few dozen bytes. Legacy docs ({"receipt": {...}} under both txid and hash)
+# are still readable.
+
+BLOBS = lambda: get_firestore_client().collection("receipts")
+POINTERS = lambda: get_firestore_client().collection("receipt_ptr")
+
+CODEC = "zd1"  # zlib + preset dictionary below
+
+# Shared dictionary: the skeleton of a `rad/ramp-receipt` envelope as built by
+# routers/ramp.py + mint_and_send_usdc_dev. Keys and constant values compress
+# to back-references, so only the numbers, addresses and ids cost bytes.
+# Changing this string requires a new CODEC id.
+_ZDICT = json.dumps(
+    {
+        "type": "rad/ramp-receipt",
+        "asset": {"id": 0, "name": "USDC", "unit": "USDC", "decimals": 6},
+        "ts": 0,
+        "payer": {"email": "@gmail.com", "paypal": None},
+        "recipient": {"wallet": "", "paypal": None},
+        "payment": {
+            "kind": "fiat->spot(usdt)->usdc->localnet-usdc",
+            "usd": "",
+            "usdt_spent": "",
+            "usdc_bought": "",
+            "order_id": None,
+        },
+        "exchange": {
+            "name": "binance",
+            "venue": "spot-testnet",
+            "symbol": "USDCUSDT",
+            "effective_price_usdt_per_usdc": "1.000000",
+        },
+        "binance": {
+            "mode": "spot-testnet",
+            "symbol": "USDCUSDT",
+            "orderId": 0,
+            "clientOrderId": "",
+            "status": "FILLED",
+            "transactTime": 0,
+            "executedQty": "",
+            "cummulativeQuoteQty": "",
+            "priceUSDCUSDT": "1.000000",
+            "side": "BUY",
+            "type": "MARKET",
+        },
+        "pre_quote": {
+            "symbol": "USDCUSDT",
+            "venue": "spot-testnet",
+            "price": {
+                "last": "",
+                "bid": "",
+                "ask": "",
+                "mid": "",
+                "spread_bps": "0.00",
+            },
+            "expected_usdc": {"at_last": "", "at_mid": "", "at_ask": ""},
+        },
+    },
+    separators=(",", ":"),
+).encode("utf-8")
+
+CACHE_SIZE = 2048
+
+
+class _LRU:
+    def __init__(self, size: int):
+        self.size = size
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+
+_receipts = _LRU(CACHE_SIZE)  # hash -> receipt dict
+_pointers = _LRU(CACHE_SIZE * 4)  # txid -> hash
+
+
+def _minify(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def compress(receipt: dict) -> bytes:
+    c = zlib.compressobj(level=9, zdict=_ZDICT)
+    return c.compress(_minify(receipt)) + c.flush()
+
+
+def decompress(blob: bytes, codec: str = CODEC) -> dict:
+    if codec != CODEC:
+        raise ValueError(f"unknown receipt codec {codec!r}")
+    d = zlib.decompressobj(zdict=_ZDICT)
+    return json.loads(d.decompress(blob) + d.flush())
+
+
+# ---------------- write ----------------
+def put_receipt(txid: str, content_hash: str, receipt: dict) -> None:
+    """
+    Store `receipt` once under its content hash (skipped if already stored)
+    and point `txid` at it.
+    """
+    if _receipts.get(content_hash) is None:
+        blob = {"z": compress(receipt), "c": CODEC, "ts": int(time.time())}
+        try:
+            BLOBS().document(content_hash).create(blob)
+        except AlreadyExists:
+            pass  # same content already stored
+        _receipts.put(content_hash, receipt)
+
+    POINTERS().document(txid).set({"h": content_hash}, merge=True)
+    _pointers.put(txid, content_hash)
+
+
+def mark_confirmed(txid: str, confirmed_round: int) -> None:
+    """Link the txid pointer to the round its transfer confirmed in."""
+    POINTERS().document(txid).set({"round": confirmed_round}, merge=True)
+
+
+# ---------------- read ----------------
+def _is_hash(key: str) -> bool:
+    return len(key) == 64 and all(c in "0123456789abcdef" for c in key)
+
+
+def _load_blob(content_hash: str) -> Optional[dict]:
+    data = BLOBS().document(content_hash).get().to_dict()
+    if not data:
+        return None
+    if "z" in data:
+        return decompress(data["z"], data.get("c", CODEC))
+    return data.get("receipt")  # legacy uncompressed doc
+
+
+def get_receipt(key: str) -> Optional[dict]:
+    """
+    Look up a receipt by content hash or txid. Returns
+    {"hash", "txid"?, "receipt"} or None.
+    """
+    txid = None
+    content_hash = key if _is_hash(key) else None
+    if content_hash is None:
+        txid = key
+        content_hash = _pointers.get(txid)
+        if content_hash is None:
+            ptr = POINTERS().document(txid).get().to_dict()
+            if ptr and ptr.get("h"):
+                content_hash = ptr["h"]
+            else:
+                legacy = BLOBS().document(txid).get().to_dict()
+                if not legacy:
+                    return None
+                content_hash = legacy.get("hash")
+                if content_hash and legacy.get("receipt") is not None:
+                    _receipts.put(content_hash, legacy["receipt"])
+            if content_hash is None:
+                return None
+            _pointers.put(txid, content_hash)
+
+    receipt = _receipts.get(content_hash)
+    if receipt is None:
+        receipt = _load_blob(content_hash)
+        if receipt is None:
+            return None
+        _receipts.put(content_hash, receipt)
+
+    out = {"hash": content_hash, "receipt": receipt}
+    if txid:
+        out["txid"] = txid
+    return out
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from typing import Sequence
+
+# ─────────────────────────────────────────────────────────────
+# Best-execution routing over several stable/USDT books
+# ─────────────────────────────────────────────────────────────
+# Input: ask ladders [(price, qty), ...] per symbol, all quoted in USDT with a
+# USD stable as base, so prices are directly comparable. A market buy of
+# `quote_qty` USDT is split greedily across the merged ladder (cheapest ask
+# first, whichever book it is in), then each symbol's share is cut into child
+# orders no larger than `max_child`. Shares under `min_child` are folded into
+# the largest route since the exchange would reject them (min notional).
+
+Ladder = Sequence[tuple[float, float]]
+
+
+@dataclass
+class Route:
+    symbol: str
+    quote_qty: float  # USDT to spend
+    est_base_qty: float  # stable expected back
+    est_avg_price: float
+    top_ask: float
+    slippage_bps: float  # est_avg_price vs this book's top ask
+    children: int = 1
+
+    def as_dict(self) -> dict:
+        d = asdict(self)
+        for k in ("quote_qty", "est_base_qty", "est_avg_price", "top_ask"):
+            d[k] = round(d[k], 8)
+        d["slippage_bps"] = round(d["slippage_bps"], 2)
+        return d
+
+
+def walk_asks(asks: Ladder, quote_qty: float) -> tuple[float, float]:
+    """
+    Base received and quote actually spent buying `quote_qty` worth from
+    `asks`. Spent < quote_qty means the visible book was too thin.
+    """
+    base = spent = 0.0
+    left = quote_qty
+    for price, qty in asks:
+        if left <= 0:
+            break
+        if price <= 0 or qty <= 0:
+            continue
+        take = min(left, price * qty)
+        base += take / price
+        spent += take
+        left -= take
+    return base, spent
+
+
+def _route(symbol: str, asks: Ladder, quote_qty: float) -> Route:
+    base, spent = walk_asks(asks, quote_qty)
+    top = asks[0][0]
+    if spent < quote_qty:
+        # thin book: assume the remainder fills at the deepest visible level
+        base += (quote_qty - spent) / asks[-1][0]
+    avg = quote_qty / base if base else top
+    return Route(symbol, quote_qty, base, avg, top, (avg - top) / top * 1e4)
+
+
+def plan_routes(
+    books: dict[str, Ladder],
+    quote_qty: float,
+    min_child: float = 10.0,
+    max_child: float = 0.0,
+) -> list[Route]:
+    """Routes ordered by allocation, largest first. `max_child` 0 = no split."""
+    books = {s: list(a) for s, a in books.items() if a}
+    if not books or quote_qty <= 0:
+        return []
+
+    merged = sorted(
+        ((p, q, s) for s, asks in books.items() for p, q in asks if p > 0 and q > 0),
+        key=lambda lvl: lvl[0],
+    )
+    alloc: dict[str, float] = {}
+    left = quote_qty
+    for price, qty, sym in merged:
+        if left <= 0:
+            break
+        take = min(left, price * qty)
+        alloc[sym] = alloc.get(sym, 0.0) + take
+        left -= take
+    if left > 0:
+        # deeper than every visible book; park the rest on the deepest one
+        deepest = max(books, key=lambda s: sum(p * q for p, q in books[s]))
+        alloc[deepest] = alloc.get(deepest, 0.0) + left
+
+    ranked = sorted(alloc.items(), key=lambda kv: kv[1], reverse=True)
+    main_sym = ranked[0][0]
+    for sym, amt in ranked[1:]:
+        if amt < min_child:
+            alloc[main_sym] += alloc.pop(sym)
+
+    routes = [_route(s, books[s], amt) for s, amt in alloc.items()]
+    routes.sort(key=lambda r: r.quote_qty, reverse=True)
+    if max_child > 0:
+        for r in routes:
+            r.children = max(1, -(-int(r.quote_qty * 100) // int(max_child * 100)))
+    return routes
+
+
+def child_sizes(quote_qty: float, children: int) -> list[float]:
+    """Split `quote_qty` into `children` cent-rounded pieces summing exactly."""
+    cents = round(quote_qty * 100)
+    base, extra = divmod(cents, children)
+    return [(base + (1 if i < extra else 0)) / 100 for i in range(children)]
+
+
+def blended_slippage_bps(routes: Sequence[Route]) -> float:
+    """Whole-order average price vs the best top-of-book across routes."""
+    if not routes:
+        return 0.0
+    best = min(r.top_ask for r in routes)
+    quote = sum(r.quote_qty for r in routes)
+    base = sum(r.est_base_qty for r in routes)
+    if not base:
+        return 0.0
+    return round((quote / base - best) / best * 1e4, 2)
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import asyncio
+import gc
+import importlib
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+from starlette.routing import Match
+
+# ─────────────────────────────────────────────────────────────
+# Cold start: serve first, import the heavy routers afterwards
+# ─────────────────────────────────────────────────────────────
+# app.main imports only what /health, auth, users and the admin tooling need
+# (FastAPI, pydantic, jose, bcrypt). Routers that pull in algokit_utils,
+# algosdk, requests, google.cloud.firestore or the PyTeal program are listed
+# as deferred: once the lifespan has yielded they are imported one by one on
+# a worker thread, included into the app, then the background services that
+# depend on them are started and the upstream warm-up runs (app.core.warmup).
+#
+# Until that finishes, a request that matches no route yet waits for the
+# loader instead of getting a 404, so a worker can take traffic as soon as it
+# binds. STARTUP_DEFER_ROUTERS=0 loads everything before the lifespan yields
+# (the old behaviour, e.g. for debugging import errors).
+#
+# Garbage collection is paused while the eager modules import (a full
+# collection over half-built module state is pure overhead) and everything
+# alive at each checkpoint is frozen out of later collections.
+#
+# `marks` records each phase in seconds since app.main started importing;
+# GET /api/admin/profile/startup returns them with per-router import times.
+
+STARTUP_DEFER_ROUTERS = os.getenv("STARTUP_DEFER_ROUTERS", "1") == "1"
+
+log = logging.getLogger("startup")
+
+T0 = time.perf_counter()
+marks: dict[str, float] = {}
+
+
+def mark(name: str) -> float:
+    marks[name] = round(time.perf_counter() - T0, 4)
+    return marks[name]
+
+
+def begin() -> None:
+    """Call first thing in app.main."""
+    gc.disable()
+
+
+def checkpoint(name: str) -> None:
+    """Eager imports are done: freeze what they built and resume collection."""
+    mark(name)
+    gc.freeze()
+    gc.enable()
+
+
+class DeferredRouters:
+    def __init__(self):
+        self.modules: tuple[str, ...] = ()
+        self.timings: dict[str, float] = {}  # module -> import seconds
+        self.error: Optional[str] = None
+        self.finished = False  # `then` has returned (or something failed)
+        self._loaded: Optional[asyncio.Event] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded is not None and self._loaded.is_set()
+
+    @property
+    def pending(self) -> bool:
+        """Started and routers not in yet (never started: nothing to wait for)."""
+        return self._loaded is not None and not self._loaded.is_set()
+
+    async def wait(self) -> None:
+        """Until the routers are included (or loading failed)."""
+        if self._loaded is not None:
+            await self._loaded.wait()
+
+    def start(
+        self, app, modules: tuple[str, ...], then: Callable[[], Awaitable[None]]
+    ) -> asyncio.Task:
+        """Import + include each router module, then run `then` (services, warm-up)."""
+        self.modules = modules
+        self._loaded = asyncio.Event()
+        return asyncio.create_task(self._load(app, then), name="deferred-routers")
+
+    async def _load(self, app, then: Callable[[], Awaitable[None]]) -> None:
+        try:
+            try:
+                for name in self.modules:
+                    t = time.perf_counter()
+                    module = await asyncio.to_thread(importlib.import_module, name)
+                    self.timings[name] = round(time.perf_counter() - t, 4)
+                    app.include_router(module.router)
+                app.openapi_schema = None  # rebuilt with the new routes
+                mark("routers_loaded")
+            finally:
+                self._loaded.set()  # held requests go on, even to a 404
+            await then()
+            mark("ready")
+            gc.freeze()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            log.exception("deferred start-up failed")
+            raise
+        finally:
+            self.finished = True
+
+
+loader = DeferredRouters()
+
+
+def report() -> dict:
+    return {
+        "deferred": STARTUP_DEFER_ROUTERS,
+        "marks": dict(marks),
+        "routers": dict(loader.timings),
+        "loaded": loader.loaded,
+        "finished": loader.finished,
+        "error": loader.error,
+    }
+
+
+class DeferredRoutesMiddleware:
+    """
+    Pure ASGI. While the deferred routers are loading, a request no loaded
+    route fully matches is held until they are in; otherwise it's one
+    attribute check.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and loader.pending:
+            routes = scope["app"].router.routes
+            if not any(r.matches(scope)[0] == Match.FULL for r in routes):
+                await loader.wait()
+        await self.app(scope, receive, send)
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Protocol
+
+log = logging.getLogger("tracing")
+
+# ─────────────────────────────────────────────────────────────
+# Lightweight tracing
+# ─────────────────────────────────────────────────────────────
+# A span is {trace_id, span_id, parent_id, name, start, duration_ms, attrs,
+# error}. The current span lives in a ContextVar, so it follows `await`,
+# asyncio tasks (context copied at creation) and asyncio.to_thread; for raw
+# thread pools use `bind(fn)`.
+#
+# Finished spans go to the configured exporters:
+#   memory   last TRACE_MEMORY_TRACES traces, served by /api/traces/{id}
+#   jsonl    one line per span appended to TRACE_JSONL_PATH
+# TRACE_EXPORTERS="" disables recording; spans still nest but nothing is kept.
+#
+# TraceMiddleware opens the root span per request, continues an incoming
+# X-Trace-Id and returns the trace id in the X-Trace-Id response header.
+
+TRACE_EXPORTERS = os.getenv("TRACE_EXPORTERS", "memory")
+TRACE_MEMORY_TRACES = int(os.getenv("TRACE_MEMORY_TRACES", "500"))
+TRACE_MEMORY_SPANS = int(os.getenv("TRACE_MEMORY_SPANS", "1000"))  # per trace
+TRACE_JSONL_PATH = Path(os.getenv("TRACE_JSONL_PATH", ".cache/traces/spans.jsonl"))
+TRACE_HEADER = "x-trace-id"
+
+_TRACE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    parent_id: Optional[str] = None
+    start: float = field(default_factory=time.time)
+    duration_ms: Optional[float] = None
+    attrs: dict = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+# ---------------- exporters ----------------
+class Exporter(Protocol):
+    def export(self, span: Span) -> None: ...
+
+
+class InMemoryExporter:
+    """
+    Bounded: whole traces are evicted oldest first, and a trace keeps at most
+    `max_spans` spans (a caller can keep sending the same X-Trace-Id). Spans
+    past that are dropped and counted, except a first root span.
+    """
+
+    def __init__(
+        self, max_traces: int = TRACE_MEMORY_TRACES, max_spans: int = TRACE_MEMORY_SPANS
+    ):
+        self.max_traces = max_traces
+        self.max_spans = max_spans
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._traces: OrderedDict[str, list[dict]] = OrderedDict()
+        self._dropped: dict[str, int] = {}  # trace id -> spans dropped
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            spans = self._traces.get(span.trace_id)
+            if spans is None:
+                spans = self._traces[span.trace_id] = []
+                while len(self._traces) > self.max_traces:
+                    evicted, _ = self._traces.popitem(last=False)
+                    self._dropped.pop(evicted, None)
+            if len(spans) >= self.max_spans and (
+                span.parent_id is not None or any(s["parent_id"] is None for s in spans)
+            ):
+                self.dropped += 1
+                self._dropped[span.trace_id] = self._dropped.get(span.trace_id, 0) + 1
+                return
+            spans.append(asdict(span))
+
+    def get(self, trace_id: str) -> Optional[list[dict]]:
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            return sorted(spans, key=lambda s: s["start"]) if spans else None
+
+    def recent(self, limit: int = 50) -> list[dict]:
+        """Root span of the newest traces."""
+        with self._lock:
+            items = list(self._traces.items())[-limit:]
+            dropped = {t: self._dropped.get(t, 0) for t, _ in items}
+        out = []
+        for trace_id, spans in reversed(items):
+            root = next((s for s in spans if s["parent_id"] is None), spans[0])
+            out.append({**root, "spans": len(spans), "dropped": dropped[trace_id]})
+        return out
+
+
+class JsonlExporter:
+    def __init__(self, path: Path = TRACE_JSONL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(asdict(span), separators=(",", ":"), default=str)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a") as f:
+                f.write(line + "\n")
+
+
+memory = InMemoryExporter()
+_exporters: list[Exporter] = []
+
+
+def set_exporters(exporters: list[Exporter]) -> None:
+    _exporters[:] = exporters
+
+
+def _configure() -> None:
+    names = {n.strip() for n in TRACE_EXPORTERS.split(",") if n.strip()}
+    exporters: list[Exporter] = []
+    if "memory" in names:
+        exporters.append(memory)
+    if "jsonl" in names:
+        exporters.append(JsonlExporter())
+    set_exporters(exporters)
+
+
+_configure()
+
+
+def _export(s: Span) -> None:
+    for e in _exporters:
+        try:
+            e.export(s)
+        except Exception as err:
+            log.warning("span export failed (%s): %s", type(e).__name__, err)
+
+
+# ---------------- span API ----------------
+def current() -> Optional[Span]:
+    return _current.get()
+
+
+def current_trace_id() -> Optional[str]:
+    s = _current.get()
+    return s.trace_id if s else None
+
+
+@contextmanager
+def span(name: str, trace_id: Optional[str] = None, **attrs) -> Iterator[Span]:
+    """
+    Child of the current span, or a new root (optionally continuing
+    `trace_id`). Exceptions are recorded on the span and propagate.
+    """
+    parent = _current.get()
+    if parent is not None:
+        s = Span(name, parent.trace_id, parent_id=parent.span_id, attrs=attrs)
+    else:
+        s = Span(name, trace_id or uuid.uuid4().hex, attrs=attrs)
+    token = _current.set(s)
+    t0 = time.perf_counter()
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        s.duration_ms = round((time.perf_counter() - t0) * 1000, 3)
+        _current.reset(token)
+        if _exporters:
+            _export(s)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator: run the function (sync or async) inside a span."""
+
+    def deco(fn: Callable) -> Callable:
+        label = name or fn.__qualname__
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                with span(label):
+                    return await fn(*args, **kwargs)
+
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return deco
+
+
+def bind(fn: Callable) -> Callable:
+    """Carry the current context into a ThreadPoolExecutor / Thread target."""
+    ctx = contextvars.copy_context()
+    # a Context can only be entered by one thread at a time: copy per call
+    return lambda *a, **kw: ctx.copy().run(fn, *a, **kw)
+
+
+def valid_trace_id(v: Optional[str]) -> Optional[str]:
+    v = (v or "").strip().lower().replace("-", "")
+    return v if _TRACE_ID.match(v) else None
+
+
+# ---------------- HTTP middleware ----------------
+class TraceMiddleware:
+    """Pure ASGI: root span per request, trace id echoed in X-Trace-Id."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        incoming = None
+        for k, v in scope.get("headers") or ():
+            if k == TRACE_HEADER.encode():
+                incoming = valid_trace_id(v.decode("latin-1"))
+                break
+        method = scope["method"]
+        with span(f"{method} {scope['path']}", trace_id=incoming) as root:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    route = scope.get("route")
+                    if getattr(route, "path", None):
+                        root.name = f"{method} {route.path}"
+                    root.set(status=message["status"])
+                    headers = list(message.get("headers") or [])
+                    headers.append((TRACE_HEADER.encode(), root.trace_id.encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterator, Optional
+
+from algosdk import transaction
+from algokit_utils.models.amount import AlgoAmount
+
+from app.algorand import get_algorand_client, get_account_manager
+from app.core.fees import NORMAL, apply_fee, suggested_params
+
+log = logging.getLogger("treasury")
+
+# ─────────────────────────────────────────────────────────────
+# Config
+# ─────────────────────────────────────────────────────────────
+# The cold reserve is the LocalNet dispenser: it created the USDC ASA and
+# holds the undistributed supply. Hot accounts sign every outbound write and
+# are topped up from the reserve whenever they drop below the low-water mark.
+
+TREASURY_POOL_SIZE = max(1, int(os.getenv("TREASURY_POOL_SIZE", "4")))
+TREASURY_STRATEGY = os.getenv("TREASURY_STRATEGY", "least-loaded").lower()
+
+ALGO_LOW_WATER = int(os.getenv("TREASURY_ALGO_LOW", "1000000"))  # μAlgos
+ALGO_TARGET = int(os.getenv("TREASURY_ALGO_TARGET", "5000000"))
+USDC_LOW_WATER = int(os.getenv("TREASURY_USDC_LOW", "1000000000"))  # min-units
+USDC_TARGET = int(os.getenv("TREASURY_USDC_TARGET", "10000000000"))
+ALGO_CHECK_EVERY = 50  # leases between μAlgo balance checks (fees only)
+
+
+@dataclass
+class HotAccount:
+    name: str
+    address: str
+    private_key: bytes
+    usdc: int = 0  # locally tracked float (min-units), reserved on lease
+    in_flight: int = 0
+    leases: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+def _wait(algod, txid: str) -> None:
+    transaction.wait_for_confirmation(algod, txid, 4)
+
+
+class TreasuryPool:
+    """
+    N hot accounts that sign outbound USDC transfers and registry writes.
+    Accounts are provisioned lazily (created via KMD, funded, opted in to the
+    USDC ASA) and leased round-robin or least-loaded.
+    """
+
+    def __init__(
+        self, size: int = TREASURY_POOL_SIZE, strategy: str = TREASURY_STRATEGY
+    ):
+        self.size = size
+        self.strategy = strategy
+        self.accounts: list[HotAccount] = []
+        self._asset_id: Optional[int] = None
+        self._cursor = itertools.count()
+        self._lock = threading.Lock()
+
+    # ---------------- provisioning ----------------
+    def _reserve(self):
+        return get_account_manager().localnet_dispenser()
+
+    def _provision(self) -> None:
+        with self._lock:
+            if self.accounts:
+                return
+            am = get_account_manager()
+            accounts = []
+            for i in range(self.size):
+                acct = am.from_environment(
+                    name=f"treasury-hot-{i}",
+                    fund_with=AlgoAmount.from_micro_algo(ALGO_TARGET),
+                )
+                accounts.append(
+                    HotAccount(
+                        name=f"treasury-hot-{i}",
+                        address=acct.address,
+                        private_key=acct.signer.private_key,
+                    )
+                )
+            self.accounts = accounts
+            log.info("Provisioned treasury pool of %s hot accounts", len(accounts))
+
+    def _ensure_asset(self, asset_id: int) -> None:
+        if self._asset_id == asset_id:
+            return
+        from app.algorand_usdc import _opt_in_if_needed
+
+        algod = get_algorand_client().client.algod
+        for acct in self.accounts:
+            with acct.lock:
+                _opt_in_if_needed(acct.address, acct.private_key, asset_id)
+                try:
+                    holding = algod.account_asset_info(acct.address, asset_id)
+                    acct.usdc = int(holding.get("asset-holding", {}).get("amount", 0))
+                except Exception:
+                    acct.usdc = 0
+        self._asset_id = asset_id
+
+    # ---------------- top-ups ----------------
+    def _top_up_algo(self, acct: HotAccount) -> None:
+        algod = get_algorand_client().client.algod
+        bal = algod.account_info(acct.address).get("amount", 0)
+        if bal >= ALGO_LOW_WATER:
+            return
+        reserve = self._reserve()
+        sp = suggested_params(algod)
+        pay = transaction.PaymentTxn(
+            sender=reserve.address, sp=sp, receiver=acct.address, amt=ALGO_TARGET - bal
+        )
+        apply_fee(algod, pay, NORMAL)
+        txid = algod.send_transaction(pay.sign(reserve.signer.private_key))
+        _wait(algod, txid)
+        log.info(
+            "Topped up %s with %s μAlgos (tx %s)", acct.name, ALGO_TARGET - bal, txid
+        )
+
+    def _top_up_usdc(self, acct: HotAccount, needed: int) -> None:
+        """Caller holds acct.lock. Refill so the float covers `needed` plus the low-water mark."""
+        if acct.usdc - needed >= USDC_LOW_WATER:
+            return
+        algod = get_algorand_client().client.algod
+        reserve = self._reserve()
+        amt = max(USDC_TARGET, needed + USDC_LOW_WATER) - acct.usdc
+        sp = suggested_params(algod)
+        xfer = transaction.AssetTransferTxn(
+            sender=reserve.address,
+            sp=sp,
+            receiver=acct.address,
+            amt=amt,
+            index=self._asset_id,
+        )
+        apply_fee(algod, xfer, NORMAL)
+        txid = algod.send_transaction(xfer.sign(reserve.signer.private_key))
+        _wait(algod, txid)
+        acct.usdc += amt
+        log.info("Topped up %s with %s USDC min-units (tx %s)", acct.name, amt, txid)
+        self._top_up_algo(acct)
+
+    # ---------------- selection ----------------
+    def _pick(self) -> HotAccount:
+        with self._lock:
+            start = next(self._cursor) % len(self.accounts)
+            ordered = self.accounts[start:] + self.accounts[:start]
+            if self.strategy == "round-robin":
+                acct = ordered[0]
+            else:
+                acct = min(ordered, key=lambda a: a.in_flight)
+            acct.in_flight += 1
+            acct.leases += 1
+            return acct
+
+    @contextmanager
+    def lease(
+        self, asset_id: Optional[int] = None, usdc_needed: int = 0
+    ) -> Iterator[HotAccount]:
+        """
+        Lease a hot account for one outbound write.
+        With `asset_id`, the account is opted in and `usdc_needed` min-units are
+        reserved from its float (refilled from the cold reserve if short). The
+        reservation is returned if the block raises.
+        """
+        self._provision()
+        if asset_id is not None:
+            self._ensure_asset(asset_id)
+        acct = self._pick()
+        reserved = 0
+        try:
+            if usdc_needed:
+                with acct.lock:
+                    self._top_up_usdc(acct, usdc_needed)
+                    acct.usdc -= usdc_needed
+                    reserved = usdc_needed
+            elif acct.leases % ALGO_CHECK_EVERY == 0:
+                with acct.lock:
+                    self._top_up_algo(acct)
+            yield acct
+        except BaseException:
+            if reserved:
+                with acct.lock:
+                    acct.usdc += reserved
+            raise
+        finally:
+            with self._lock:
+                acct.in_flight -= 1
+
+    def snapshot(self) -> list[dict]:
+        return [
+            {
+                "name": a.name,
+                "address": a.address,
+                "usdc": a.usdc,
+                "inFlight": a.in_flight,
+                "leases": a.leases,
+            }
+            for a in self.accounts
+        ]
+
+
+@lru_cache
+def get_treasury_pool() -> TreasuryPool:
+    return TreasuryPool()
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import hashlib
 import logging
+import threading
 import time
+from typing import Optional
 
 from algosdk import encoding as algo_encoding, mnemonic, transaction, logic
 
@@ -11,8 +13,12 @@ from app.algorand import (
     get_account_manager,
     get_or_create_local_account,
 )
+from app.core import tracing
+from app.core.chain import follower
 from app.core.crypto import encrypt_str, decrypt_str
+from app.core.fees import BACKGROUND, NORMAL, apply_fee, fee_for, suggested_params
 from app.core.firebase import get_firestore_client
+from app.core.treasury import get_treasury_pool
 from hackathon import (
     ensure_deployed,
     register_user as _register_user,  # write helper
@@ -21,6 +27,8 @@ from hackathon import (
 
 log = logging.getLogger("wallet")
 
+REGISTRY_CALL_SIZE = 300  # bytes; signed register_user call with box ref
+
 USERS = lambda: get_firestore_client().collection("users")
 SYSDOC = lambda: get_firestore_client().collection("__sys").document("algorand")
 
@@ -64,35 +72,53 @@ def _wait_for_confirmation(
     raise TimeoutError(f"Transaction {txid} not confirmed after {timeout_rounds} polls")
 
 
+_registry_app_id: Optional[int] = None  # resolved once per process
+_registry_lock = threading.Lock()
+
+
+def _resolve_registry_app_id(algod, dispenser) -> int:
+    global _registry_app_id
+    if _registry_app_id is not None:
+        return _registry_app_id
+    with _registry_lock:  # one deploy even if the first callers race
+        if _registry_app_id is not None:
+            return _registry_app_id
+
+        # 1) Reuse if we already have one recorded
+        sysdoc_ref = SYSDOC()
+        sysdoc = sysdoc_ref.get().to_dict() or {}
+        app_id = sysdoc.get("appId")
+
+        if not app_id:
+            # 2) First time: deploy once and persist appId
+            app_id = ensure_deployed(
+                algod_client=algod,
+                deployer_addr=dispenser.address,
+                deployer_sk=dispenser.signer.private_key,
+            )
+            try:
+                sysdoc_ref.set({"appId": app_id, "updatedAt": _now()}, merge=True)
+            except Exception:
+                pass
+            log.info("Deployed new WalletRegistry app_id=%s", app_id)
+        else:
+            log.info("Using existing WalletRegistry app_id=%s", app_id)
+        _registry_app_id = int(app_id)
+        return _registry_app_id
+
+
 def _ensure_registry_app_id() -> int:
     """
     Get the single WalletRegistry app_id, creating once if missing,
-    then ensure the app account is funded for box writes.
+    then ensure the app account is funded for box writes. The id is kept
+    in memory after the first lookup; the funding check runs every time.
     """
     algo = get_algorand_client()
     algod = algo.client.algod
     am = get_account_manager()
     dispenser = am.localnet_dispenser()
 
-    # 1) Reuse if we already have one recorded
-    sysdoc_ref = SYSDOC()
-    sysdoc = sysdoc_ref.get().to_dict() or {}
-    app_id = sysdoc.get("appId")
-
-    if not app_id:
-        # 2) First time: deploy once and persist appId
-        app_id = ensure_deployed(
-            algod_client=algod,
-            deployer_addr=dispenser.address,
-            deployer_sk=dispenser.signer.private_key,
-        )
-        try:
-            sysdoc_ref.set({"appId": app_id, "updatedAt": _now()}, merge=True)
-        except Exception:
-            pass
-        log.info("Deployed new WalletRegistry app_id=%s", app_id)
-    else:
-        log.info("Using existing WalletRegistry app_id=%s", app_id)
+    app_id = _resolve_registry_app_id(algod, dispenser)
 
     # 3) Ensure the app account is funded (covers MBR + one box)
     from algosdk import logic, transaction
@@ -103,12 +129,11 @@ def _ensure_registry_app_id() -> int:
 
     if bal < target:
         fund_amt = target - bal
-        sp = algod.suggested_params()
-        sp.flat_fee = True
-        sp.fee = max(sp.min_fee, 1_000)
+        sp = suggested_params(algod)
         pay = transaction.PaymentTxn(
             sender=dispenser.address, sp=sp, receiver=app_addr, amt=fund_amt
         )
+        apply_fee(algod, pay, NORMAL)
         stx = pay.sign(dispenser.signer.private_key)
         txid = algod.send_transaction(stx)
         _wait_for_confirmation(algod, txid)
@@ -128,26 +153,27 @@ def _ensure_registry_app_id() -> int:
 # -----------------------------
 # On-chain registry helpers
 # -----------------------------
-def register_user_on_chain(email: str, wallet_addr: str) -> str:
+def register_user_on_chain(email: str, wallet_addr: str, priority: str = NORMAL) -> str:
     """
     Registers sha256(email) -> wallet_addr in WalletRegistry boxes.
-    Uses the helper in the contracts package (handles fees/boxes). Returns txid.
+    Uses the helper in the contracts package (handles fees/boxes), signed by a
+    leased treasury hot account. Returns txid.
     """
     algo = get_algorand_client()
     algod = algo.client.algod
-    am = get_account_manager()
-    admin = am.localnet_dispenser()
     app_id = _ensure_registry_app_id()
 
     email_hash = _email_sha256(email)
-    txid = _register_user(
-        algod,  # algod_client
-        app_id,  # app_id
-        admin.address,  # caller addr
-        admin.signer.private_key,  # caller sk
-        email_hash,  # 32B email hash
-        _addr_to_32(wallet_addr),  # 32B raw addr
-    )
+    with get_treasury_pool().lease() as hot:
+        txid = _register_user(
+            algod,  # algod_client
+            app_id,  # app_id
+            hot.address,  # caller addr
+            hot.private_key,  # caller sk
+            email_hash,  # 32B email hash
+            _addr_to_32(wallet_addr),  # 32B raw addr
+            fee=fee_for(algod, priority, REGISTRY_CALL_SIZE),
+        )
     log.info("Registered on-chain %s -> %s (tx %s)", email, wallet_addr, txid)
     return txid
 
@@ -159,8 +185,11 @@ def get_wallet_from_chain(email: str) -> Optional[str]:
     """
     algo = get_algorand_client()
     algod = algo.client.algod
-    app_id = _ensure_registry_app_id()
     email_hash = _email_sha256(email)
+    seen = follower.views.wallet_for(email_hash.hex())
+    if seen:
+        return seen  # materialized by the chain follower
+    app_id = _ensure_registry_app_id()
     try:
         addr = _get_wallet(algod, app_id, email_hash)
         log.info("On-chain lookup %s -> %s", email, addr)
@@ -173,6 +202,7 @@ def get_wallet_from_chain(email: str) -> Optional[str]:
 # -----------------------------
 # Public API
 # -----------------------------
+@tracing.traced("wallet.get_or_create")
 def get_or_create_user_wallet(email: str) -> dict:
     """
     Ensures a LocalNet wallet exists for this user.
@@ -183,15 +213,20 @@ def get_or_create_user_wallet(email: str) -> dict:
     """
     email_n = _email_norm(email)
     doc_ref = USERS().document(email_n)
-    snap = doc_ref.get()
+    with tracing.span("wallet.load_user"):
+        snap = doc_ref.get()
     data = snap.to_dict() or {}
 
     # Already provisioned?
     if data.get("walletAddress") and data.get("walletMnemonicEnc"):
-        onchain_addr = get_wallet_from_chain(email_n)
+        with tracing.span("wallet.registry_lookup"):
+            onchain_addr = get_wallet_from_chain(email_n)
         if onchain_addr is None or onchain_addr != data["walletAddress"]:
             try:
-                register_user_on_chain(email_n, data["walletAddress"])
+                with tracing.span("wallet.registry_register", background=True):
+                    register_user_on_chain(
+                        email_n, data["walletAddress"], priority=BACKGROUND
+                    )
                 doc_ref.set({"walletRegistered": True, "updatedAt": _now()}, merge=True)
             except Exception as e:
                 doc_ref.set(
@@ -211,7 +246,8 @@ def get_or_create_user_wallet(email: str) -> dict:
         }
 
     # Create/fetch from AlgoKit AccountManager (v3)
-    acct = get_or_create_local_account(email_n)  # has .address and .signer
+    with tracing.span("wallet.kmd_account"):
+        acct = get_or_create_local_account(email_n)  # has .address and .signer
     log.info("Created/fetched local account for %s: %s", email_n, acct.address)
 
     # Derive mnemonic from private key; encrypt for storage
@@ -232,7 +268,8 @@ def get_or_create_user_wallet(email: str) -> dict:
     # Register on-chain mapping (best-effort)
     on_chain_ok = False
     try:
-        register_user_on_chain(email_n, acct.address)
+        with tracing.span("wallet.registry_register"):
+            register_user_on_chain(email_n, acct.address)
         on_chain_ok = True
         doc_sys = SYSDOC().get().to_dict() or {}
         if "appId" in doc_sys:
@@ -243,7 +280,8 @@ def get_or_create_user_wallet(email: str) -> dict:
         update["walletRegistered"] = False
         update["walletRegistryError"] = str(e)
 
-    doc_ref.set(update, merge=True)
+    with tracing.span("wallet.save_user"):
+        doc_ref.set(update, merge=True)
 
     return {
         "address": acct.address,
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from app.core import tracing
+
+# ─────────────────────────────────────────────────────────────
+# Warm-up: resolve upstream state before the worker reports ready
+# ─────────────────────────────────────────────────────────────
+# Runs once from the lifespan, after the deferred routers are in (see
+# app.core.startup). Each step pays for something the first real request
+# would otherwise pay for:
+#   firestore    client construction + one read (gRPC channel, credentials)
+#   google_oidc  OIDC discovery document + JWKS (cached by authlib)
+#   paypal       OAuth token (cached until ~2 min before expiry) and the
+#                session's connection pool
+#   binance      tradable symbol probe (cached BINANCE_SYMBOL_TTL) and the
+#                session's connection pool
+#   registry     WalletRegistry app id (deploys it on an empty LocalNet)
+#   usdc         demo USDC ASA id (creates it on an empty LocalNet)
+# Steps run concurrently on the threadpool; one waits only for the steps it
+# `needs`. Each is bounded by WARMUP_STEP_TIMEOUT_S. A failed or timed-out
+# step is recorded but does not hold readiness: the first request that needs
+# it takes the same path and surfaces the error as it always did.
+#
+# GET /ready reports ready once the deferred routers are loaded and every
+# step has finished; /health stays a plain liveness check.
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+WARMUP_STEP_TIMEOUT_S = float(os.getenv("WARMUP_STEP_TIMEOUT_S", "30"))
+
+log = logging.getLogger("warmup")
+
+
+@dataclass
+class Step:
+    name: str
+    fn: Callable[[], object]
+    needs: tuple[str, ...] = ()
+    skip: Callable[[], Optional[str]] = lambda: None  # reason, or None to run
+    state: str = "pending"  # running / ok / failed / timeout / skipped
+    seconds: Optional[float] = None
+    detail: Optional[str] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def as_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "seconds": self.seconds,
+            "detail": self.detail,
+        }
+
+
+# ---------------- steps ----------------
+def _firestore():
+    from app.core.firebase import get_firestore_client
+
+    get_firestore_client().collection("__sys").document("algorand").get()
+
+
+async def _google_oidc():
+    from app.routers.auth import google_oauth
+
+    jwks = await google_oauth().fetch_jwk_set()
+    return f"{len(jwks.get('keys', []))} keys"
+
+
+def _no_google() -> Optional[str]:
+    from app.sim import SIMULATION
+
+    if SIMULATION:
+        return "SIMULATION"
+    if not os.getenv("GOOGLE_OAUTH_CLIENT_ID"):
+        return "GOOGLE_OAUTH_CLIENT_ID not set"
+    return None
+
+
+def _paypal():
+    from app.utils.paypal import _get_app_token
+
+    _get_app_token()
+
+
+def _binance():
+    from app.binance import find_usdcusdt_symbol
+
+    return find_usdcusdt_symbol()
+
+
+def _registry():
+    from app.core.wallet import _ensure_registry_app_id
+
+    return f"app {_ensure_registry_app_id()}"
+
+
+def _usdc():
+    from app.algorand_usdc import _ensure_usdc_dev
+
+    return f"asset {_ensure_usdc_dev()}"
+
+
+def default_steps() -> list[Step]:
+    return [
+        Step("firestore", _firestore),
+        Step("google_oidc", _google_oidc, skip=_no_google),
+        Step("paypal", _paypal),
+        Step("binance", _binance),
+        Step("registry", _registry, needs=("firestore",)),
+        Step("usdc", _usdc, needs=("firestore",)),
+    ]
+
+
+class Warmup:
+    def __init__(self):
+        self.steps: dict[str, Step] = {}
+        self.seconds: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.seconds is not None
+
+    async def run(self, steps: Optional[list[Step]] = None) -> None:
+        t0 = time.perf_counter()
+        if not WARMUP_ENABLED:
+            self.seconds = 0.0
+            return
+        self.steps = {s.name: s for s in steps or default_steps()}
+        with tracing.span("warmup"):
+            await asyncio.gather(*(self._run_step(s) for s in self.steps.values()))
+        self.seconds = round(time.perf_counter() - t0, 4)
+        failed = [
+            s.name for s in self.steps.values() if s.state in ("failed", "timeout")
+        ]
+        log.info(
+            "warm-up done in %.2fs%s",
+            self.seconds,
+            f", failed: {failed}" if failed else "",
+        )
+
+    async def _run_step(self, step: Step) -> None:
+        for name in step.needs:
+            await self.steps[name].done.wait()
+        t = time.perf_counter()
+        try:
+            reason = step.skip()
+            if reason:
+                step.state, step.detail = "skipped", reason
+                return
+            step.state = "running"
+            with tracing.span(f"warmup.{step.name}"):
+                call = (
+                    step.fn()
+                    if inspect.iscoroutinefunction(step.fn)
+                    else asyncio.to_thread(step.fn)
+                )
+                out = await asyncio.wait_for(call, WARMUP_STEP_TIMEOUT_S)
+            step.state = "ok"
+            step.detail = out if isinstance(out, str) else None
+        except asyncio.TimeoutError:
+            step.state, step.detail = "timeout", f"> {WARMUP_STEP_TIMEOUT_S}s"
+            log.warning("warm-up step %s timed out", step.name)
+        except Exception as e:
+            step.state, step.detail = "failed", f"{type(e).__name__}: {e}"[:300]
+            log.warning("warm-up step %s failed: %s", step.name, step.detail)
+        finally:
+            step.seconds = round(time.perf_counter() - t, 4)
+            step.done.set()
+
+    def status(self) -> dict:
+        return {
+            "enabled": WARMUP_ENABLED,
+            "done": self.done,
+            "seconds": self.seconds,
+            "steps": {name: s.as_dict() for name, s in self.steps.items()},
+        }
+
+
+warmup = Warmup()
@@ -1,32 +1,118 @@
 # app/main.py
 from __future__ import annotations
 
-from pathlib import Path
-import sys as _sys
+import os
+from contextlib import AsyncExitStack, asynccontextmanager
 
-_SMART_CONTRACTS_ROOT = Path(__file__).resolve().parents[2]
-_HACKATHON_SRC = _SMART_CONTRACTS_ROOT / "hackathon" / "src"
-if str(_HACKATHON_SRC) not in _sys.path:
-    _sys.path.insert(0, str(_HACKATHON_SRC))
-# --------------------------------------------------------------------
+from app.core import startup
+
+startup.begin()
 
-import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
+from starlette.responses import JSONResponse
 from dotenv import load_dotenv
 
-# Routers (these may import from `hackathon`, which now resolves)
+# Routers needed to serve /health, auth and admin tooling; the rest (and
+# everything that pulls in algosdk / algokit_utils / pyteal / requests) load
+# after startup, see app.core.startup
+from app import sim
 from app.routers import waiting_list, auth
 from app.routers import user as user_router
-from app.routers import paypal as paypal_api_router
-from app.routers import paypal_link as paypal_link_api
-from app.routers import ramp as ramp_router
-from app.routers import tx as tx_router
+from app.routers import traces as traces_router
+from app.routers import profiler as profiler_router
+from app.routers import faults as faults_router
+from app.core.metrics import MetricsMiddleware
+from app.core.tracing import TraceMiddleware
+from app.core.profiler import RouteProfilerMiddleware
+from app.core.warmup import warmup
+
+DEFERRED_ROUTERS = (
+    "app.routers.paypal",
+    "app.routers.paypal_link",
+    "app.routers.ramp",
+    "app.routers.tx",
+    "app.routers.market",
+    "app.routers.wallet",
+    "app.routers.push",
+    "app.routers.disburse",
+    "app.routers.metrics",
+)
 
 load_dotenv()
 
-app = FastAPI(title="Hackathon Backend")
+if sim.SIMULATION:
+    # Ledger / exchange / PayPal / document store all in memory (app.sim)
+    sim.install()
+
+
+def _algod():
+    from app.algorand import get_algorand_client
+
+    return get_algorand_client().client.algod
+
+
+# Stop callbacks of the services that did start, run in reverse order
+_services = AsyncExitStack()
+
+
+async def _start_services():
+    from app.algorand_usdc import _ensure_usdc_dev
+    from app.core.chain import follower as chain_follower
+    from app.core.internal_ledger import internal_ledger
+    from app.core.ledger import ledger
+    from app.routers import market as market_router
+    from app.routers import ramp as ramp_router
+    from app.routers import wallet as wallet_router
+
+    # Background ramp workers (resume unfinished jobs from Firestore)
+    await ramp_router.ramp_jobs.start()
+    _services.push_async_callback(ramp_router.ramp_jobs.stop)
+    # Kline backfill + incremental refresh for the price chart
+    market_router.history.start()
+    _services.push_async_callback(market_router.history.stop)
+    # Block follower: materialized history / opt-in / registry views
+    chain_follower.subscribe(ledger.on_chain_event)
+    chain_follower.subscribe(internal_ledger.on_chain_event)
+    chain_follower.start()
+    _services.callback(chain_follower.stop)
+    # Ledger projection: write-behind to Firestore + periodic reconciliation
+    ledger.start(_algod, _ensure_usdc_dev)
+    _services.push_async_callback(ledger.stop)
+    # Internal transfers: periodic net settlement on chain
+    internal_ledger.start(wallet_router.settle_kwargs)
+    _services.push_async_callback(internal_ledger.stop)
+
+
+async def _after_load():
+    await _start_services()
+    # Firestore / OIDC / PayPal / Binance / registry + USDC ids, concurrently
+    await warmup.run()
+
+
+async def _stop_services():
+    # only what started: a start-up that failed partway still stops the rest
+    await _services.aclose()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup.mark("lifespan")
+    loading = startup.loader.start(app, DEFERRED_ROUTERS, _after_load)
+    try:
+        if not startup.STARTUP_DEFER_ROUTERS:
+            await loading
+        yield
+    finally:
+        try:
+            await loading
+        except Exception:
+            pass  # logged by the loader
+        await _stop_services()
+
+
+app = FastAPI(title="Hackathon Backend", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -35,6 +121,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id"],
 )
 
 # Session for OAuth state
@@ -48,17 +135,37 @@ app.add_middleware(
     max_age=60 * 60 * 24,
 )
 
+# Hold requests for not-yet-loaded routers until they are in
+app.add_middleware(startup.DeferredRoutesMiddleware)
+# Admin-armed sampling of requests to one route (no-op unless armed)
+app.add_middleware(RouteProfilerMiddleware)
+# Request root span + X-Trace-Id response header
+app.add_middleware(TraceMiddleware)
+# Per-route latency histograms (outermost, so it times the whole stack)
+app.add_middleware(MetricsMiddleware)
+
 
 @app.get("/health")
 def health():
     return {"ok": True}
 
 
-# Routers
+@app.get("/ready")
+def ready():
+    """
+    Readiness, not liveness: 503 until routers are loaded and warm-up is done.
+    Public, so just the flag; details are at /api/admin/profile/startup.
+    """
+    ok = startup.loader.finished and not startup.loader.error and warmup.done
+    return JSONResponse({"ready": ok}, status_code=200 if ok else 503)
+
+
+# Routers (deferred ones are included by the lifespan)
 app.include_router(waiting_list.router)
 app.include_router(auth.router)
 app.include_router(user_router.router)
-app.include_router(paypal_api_router.router)
-app.include_router(paypal_link_api.router)
-app.include_router(ramp_router.router)
-app.include_router(tx_router.router)
+app.include_router(traces_router.router)
+app.include_router(profiler_router.router)
+app.include_router(faults_router.router)
+
+startup.checkpoint("app")
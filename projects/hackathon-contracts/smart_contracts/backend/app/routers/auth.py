@@ -1,19 +1,19 @@
 # app/routers/auth.py
 from __future__ import annotations
-from app.core.wallet import get_or_create_user_wallet
 
 import os
 import time
 import urllib.parse
+from functools import lru_cache
 from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Request, Response, Depends
 from starlette.responses import RedirectResponse, JSONResponse
-from authlib.integrations.starlette_client import OAuth
 from jose import jwt, JWTError
 from pydantic import BaseModel, EmailStr, Field
 import bcrypt
 
+from app.core import tracing
 from app.core.firebase import init_firebase_admin, get_firestore_client
 
 router = APIRouter(tags=["auth"])
@@ -29,18 +29,38 @@ SESSION_SECRET = os.getenv("SESSION_SECRET", "dev-secret")
 SESSION_COOKIE_NAME = "session"
 SESSION_COOKIE_DOMAIN = os.getenv("SESSION_COOKIE_DOMAIN")  # optional in dev
 SESSION_TTL_SECONDS = 60 * 60 * 24 * 7  # 7 days
+ADMIN_EMAILS = {
+    e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()
+}  # may call operator endpoints (bulk disbursement, ...)
+
 
 # -------------------------------------------------------------------
 # OAuth client (Google OpenID Connect)
 # -------------------------------------------------------------------
-oauth = OAuth()
-oauth.register(
-    name="google",
-    server_metadata_url="https://accounts.google.com/.well-known/openid-configuration",
-    client_id=os.getenv("GOOGLE_OAUTH_CLIENT_ID"),
-    client_secret=os.getenv("GOOGLE_OAUTH_CLIENT_SECRET"),
-    client_kwargs={"scope": "openid email profile"},
-)
+@lru_cache(maxsize=1)
+def google_oauth():
+    """Built on first use: authlib's starlette client is slow to import."""
+    from authlib.integrations.starlette_client import OAuth
+
+    oauth = OAuth()
+    oauth.register(
+        name="google",
+        server_metadata_url="https://accounts.google.com/.well-known/openid-configuration",
+        client_id=os.getenv("GOOGLE_OAUTH_CLIENT_ID"),
+        client_secret=os.getenv("GOOGLE_OAUTH_CLIENT_SECRET"),
+        client_kwargs={"scope": "openid email profile"},
+    )
+    return oauth.google
+
+
+# -------------------------------------------------------------------
+# Wallet provisioning
+# -------------------------------------------------------------------
+def get_or_create_user_wallet(email: str) -> dict:
+    # app.core.wallet pulls in algokit_utils / algosdk; import on first sign-in
+    from app.core.wallet import get_or_create_user_wallet as provision
+
+    return provision(email)
 
 
 # -------------------------------------------------------------------
@@ -67,10 +87,11 @@ def create_session_token(
         "iat": now,
         "exp": now + SESSION_TTL_SECONDS,
         "email": email,
-        "sub": sub,
         "name": name,
         "picture": picture,
     }
+    if sub:  # jose rejects a null "sub" on decode (password-only users)
+        payload["sub"] = sub
     return jwt.encode(payload, SESSION_SECRET, algorithm="HS256")
 
 
@@ -108,6 +129,14 @@ def get_current_user(request: Request) -> Optional[dict]:
         return None
 
 
+def require_admin(user: Optional[dict] = Depends(get_current_user)) -> dict:
+    if not user:
+        raise HTTPException(401, "not authenticated")
+    if (user.get("email") or "").lower() not in ADMIN_EMAILS:
+        raise HTTPException(403, "admin only")
+    return user
+
+
 # -------------------------------------------------------------------
 # Models for email/password
 # -------------------------------------------------------------------
@@ -134,25 +163,28 @@ def password_signup(payload: PasswordSignupIn):
     email = payload.email.lower().strip()
 
     doc_ref = user_doc(email)
-    snap = doc_ref.get()
+    with tracing.span("auth.load_user"):
+        snap = doc_ref.get()
     if snap.exists:
         raise HTTPException(status_code=409, detail="User already exists")
 
-    pw_hash = bcrypt.hashpw(
-        payload.password.encode("utf-8"), bcrypt.gensalt(rounds=12)
-    ).decode("utf-8")
+    with tracing.span("auth.hash_password"):
+        pw_hash = bcrypt.hashpw(
+            payload.password.encode("utf-8"), bcrypt.gensalt(rounds=12)
+        ).decode("utf-8")
     now = time.time()
 
-    doc_ref.set(
-        {
-            "email": email,
-            "passwordHash": pw_hash,
-            "provider": "password",
-            "createdAt": now,
-            "updatedAt": now,
-        },
-        merge=False,
-    )
+    with tracing.span("auth.create_user"):
+        doc_ref.set(
+            {
+                "email": email,
+                "passwordHash": pw_hash,
+                "provider": "password",
+                "createdAt": now,
+                "updatedAt": now,
+            },
+            merge=False,
+        )
 
     # 🔐 Ensure wallet exists (creates + encrypts mnemonic + registers on-chain)
     try:
@@ -183,15 +215,18 @@ def password_login(payload: PasswordLoginIn):
     init_firebase_admin()
     email = payload.email.lower().strip()
 
-    snap = user_doc(email).get()
+    with tracing.span("auth.load_user"):
+        snap = user_doc(email).get()
     if not snap.exists:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     data = snap.to_dict() or {}
     stored_hash = (data.get("passwordHash") or "").encode("utf-8")
-    if not stored_hash or not bcrypt.checkpw(
-        payload.password.encode("utf-8"), stored_hash
-    ):
+    with tracing.span("auth.check_password"):
+        ok = bool(stored_hash) and bcrypt.checkpw(
+            payload.password.encode("utf-8"), stored_hash
+        )
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     # 🔐 Backfill wallet if missing
@@ -235,7 +270,7 @@ async def google_login(request: Request, next: Optional[str] = None):
 
     # MUST be exactly the value registered in Google Console (no query params)
     cb = REDIRECT_URI
-    return await oauth.google.authorize_redirect(request, cb)
+    return await google_oauth().authorize_redirect(request, cb)
 
 
 @router.get("/auth/google/callback")
@@ -245,10 +280,12 @@ async def google_callback(request: Request):
     Also ensures the user has a wallet provisioned/registered.
     """
     try:
-        token = await oauth.google.authorize_access_token(request)
+        with tracing.span("auth.google_token"):
+            token = await google_oauth().authorize_access_token(request)
         userinfo = token.get("userinfo")
         if not userinfo:
-            userinfo = await oauth.google.userinfo(token=token)
+            with tracing.span("auth.google_userinfo"):
+                userinfo = await google_oauth().userinfo(token=token)
 
         email = (userinfo.get("email") or "").lower().strip()
         sub = userinfo.get("sub")
@@ -259,17 +296,18 @@ async def google_callback(request: Request):
             raise HTTPException(status_code=400, detail="No email from provider")
 
         init_firebase_admin()
-        users_coll().document(email).set(
-            {
-                "email": email,
-                "googleSub": sub,
-                "name": name,
-                "picture": picture,
-                "updatedAt": time.time(),
-                "provider": "google",
-            },
-            merge=True,
-        )
+        with tracing.span("auth.upsert_user"):
+            users_coll().document(email).set(
+                {
+                    "email": email,
+                    "googleSub": sub,
+                    "name": name,
+                    "picture": picture,
+                    "updatedAt": time.time(),
+                    "provider": "google",
+                },
+                merge=True,
+            )
 
         # 🔐 Ensure wallet exists (creates + encrypts mnemonic + registers on-chain)
         try:
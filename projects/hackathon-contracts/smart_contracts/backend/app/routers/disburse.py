@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from app.algorand import get_algorand_client
+from app.algorand_usdc import _ensure_usdc_dev, _units_to_min_units, is_opted_in
+from app.core.chain import follower
+from app.core.disburse import (
+    CONFIRMED,
+    FAILED,
+    REJECTED,
+    UNKNOWN,
+    parse_rows,
+    resolve,
+    run_groups,
+)
+from app.core.fees import NORMAL, apply_group_fee, suggested_params
+from app.core.ledger import ledger
+from app.core.treasury import get_treasury_pool
+from app.core.wallet import get_wallet_from_chain
+from app.routers.auth import require_admin
+
+router = APIRouter(prefix="/api/disburse", tags=["disburse"])
+
+
+def _line(obj: dict) -> bytes:
+    return (json.dumps(obj, separators=(",", ":")) + "\n").encode()
+
+
+@router.post("")
+async def bulk_disburse(request: Request, admin=Depends(require_admin)):
+    """
+    Pay many wallets in one call. Body: CSV (`recipient,amount`, header
+    optional) or NDJSON ({"email"|"address", "amount"}), amounts in USDC.
+    Response: NDJSON, one line per row (rejected rows first, then transfers
+    as their groups confirm) and a final {"summary": ...} line.
+    """
+    try:
+        rows = await parse_rows(request.stream())
+    except ValueError as e:
+        raise HTTPException(413, str(e))
+    if not rows:
+        raise HTTPException(400, "no rows")
+
+    algod = get_algorand_client().client.algod
+    asset_id = await asyncio.to_thread(_ensure_usdc_dev)
+    await asyncio.to_thread(
+        resolve,
+        rows,
+        asset_id,
+        follower.views.wallet_for,
+        get_wallet_from_chain,
+        is_opted_in,
+        _units_to_min_units,
+    )
+    good = [r for r in rows if not r.error]
+
+    def results():
+        counts = {CONFIRMED: 0, REJECTED: 0, FAILED: 0, UNKNOWN: 0}
+        for r in rows:
+            if r.error:
+                counts[REJECTED] += 1
+                yield _line(r.result(REJECTED))
+        if good:
+            total = sum(r.min_units for r in good)
+            committed = 0  # sent and not known to have failed
+            disconnected = False
+
+            def submitted(txid, r):
+                nonlocal committed
+                committed += r.min_units
+                ledger.submitted(txid, hot.address, r.address, r.min_units)
+
+            with get_treasury_pool().lease(asset_id, usdc_needed=total) as hot:
+                try:
+                    for res in run_groups(
+                        good,
+                        algod,
+                        asset_id,
+                        hot.address,
+                        hot.private_key,
+                        lambda: suggested_params(algod),
+                        lambda txns: apply_group_fee(algod, txns, NORMAL),
+                        on_submitted=submitted,
+                        on_confirmed=lambda txid, rnd, r: ledger.confirmed(txid, rnd),
+                    ):
+                        counts[res["status"]] += 1
+                        if res["status"] == FAILED and res.get("txid"):
+                            committed -= _units_to_min_units(res["amount"])
+                        yield _line(res)
+                except GeneratorExit:
+                    # client went away: nothing more is sent; what already
+                    # was may still land and stays reserved
+                    disconnected = True
+                except BaseException:
+                    with hot.lock:
+                        hot.usdc -= committed  # lease() gives back all of `total`
+                    raise
+                with hot.lock:
+                    hot.usdc += total - committed  # give back what never left
+            if disconnected:
+                return
+        yield _line({"summary": {"rows": len(rows), **counts}})
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
@@ -0,0 +1,75 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+
+from app.core.faults import (
+    FAULTS_ENABLED,
+    Fault,
+    FaultsDisabled,
+    LatencySpec,
+    injector,
+)
+from app.routers.auth import require_admin
+
+router = APIRouter(
+    prefix="/api/admin/faults",
+    tags=["faults"],
+    dependencies=[Depends(require_admin)],
+)
+
+Upstream = Literal["binance", "paypal", "algod", "indexer", "kmd", "firestore"]
+
+
+class LatencyIn(BaseModel):
+    dist: Literal["fixed", "uniform", "normal", "lognormal", "pareto"] = "fixed"
+    ms: float = Field(0, ge=0)
+    jitter_ms: float = Field(0, ge=0)
+    sigma: float = Field(1.0, gt=0)
+    alpha: float = Field(1.5, gt=0)
+
+
+class FaultIn(BaseModel):
+    op: str = "*"  # glob over the op label, e.g. "GET /api/v3/depth", "doc.*"
+    latency: Optional[LatencyIn] = None
+    latency_rate: float = Field(1.0, ge=0, le=1)
+    error_rate: float = Field(0.0, ge=0, le=1)
+    blackhole_rate: float = Field(0.0, ge=0, le=1)
+    blackhole_s: float = Field(30.0, gt=0, le=120)
+    ttl_s: Optional[float] = Field(None, gt=0, le=86400)
+
+
+@router.get("")
+def list_faults():
+    return {"enabled": FAULTS_ENABLED, "faults": injector.list()}
+
+
+@router.put("/{upstream}")
+def set_fault(upstream: Upstream, body: FaultIn):
+    """Add or replace the rule for (upstream, op)."""
+    fault = Fault(
+        upstream=upstream,
+        op=body.op,
+        latency=LatencySpec(**body.latency.model_dump()) if body.latency else None,
+        latency_rate=body.latency_rate,
+        error_rate=body.error_rate,
+        blackhole_rate=body.blackhole_rate,
+        blackhole_s=body.blackhole_s,
+    )
+    try:
+        return injector.set(fault, body.ttl_s).as_dict()
+    except FaultsDisabled as e:
+        raise HTTPException(403, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
+@router.delete("/{upstream}")
+def clear_upstream(upstream: Upstream, op: Optional[str] = None):
+    """Drop the rule for one op, or every rule for the upstream."""
+    return {"cleared": injector.clear(upstream, op)}
+
+
+@router.delete("")
+def clear_all():
+    return {"cleared": injector.clear()}
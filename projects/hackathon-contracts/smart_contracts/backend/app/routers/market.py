@@ -0,0 +1,38 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.binance import find_usdcusdt_symbol, klines
+from app.core.market import MARKET_INTERVAL, MarketHistory
+
+router = APIRouter(prefix="/api/market", tags=["market"])
+
+# Started / stopped from the app lifespan; keeps the active pair's 1m candles
+history = MarketHistory(
+    find_usdcusdt_symbol,
+    lambda symbol, start_ms, limit: klines(symbol, MARKET_INTERVAL, start_ms, limit),
+)
+
+
+@router.get("/klines")
+def get_klines(
+    start: Optional[int] = Query(None, description="ms since epoch, default now-24h"),
+    end: Optional[int] = Query(None, description="ms since epoch, default now"),
+    step: Optional[int] = Query(None, ge=60_000, description="bucket size in ms"),
+    points: int = Query(300, ge=1, le=2000),
+):
+    """
+    OHLCV for the active pair from the local store, re-bucketed to `step` (or
+    to at most `points` candles). Never calls the exchange.
+    """
+    try:
+        return history.series(start, end, step, points)
+    except LookupError as e:
+        raise HTTPException(503, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
+@router.get("/status")
+def market_status():
+    return history.stats()
@@ -0,0 +1,76 @@
+import os
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from app.binance import limiter
+from app.core import tracing
+from app.core.chain import follower
+from app.core.internal_ledger import internal_ledger
+from app.core.ledger import ledger
+from app.core.metrics import Counter, Gauge, registry
+from app.routers.auth import ADMIN_EMAILS, get_current_user
+
+# Scrapers send `Authorization: Bearer $METRICS_TOKEN`; without a token set,
+# only an admin session can read /metrics.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+router = APIRouter(tags=["metrics"])
+
+# Point-in-time state read at scrape time only
+registry.register(
+    Gauge(
+        "binance_weight_headroom",
+        "Request weight left in the local 1m bucket.",
+        fn=lambda: {(): limiter.headroom()},
+    )
+)
+registry.register(
+    Gauge(
+        "chain_follower_lag_rounds",
+        "Rounds between the algod tip and the follower.",
+        fn=lambda: {(): max(0, follower.tip - follower.round)},
+    )
+)
+registry.register(
+    Counter(
+        "ledger_drift_corrections_total",
+        "Reconciliations that corrected the ledger projection.",
+        fn=lambda: {(): ledger.drift_corrections},
+    )
+)
+registry.register(
+    Counter(
+        "trace_spans_dropped_total",
+        "Spans the in-memory trace store dropped over its per-trace cap.",
+        fn=lambda: {(): tracing.memory.dropped},
+    )
+)
+registry.register(
+    Gauge(
+        "internal_ledger_unsettled_entries",
+        "Internal transfers awaiting net settlement.",
+        fn=lambda: {(): internal_ledger.stats()["unsettled_entries"]},
+    )
+)
+
+
+def require_scraper(
+    request: Request, user: Optional[dict] = Depends(get_current_user)
+) -> None:
+    auth = request.headers.get("authorization", "")
+    if METRICS_TOKEN and secrets.compare_digest(auth, f"Bearer {METRICS_TOKEN}"):
+        return
+    if not user:
+        raise HTTPException(401, "not authenticated")
+    if (user.get("email") or "").lower() not in ADMIN_EMAILS:
+        raise HTTPException(403, "admin only")
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics(_=Depends(require_scraper)):
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -2,9 +2,11 @@ from __future__ import annotations
 
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field, EmailStr
 
+from app.core.events import bus, user_topic
+from app.routers.auth import get_current_user
 from app.utils.paypal import (
     create_order,
     capture_order,
@@ -69,10 +71,23 @@ def api_capture_order(order_id: str):
 # ---------- Payouts (Outbound / Cash-out) ----------
 
 
+def _push_payout_status(user: Optional[dict], batch: dict) -> None:
+    header = (batch or {}).get("batch_header") or {}
+    if user and header.get("payout_batch_id"):
+        bus.publish(
+            user_topic(user["email"]),
+            {
+                "kind": "payout",
+                "batch_id": header["payout_batch_id"],
+                "status": header.get("batch_status"),
+            },
+        )
+
+
 @router.post("/payouts")
-def api_create_payout(payload: PayoutIn):
+def api_create_payout(payload: PayoutIn, user=Depends(get_current_user)):
     try:
-        return create_payout(
+        batch = create_payout(
             receiver_email=payload.email,
             amount=payload.amount,
             currency=payload.currency,
@@ -80,14 +95,18 @@ def api_create_payout(payload: PayoutIn):
         )
     except Exception as e:
         raise HTTPException(502, f"create_payout failed: {e}")
+    _push_payout_status(user, batch)
+    return batch
 
 
 @router.get("/payouts/batch/{batch_id}")
-def api_get_payout_batch(batch_id: str):
+def api_get_payout_batch(batch_id: str, user=Depends(get_current_user)):
     try:
-        return get_payout_batch(batch_id)
+        batch = get_payout_batch(batch_id)
     except Exception as e:
         raise HTTPException(502, f"get_payout_batch failed: {e}")
+    _push_payout_status(user, batch)
+    return batch
 
 
 @router.get("/payouts/item/{item_id}")
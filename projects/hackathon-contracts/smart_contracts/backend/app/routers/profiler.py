@@ -0,0 +1,143 @@
+import asyncio
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+
+from app.core import startup
+from app.core.profiler import (
+    PROFILE_DEFAULT_INTERVAL,
+    Busy,
+    Profile,
+    memory,
+    sampler,
+)
+from app.core.warmup import warmup
+from app.routers.auth import require_admin
+
+router = APIRouter(
+    prefix="/api/admin/profile",
+    tags=["profile"],
+    dependencies=[Depends(require_admin)],
+)
+
+Format = Literal["speedscope", "collapsed", "summary"]
+
+
+def _render(prof: Profile, fmt: Format):
+    if fmt == "collapsed":
+        return PlainTextResponse(prof.collapsed())
+    if fmt == "speedscope":
+        return JSONResponse(
+            prof.speedscope(),
+            headers={
+                "Content-Disposition": f'attachment; filename="{prof.name}.speedscope.json"'
+            },
+        )
+    return prof.summary()
+
+
+# ---------------- CPU: whole process ----------------
+@router.post("/cpu")
+async def profile_cpu(
+    seconds: float = 10,
+    interval_ms: float = PROFILE_DEFAULT_INTERVAL * 1000,
+    threads: Optional[str] = None,
+    wall: bool = False,
+    format: Format = "speedscope",
+):
+    """
+    Sample all threads (or those whose name contains `threads`). Blocked
+    threads are skipped unless `wall` asks for a wall-clock profile.
+    """
+    try:
+        prof = await asyncio.to_thread(
+            sampler.run,
+            seconds,
+            max(interval_ms, 1) / 1000,
+            "wall" if wall else "cpu",
+            threads,
+            wall,
+        )
+    except Busy as e:
+        raise HTTPException(409, str(e))
+    return _render(prof, format)
+
+
+# ---------------- CPU: sampled requests to one route ----------------
+class RouteProfileIn(BaseModel):
+    route: str  # template, e.g. "/api/ramp/fiat-to-usdc"
+    fraction: float = Field(0.1, gt=0, le=1)
+    seconds: float = Field(60, gt=0)
+    max_requests: int = Field(50, ge=1)
+    interval_ms: float = Field(PROFILE_DEFAULT_INTERVAL * 1000, ge=1)
+
+
+@router.post("/route")
+def arm_route_profile(body: RouteProfileIn):
+    if not body.route.startswith("/"):
+        raise HTTPException(400, "route must be a path template like /api/x/{id}")
+    try:
+        rp = sampler.arm_route(
+            body.route,
+            body.fraction,
+            body.seconds,
+            body.max_requests,
+            body.interval_ms / 1000,
+        )
+    except Busy as e:
+        raise HTTPException(409, str(e))
+    return rp.status()
+
+
+@router.get("/route")
+def route_profile(format: Format = "summary"):
+    """Status while running; the profile in `format` once done."""
+    rp = sampler.route
+    if rp is None:
+        raise HTTPException(404, "no route profile armed")
+    if not rp.done or format == "summary":
+        return rp.status()
+    return _render(rp.profile, format)
+
+
+@router.delete("/route")
+def stop_route_profile():
+    rp = sampler.disarm_route()
+    if rp is None:
+        raise HTTPException(404, "no route profile armed")
+    return rp.status()
+
+
+# ---------------- memory ----------------
+@router.post("/memory/start")
+def memory_start(frames: int = 10):
+    return memory.start(max(1, min(frames, 64)))
+
+
+@router.get("/memory/snapshot")
+def memory_snapshot(
+    limit: int = 30,
+    group: Literal["lineno", "filename", "traceback"] = "lineno",
+    compare: bool = False,
+):
+    try:
+        return memory.snapshot(min(max(limit, 1), 500), group, compare)
+    except RuntimeError as e:
+        raise HTTPException(409, str(e))
+
+
+@router.post("/memory/stop")
+def memory_stop():
+    return memory.stop()
+
+
+# ---------------- cold start ----------------
+@router.get("/startup")
+def startup_profile():
+    """
+    Phase marks (s since app.main began importing), deferred router imports
+    and the warm-up steps behind /ready.
+    """
+    return {**startup.report(), "warmup": warmup.status()}
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.chain import follower
+from app.core.events import bus, sse_format, sse_keepalive, user_topic
+from app.routers.auth import get_current_user
+from app.routers.tx import _history_item
+from app.routers.wallet import _address_for, balance_view
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+CATCH_UP_LIMIT = 500  # transfers replayed for a reconnect with Last-Event-ID
+_CHAIN_KINDS = ("transfer", "optin", "optout")
+
+
+def _chain_delta(addr: str, ev: dict) -> tuple[str, dict]:
+    if ev["kind"] == "transfer":
+        return "transfer", {**_history_item(addr, ev), "round": ev["round"]}
+    return ev["kind"], {"txid": ev.get("txid"), "round": ev["round"]}
+
+
+@router.get("")
+async def user_events(request: Request, user=Depends(get_current_user)):
+    """
+    Server-Sent Events for the signed-in user (session cookie):
+
+      hello     once: address, balance, current round
+      transfer  USDC in/out of the user's wallet (id = round), then `balance`
+      optin     the wallet opted in to USDC
+      job       ramp job status changes
+      payout    PayPal payout status
+
+    On reconnect the browser sends Last-Event-ID and missed transfers are
+    replayed from the chain follower's views.
+    """
+    if not user:
+        raise HTTPException(401, "not authenticated")
+    addr = await asyncio.to_thread(_address_for, user["email"])
+    last_id = request.headers.get("last-event-id") or ""
+
+    async def stream():
+        with bus.subscribe(user_topic(user["email"]), f"chain:{addr}") as sub:
+            hello = {
+                "address": addr,
+                "balance": await asyncio.to_thread(balance_view, addr),
+                "round": follower.round,
+            }
+            yield sse_format("hello", hello)
+            if last_id.isdigit():
+                missed = [
+                    ev
+                    for ev in follower.views.transfers(addr, CATCH_UP_LIMIT)
+                    if ev["round"] > int(last_id)
+                ]
+                for ev in reversed(missed):  # oldest first
+                    name, data = _chain_delta(addr, ev)
+                    yield sse_format(name, data, id=str(ev["round"]))
+
+            async for event in sse_keepalive(sub):
+                if await request.is_disconnected():
+                    return
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                if event.get("kind") in _CHAIN_KINDS:
+                    name, data = _chain_delta(addr, event)
+                    yield sse_format(name, data, id=str(event["round"]))
+                    if name == "transfer":
+                        balance = await asyncio.to_thread(balance_view, addr)
+                        yield sse_format("balance", balance)
+                else:
+                    kind = event.get("kind", "job")
+                    yield sse_format("job" if kind == "ramp" else kind, event)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
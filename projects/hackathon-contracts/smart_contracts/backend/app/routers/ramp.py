@@ -1,25 +1,40 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import os
 import time
-from typing import Optional
+from typing import Callable, Optional
 
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, EmailStr
 
+from app.core import analytics
+from app.core.events import bus, sse_format, sse_keepalive
 from app.core.firebase import get_firestore_client
+from app.core.jobs import JobRunner, QueueFull, job_topic, public_view
+from app.core.pipeline import Pipeline, Stage
 from app.routers.auth import get_current_user
 from app.algorand_usdc import (
     mint_and_send_usdc_dev,
+    resend_mint,
+    wait_for_mint,
     _ensure_usdc_dev,
     _opt_in_if_needed,
+    _units_to_min_units,
 )
 from app.algorand import get_or_create_local_account
 from app.binance import (
-    spot_market_buy_usdc_with_usdt,
-    find_usdcusdt_symbol,
+    RateLimited,
+    execute_plan,
+    headroom,
+    plan_best_execution,
     spot_quote_usdc_from_usd,
 )
 
+log = logging.getLogger("ramp")
+
 router = APIRouter(prefix="/api/ramp", tags=["ramp"])
 USERS = lambda: get_firestore_client().collection("users")
 
@@ -48,6 +63,10 @@ def quote(payload: SpotQuoteIn, user=Depends(get_current_user)):
     usd = float(payload.usd)
     try:
         q = spot_quote_usdc_from_usd(usd)
+    except RateLimited as e:
+        raise HTTPException(
+            429, str(e), headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
     except Exception as e:
         raise HTTPException(502, f"binance spot quote failed: {e}")
     return {
@@ -60,6 +79,12 @@ def quote(payload: SpotQuoteIn, user=Depends(get_current_user)):
     }
 
 
+@router.get("/binance/headroom")
+def binance_headroom():
+    """Remaining Binance request weight as seen by the client-side limiter."""
+    return headroom()
+
+
 # ─────────────────────────────────────────────────────────────
 # Fiat -> Spot (USDT→USDC) -> LocalNet “USDC” ASA mint & send
 # ─────────────────────────────────────────────────────────────
@@ -75,34 +100,8 @@ class MintIn(BaseModel):
     order_id: Optional[str] = None
 
 
-@router.post("/fiat-to-usdc")
-def fiat_to_usdc(payload: MintIn, user=Depends(get_current_user)):
-    if not user:
-        raise HTTPException(401, "not authenticated")
-
-    # Payer PayPal (for metadata on-chain)
-    doc = USERS().document(user["email"]).get().to_dict() or {}
-    payer_pp = doc.get("paypalEmail") if doc.get("paypalLinked") else None
-
-    # Resolve wallet & ASA opt-in
-    acct = get_or_create_local_account(user["email"])
-    user_wallet_addr = payload.to_wallet or acct.address
-    asset_id = _ensure_usdc_dev()
-    _opt_in_if_needed(user_wallet_addr, acct.signer.private_key, asset_id)
-
-    usd_amount = float(payload.usd)
-    pre_quote = None
-    try:
-        pre_quote = spot_quote_usdc_from_usd(usd_amount)
-    except Exception:
-        pre_quote = None
-
-    # 1) MARKET buy on testnet
-    try:
-        order = spot_market_buy_usdc_with_usdt(usd_amount)
-    except Exception as e:
-        raise HTTPException(502, f"binance spot buy failed: {e}")
-
+def _fill_from_order(order: dict, usd_amount: float) -> tuple[float, float]:
+    """(executed USDC, spent USDT) from a Binance MARKET order response."""
     executed_qty_str = order.get("executedQty") or "0"
     if executed_qty_str == "0" and order.get("fills"):
         try:
@@ -120,69 +119,321 @@ def fiat_to_usdc(payload: MintIn, user=Depends(get_current_user)):
         spent_usdt = float(quote_spent_str)
     except Exception:
         spent_usdt = usd_amount
+    return executed_usdc, spent_usdt
 
-    if executed_usdc <= 0:
-        raise HTTPException(502, "order filled quantity is zero")
 
-    price = spent_usdt / executed_usdc
-    price_str = f"{price:.6f}"
+def build_ramp_pipeline(
+    payload: MintIn,
+    email: str,
+    client_order_id: Optional[str] = None,
+    resume: bool = False,
+    mint_intent: Optional[dict] = None,
+    on_mint_intent: Optional[Callable[[dict], None]] = None,
+) -> Pipeline:
+    """
+    The fiat -> USDC ramp as a DAG:
 
-    try:
-        symbol = find_usdcusdt_symbol()
-    except Exception:
-        symbol = "USDCUSDT"
-
-    # Enriched on-chain receipt
-    receipt = {
-        "payer": {"email": user["email"], "paypal": payer_pp},
-        "recipient": {
-            "wallet": user_wallet_addr,
-            "paypal": payload.recipient_paypal_email,
-        },
-        "payment": {
-            "kind": "fiat->spot(usdt)->usdc->localnet-usdc",
-            "usd": f"{usd_amount:.2f}",
-            "usdt_spent": f"{spent_usdt:.6f}",
-            "usdc_bought": f"{executed_usdc:.6f}",
-            "order_id": payload.order_id,
-        },
-        "exchange": {
-            "name": "binance",
-            "venue": "spot-testnet",
-            "symbol": symbol,
-            "effective_price_usdt_per_usdc": price_str,
-        },
-        "binance": {
-            "mode": "spot-testnet",
-            "symbol": symbol,
-            "orderId": order.get("orderId"),
-            "clientOrderId": order.get("clientOrderId"),
-            "status": order.get("status", "FILLED"),
-            "transactTime": order.get("transactTime"),
-            "executedQty": f"{executed_usdc:.6f}",
-            "cummulativeQuoteQty": f"{spent_usdt:.6f}",
-            "priceUSDCUSDT": price_str,
-            "side": order.get("side"),
-            "type": order.get("type"),
-        },
-    }
-    if pre_quote:
-        receipt["pre_quote"] = pre_quote
-
-    # Mint & send LocalNet ASA
-    onchain = mint_and_send_usdc_dev(
-        to_addr=user_wallet_addr,
-        usdc_units=f"{executed_usdc:.6f}",
-        receipt=receipt,
+        profile ────────────┐
+        account ──┬─ optin ─┤
+        asset ────┘         ├─ buy ── mint ── confirm
+        route ─── pre_quote ┘
+
+    `route` splits the buy across the candidate stable books by depth (see
+    `plan_best_execution`). The buy waits for everything the mint needs (the
+    profile and the opt-in: never buy what we cannot deliver) and for the
+    pre-quote (the snapshot must precede our own orders). With `resume`, child
+    orders already filled under `client_order_id` are reused instead of
+    buying again. `on_mint_intent` receives the signed mint before it is
+    submitted; handing that back as `mint_intent` re-sends the same
+    transaction instead of minting again (see `resend_mint`).
+    """
+    usd_amount = float(payload.usd)
+
+    def profile(r):
+        return USERS().document(email).get().to_dict() or {}
+
+    def account(r):
+        return get_or_create_local_account(email)
+
+    def asset(r):
+        return _ensure_usdc_dev()
+
+    def optin(r):
+        acct = r["account"]
+        wallet = payload.to_wallet or acct.address
+        _opt_in_if_needed(wallet, acct.signer.private_key, r["asset"])
+        return wallet
+
+    def route(r):
+        try:
+            return plan_best_execution(usd_amount)
+        except Exception as e:
+            raise HTTPException(502, f"binance routing failed: {e}")
+
+    def pre_quote(r):
+        try:
+            return spot_quote_usdc_from_usd(
+                usd_amount, symbol=r["route"]["routes"][0]["symbol"]
+            )
+        except Exception:
+            return None
+
+    def buy(r):
+        try:
+            return execute_plan(r["route"], client_order_id, resume=resume)
+        except Exception as e:
+            raise HTTPException(502, f"binance spot buy failed: {e}")
+
+    def mint(r):
+        doc = r["profile"]
+        payer_pp = doc.get("paypalEmail") if doc.get("paypalLinked") else None
+        order = r["buy"]
+        sym = r["route"]["routes"][0]["symbol"]
+        user_wallet_addr = r["optin"]
+
+        executed_usdc, spent_usdt = _fill_from_order(order, usd_amount)
+        if executed_usdc <= 0:
+            raise HTTPException(502, "order filled quantity is zero")
+
+        price = spent_usdt / executed_usdc
+        price_str = f"{price:.6f}"
+
+        # Enriched on-chain receipt
+        receipt = {
+            "payer": {"email": email, "paypal": payer_pp},
+            "recipient": {
+                "wallet": user_wallet_addr,
+                "paypal": payload.recipient_paypal_email,
+            },
+            "payment": {
+                "kind": "fiat->spot(usdt)->usdc->localnet-usdc",
+                "usd": f"{usd_amount:.2f}",
+                "usdt_spent": f"{spent_usdt:.6f}",
+                "usdc_bought": f"{executed_usdc:.6f}",
+                "order_id": payload.order_id,
+            },
+            "exchange": {
+                "name": "binance",
+                "venue": "spot-testnet",
+                "symbol": sym,
+                "effective_price_usdt_per_usdc": price_str,
+            },
+            "binance": {
+                "mode": "spot-testnet",
+                "symbol": sym,
+                "orderId": order.get("orderId"),
+                "clientOrderId": order.get("clientOrderId"),
+                "status": order.get("status", "FILLED"),
+                "transactTime": order.get("transactTime"),
+                "executedQty": f"{executed_usdc:.6f}",
+                "cummulativeQuoteQty": f"{spent_usdt:.6f}",
+                "priceUSDCUSDT": price_str,
+                "side": order.get("side"),
+                "type": order.get("type"),
+            },
+        }
+        if order.get("children"):
+            receipt["binance"]["children"] = order["children"]
+        receipt["routing"] = r["route"]
+        if r["pre_quote"]:
+            receipt["pre_quote"] = r["pre_quote"]
+
+        # Mint & send LocalNet ASA (submitted here, awaited in `confirm`)
+        onchain = resend_mint(mint_intent) if mint_intent else None
+        if onchain is None:
+            onchain = mint_and_send_usdc_dev(
+                to_addr=user_wallet_addr,
+                usdc_units=f"{executed_usdc:.6f}",
+                receipt=receipt,
+                wait=False,
+                on_intent=on_mint_intent,
+            )
+        return {
+            "ok": True,
+            "asset_id": onchain["asset_id"],
+            "decimals": onchain["decimals"],
+            "amount_usdc": f"{executed_usdc:.6f}",
+            "txid": onchain["txid"],
+            "sender": onchain["sender"],
+            "amount_min_units": onchain["amount_min_units"],
+            "exchange": receipt["exchange"],
+            "binance_order": receipt["binance"],
+            "routing": r["route"],
+            "pre_quote": r["pre_quote"],
+        }
+
+    def confirm(r):
+        m = r["mint"]
+        confirmed_round = wait_for_mint(m["txid"])
+        order = m["binance_order"]
+        try:
+            analytics.record_transfer(
+                m["txid"],
+                m["sender"],
+                r["optin"],
+                m["amount_min_units"],
+                fill=(
+                    _units_to_min_units(order["cummulativeQuoteQty"]),
+                    _units_to_min_units(order["executedQty"]),
+                ),
+            )
+        except Exception as e:
+            log.warning("analytics update for %s failed: %s", m["txid"], e)
+        return {"confirmed_round": confirmed_round}
+
+    return Pipeline(
+        [
+            Stage("profile", profile),
+            Stage("account", account),
+            Stage("asset", asset),
+            Stage("optin", optin, ("account", "asset")),
+            Stage("route", route),
+            Stage("pre_quote", pre_quote, ("route",)),
+            Stage("buy", buy, ("route", "profile", "optin", "pre_quote")),
+            Stage("mint", mint, ("buy", "profile", "optin")),
+            Stage("confirm", confirm, ("mint",)),
+        ]
+    )
+
+
+@router.post("/fiat-to-usdc")
+async def fiat_to_usdc(payload: MintIn, user=Depends(get_current_user)):
+    if not user:
+        raise HTTPException(401, "not authenticated")
+
+    run = await build_ramp_pipeline(payload, user["email"]).run()
+    return {**run.results["mint"], **run.results["confirm"], "timings": run.timings}
+
+
+# ─────────────────────────────────────────────────────────────
+# Job mode: 202 Accepted + status polling / SSE
+# ─────────────────────────────────────────────────────────────
+
+RAMP_JOB_WORKERS = int(os.getenv("RAMP_JOB_WORKERS", "4"))
+
+# stage -> job status once it completes; these results are also checkpointed
+_JOB_STATUS = {
+    "pre_quote": "quoted",
+    "buy": "bought",
+    "mint": "minted",
+    "confirm": "confirmed",
+}
+_CHECKPOINTED = ("route", "pre_quote", "buy", "mint")
+
+
+async def _run_ramp_job(job: dict, progress) -> None:
+    checkpoint = job.get("checkpoint") or {}
+    loop = asyncio.get_running_loop()
+
+    def on_mint_intent(intent: dict) -> None:
+        # runs on the mint stage's thread; the send waits for this write
+        asyncio.run_coroutine_threadsafe(
+            progress(checkpoint={"mint_intent": intent}), loop
+        ).result()
+
+    pipeline = build_ramp_pipeline(
+        MintIn(**job["payload"]),
+        job["email"],
+        client_order_id=f"rj-{job['id']}",
+        resume=job.get("attempts", 0) > 1,
+        mint_intent=checkpoint.get("mint_intent"),
+        on_mint_intent=on_mint_intent,
     )
+    timings = dict(job.get("timings") or {})
 
+    async def on_stage(name, value, ms):
+        timings[name] = round(ms, 2)
+        status = _JOB_STATUS.get(name)
+        if name == "confirm":
+            return  # final update below carries the result
+        if name in _CHECKPOINTED:
+            await progress(status, checkpoint={name: value}, timings=timings)
+        elif status:
+            await progress(status, timings=timings)
+
+    seed = {k: checkpoint[k] for k in _CHECKPOINTED if k in checkpoint}
+    if "mint_intent" in checkpoint:
+        # re-run the mint: re-sending the signed intent cannot mint twice, and
+        # a fresh one goes out only if the first expired (confirm timed out)
+        seed.pop("mint", None)
+    run = await pipeline.run(seed=seed, on_stage=on_stage)
+    timings["total"] = run.timings["total"]
+    await progress(
+        "confirmed",
+        result={**run.results["mint"], **run.results["confirm"]},
+        timings=timings,
+    )
+
+
+ramp_jobs = JobRunner(
+    "ramp",
+    _run_ramp_job,
+    workers=RAMP_JOB_WORKERS,
+    terminal=("confirmed",),
+    # once the buy filled, the USDT is spent: the job must deliver the USDC
+    committed=lambda job: "buy" in job.get("checkpoint", {}),
+)
+
+
+async def _own_job(job_id: str, user) -> dict:
+    if not user:
+        raise HTTPException(401, "not authenticated")
+    job = await ramp_jobs.get(job_id)
+    if not job or job.get("email") != user["email"]:
+        raise HTTPException(404, "job not found")
+    return job
+
+
+@router.post("/jobs", status_code=202)
+async def create_ramp_job(payload: MintIn, user=Depends(get_current_user)):
+    """
+    Queue a fiat -> USDC ramp and return immediately.
+    Progress: queued -> running -> quoted -> bought -> minted -> confirmed | failed;
+    from bought on, a failure is "retrying" rather than failed.
+    """
+    if not user:
+        raise HTTPException(401, "not authenticated")
+    try:
+        job = await ramp_jobs.submit(user["email"], payload.model_dump(mode="json"))
+    except QueueFull:
+        raise HTTPException(503, "ramp queue is full, retry later")
     return {
-        "ok": True,
-        "asset_id": onchain["asset_id"],
-        "decimals": onchain["decimals"],
-        "amount_usdc": f"{executed_usdc:.6f}",
-        "txid": onchain["txid"],
-        "exchange": receipt["exchange"],
-        "binance_order": receipt["binance"],
-        "pre_quote": pre_quote,
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/api/ramp/jobs/{job['id']}",
+        "events_url": f"/api/ramp/jobs/{job['id']}/events",
     }
+
+
+@router.get("/jobs/{job_id}")
+async def get_ramp_job(job_id: str, user=Depends(get_current_user)):
+    return public_view(await _own_job(job_id, user))
+
+
+@router.get("/jobs/{job_id}/events")
+async def ramp_job_events(job_id: str, user=Depends(get_current_user)):
+    """
+    Server-Sent Events: one `status` event now, then one per change until the
+    job is confirmed or failed.
+    """
+    job = await _own_job(job_id, user)
+
+    async def stream():
+        with bus.subscribe(job_topic(job_id)) as sub:
+            current = public_view(await ramp_jobs.get(job_id) or job)
+            yield sse_format("status", current)
+            if current["status"] in ramp_jobs.terminal:
+                return
+            async for event in sse_keepalive(sub):
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield sse_format("status", event)
+                if event["status"] in ramp_jobs.terminal:
+                    return
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
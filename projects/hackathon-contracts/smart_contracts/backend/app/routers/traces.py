@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.core import tracing
+from app.routers.auth import require_admin
+
+router = APIRouter(prefix="/api/traces", tags=["traces"])
+
+
+@router.get("")
+def recent_traces(limit: int = 50, admin=Depends(require_admin)):
+    """Root spans of the newest traces held by the in-memory exporter."""
+    return {"items": tracing.memory.recent(min(max(limit, 1), 500))}
+
+
+@router.get("/{trace_id}")
+def get_trace(trace_id: str, admin=Depends(require_admin)):
+    spans = tracing.memory.get(trace_id)
+    if spans is None:
+        raise HTTPException(404, "trace not found (expired or not sampled)")
+    return {"trace_id": trace_id, "spans": spans}
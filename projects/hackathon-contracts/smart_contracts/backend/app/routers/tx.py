@@ -1,12 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from app.algorand import get_algorand_client
 from app.algorand_usdc import _ensure_usdc_dev
+from app.core import analytics
+from app.core.chain import follower
+from app.core.notes import decode_note
+from app.core.receipts import get_receipt
 from app.routers.auth import get_current_user
-import base64, json
+import base64
+import logging
+
+log = logging.getLogger("tx")
 
 router = APIRouter(prefix="/api/tx", tags=["tx"])
 
 
+def _history_item(addr: str, ev: dict) -> dict:
+    return {
+        "txid": ev["txid"],
+        "ts": ev["ts"],
+        "direction": "OUT" if ev["sender"] == addr else "IN",
+        "amount": f"{ev['amount'] / 1_000_000:.2f}",  # USDC-DEV has 6dp
+        "asset": {"id": ev["asset_id"], "unit": "USDCd", "name": "USDC-DEV"},
+        "from": ev["sender"],
+        "to": ev["receiver"],
+        "note": ev.get("note"),
+    }
+
+
 @router.get("/history")
 def tx_history(user=Depends(get_current_user)):
     if not user:
@@ -22,6 +42,14 @@ def tx_history(user=Depends(get_current_user)):
     acct = get_or_create_local_account(user["email"])
     addr = acct.address
 
+    if follower.covers_history():
+        # materialized from the block stream; no indexer round-trip
+        return {
+            "items": [
+                _history_item(addr, ev) for ev in follower.views.transfers(addr, 50)
+            ]
+        }
+
     res = indexer.search_transactions(address=addr, asset_id=asset_id, limit=50)
 
     items = []
@@ -37,7 +65,7 @@ def tx_history(user=Depends(get_current_user)):
         note = None
         if note_raw:
             try:
-                note = json.loads(base64.b64decode(note_raw).decode("utf-8"))
+                note = decode_note(base64.b64decode(note_raw))
             except Exception:
                 note = None
 
@@ -59,3 +87,76 @@ def tx_history(user=Depends(get_current_user)):
         )
 
     return {"items": items}
+
+
+@router.get("/receipt/{key}")
+def tx_receipt(key: str, user=Depends(get_current_user)):
+    """
+    Full off-chain receipt by txid or content hash (only the payer's own).
+    """
+    if not user:
+        raise HTTPException(401, "not authenticated")
+    found = get_receipt(key)
+    payer = ((found or {}).get("receipt") or {}).get("payer") or {}
+    if not found or payer.get("email") != user["email"]:
+        raise HTTPException(404, "receipt not found")
+    if found.get("txid"):
+        found["confirmed_round"] = follower.views.confirmed_round(found["txid"])
+    return found
+
+
+@router.get("/chain/status")
+def chain_status():
+    return follower.stats()
+
+
+def _indexer_transfers(indexer, addr: str, asset_id: int):
+    """Every USDC transfer touching `addr`, oldest pages first (one-off seed)."""
+    token = None
+    while True:
+        res = indexer.search_transactions(
+            address=addr, asset_id=asset_id, limit=1000, next_page=token
+        )
+        for tx in res.get("transactions", []):
+            asa = tx.get("asset-transfer-transaction")
+            if not asa or not asa.get("amount"):
+                continue
+            yield {
+                "txid": tx.get("id"),
+                "sender": tx.get("sender"),
+                "receiver": asa.get("receiver"),
+                "amount": asa.get("amount", 0),
+                "ts": tx.get("round-time"),
+            }
+        token = res.get("next-token")
+        if not token or not res.get("transactions"):
+            return
+
+
+def _seed_analytics(addr: str) -> None:
+    indexer = get_algorand_client().client.indexer
+    try:
+        analytics.seed(addr, _indexer_transfers(indexer, addr, _ensure_usdc_dev()))
+    except Exception as e:  # the next view starts it again
+        log.warning("analytics seed for %s failed: %s", addr, e)
+
+
+@router.get("/analytics")
+def tx_analytics(background: BackgroundTasks, user=Depends(get_current_user)):
+    """
+    Totals, daily buckets, counterparties and average ramp fill price for the
+    user's wallet, from the incrementally maintained aggregate. `seeding` is
+    true while the history of a wallet that predates tracking is still being
+    folded in (after the response; totals so far are returned meanwhile).
+    """
+    if not user:
+        raise HTTPException(401, "not authenticated")
+
+    from app.algorand import get_or_create_local_account
+
+    addr = get_or_create_local_account(user["email"]).address
+    doc = analytics.load(addr)
+    seeding = doc is None or not doc.get("seeded")
+    if seeding and analytics.begin_seed(addr):
+        background.add_task(_seed_analytics, addr)
+    return {"address": addr, **analytics.summary(doc or {}), "seeding": seeding}
@@ -0,0 +1,153 @@
+from functools import lru_cache
+from typing import Optional
+
+from algosdk import encoding as algo_encoding
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+
+from app.algorand import get_algorand_client, get_or_create_local_account
+from app.algorand_usdc import (
+    USDC_DECIMALS,
+    _ensure_usdc_dev,
+    _landed_round,
+    _units_to_min_units,
+    is_opted_in,
+)
+from app.core.fees import BACKGROUND, apply_fee, suggested_params
+from app.core.internal_ledger import InsufficientFunds, internal_ledger
+from app.core.ledger import ledger
+from app.core.wallet import get_wallet_from_chain
+from app.routers.auth import get_current_user, require_admin
+
+router = APIRouter(prefix="/api/wallet", tags=["wallet"])
+
+
+@lru_cache(maxsize=4096)
+def _address_for(email: str) -> str:
+    # LocalNet accounts are stable per name; resolve through KMD only once
+    return get_or_create_local_account(email).address
+
+
+def _reconcile_once(addr: str) -> None:
+    """Check a wallet the projection has never seen against algod, once."""
+    if ledger.is_reconciled(addr):
+        return
+    try:
+        ledger.reconcile(addr, get_algorand_client().client.algod, _ensure_usdc_dev())
+    except Exception as e:
+        raise HTTPException(502, f"algod balance lookup failed: {e}")
+
+
+def _units(v: int) -> str:
+    return f"{v / 10**USDC_DECIMALS:.{USDC_DECIMALS}f}"
+
+
+@router.get("/balance")
+def wallet_balance(user=Depends(get_current_user)):
+    """
+    USDC balance from the ledger projection (memory). The first view of a
+    wallet the projection has never checked against algod reconciles it once.
+    """
+    if not user:
+        raise HTTPException(401, "not authenticated")
+    addr = _address_for(user["email"])
+    _reconcile_once(addr)
+    return balance_view(addr)
+
+
+def balance_view(addr: str) -> dict:
+    b = ledger.balance(addr)
+    internal = internal_ledger.position(addr)
+    return {
+        **b,
+        "balance": _units(b["balance"]),
+        "pending_in": _units(b["pending_in"]),
+        "pending_out": _units(b["pending_out"]),
+        "available": _units(b["available"]),
+        "internal": _units(internal),  # unsettled off-chain transfers
+        "spendable": _units(b["available"] + internal),
+        "unit": "USDC",
+    }
+
+
+class TransferIn(BaseModel):
+    to_email: Optional[str] = None
+    to_address: Optional[str] = None
+    amount: str  # decimal USDC, e.g. "12.50"
+    memo: Optional[str] = None
+
+
+@router.post("/transfer")
+def wallet_transfer(body: TransferIn, user=Depends(get_current_user)):
+    """
+    Instant user-to-user transfer on the internal ledger. Final immediately
+    for both sides; the net effect reaches the chain at the next settlement.
+    """
+    if not user:
+        raise HTTPException(401, "not authenticated")
+    if body.to_email:
+        # registered users only: never provision a wallet for a typed-in email
+        to_email = body.to_email.strip().lower()
+        to_addr = get_wallet_from_chain(to_email)
+        if to_addr is None:
+            raise HTTPException(404, "no registered wallet for that email")
+    elif body.to_address and algo_encoding.is_valid_address(body.to_address):
+        to_email, to_addr = None, body.to_address
+    else:
+        raise HTTPException(400, "to_email or a valid to_address is required")
+    try:
+        amount = _units_to_min_units(body.amount)
+    except Exception:
+        raise HTTPException(400, "invalid amount")
+    try:
+        opted_in = is_opted_in(to_addr, _ensure_usdc_dev())
+    except Exception as e:
+        raise HTTPException(502, f"algod opt-in lookup failed: {e}")
+    if not opted_in:
+        # settlement could never deliver it on chain
+        raise HTTPException(409, "recipient is not opted in to USDC")
+
+    from_addr = _address_for(user["email"])
+    _reconcile_once(from_addr)
+    try:
+        entry = internal_ledger.transfer(
+            from_addr,
+            user["email"],
+            to_addr,
+            to_email,
+            amount,
+            available_onchain=lambda a: ledger.balance(a)["available"],
+            memo=body.memo,
+        )
+    except InsufficientFunds as e:
+        raise HTTPException(409, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return {
+        "id": entry["id"],
+        "from": from_addr,
+        "to": to_addr,
+        "amount": _units(amount),
+        "balance": balance_view(from_addr),
+    }
+
+
+@router.get("/settlement")
+def settlement_status(admin=Depends(require_admin)):
+    return internal_ledger.stats()
+
+
+def settle_kwargs() -> dict:
+    """Dependencies for one net-settlement run (resolved per run)."""
+    algod = get_algorand_client().client.algod
+    return {
+        "algod": algod,
+        "asset_id": _ensure_usdc_dev(),
+        "signer_for": lambda email: get_or_create_local_account(
+            email
+        ).signer.private_key,
+        "build_params": lambda: suggested_params(algod),
+        "finish_txn": lambda t: apply_fee(algod, t, BACKGROUND),
+        "on_confirmed": ledger.confirmed,
+        "landed": lambda txid, first, last: _landed_round(algod, txid, first, last),
+    }
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import os
+import random
+from dataclasses import dataclass
+from typing import Any, Optional
+
+# ─────────────────────────────────────────────────────────────
+# SIMULATION mode: every external dependency in memory
+# ─────────────────────────────────────────────────────────────
+# SIMULATION=1 swaps Firestore, algod/indexer/KMD, Binance and PayPal for
+# in-process engines behind the interfaces the app already talks to:
+#   store     dict-backed document store (firestore.Client surface)
+#   ledger    dev-mode chain: one round per submitted group (algosdk urlopen)
+#   exchange  order matching on a mean-reverting price process (requests
+#             session used by app.binance)
+#   paypal    order / payout state machine (requests session used by
+#             app.utils.paypal)
+# No credentials, LocalNet or network are needed. Keys, ids, prices and fills
+# come from RNGs seeded by SIM_SEED, so a given sequence of calls replays
+# identically. Timestamps are still wall clock, and so are txids (receipt
+# notes carry a timestamp).
+#
+# Keep this module import-light: app.utils.paypal reads SIMULATION at import.
+
+SIMULATION = os.getenv("SIMULATION", "").strip().lower() in ("1", "true", "yes", "on")
+SIM_SEED = int(os.getenv("SIM_SEED", "0"))
+
+
+class NoLatency:
+    def wait(self, upstream: str) -> None:
+        pass
+
+
+@dataclass
+class Engines:
+    store: Any
+    ledger: Any
+    exchange: Any
+    paypal: Any
+
+
+engines: Optional[Engines] = None
+
+
+def rng(seed: int, name: str) -> random.Random:
+    """Independent stream per engine, so one engine's draws never shift another's."""
+    return random.Random(f"{seed}:{name}")
+
+
+def install(seed: int = SIM_SEED, latency: Any = None) -> Engines:
+    """
+    Create the engines and point the app's clients at them. Idempotent: the
+    first call wins. `latency` (anything with .wait(upstream)) adds
+    per-call delay; the default is none.
+    """
+    global engines
+    if engines is not None:
+        return engines
+    from app.sim import exchange, ledger, paypal, store
+
+    latency = latency or NoLatency()
+    engines = Engines(
+        store=store.DocumentStore(rng(seed, "store"), latency),
+        ledger=ledger.install(rng(seed, "ledger"), latency),
+        exchange=exchange.install(rng(seed, "exchange"), latency),
+        paypal=paypal.install(rng(seed, "paypal"), latency),
+    )
+    return engines
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+# ─────────────────────────────────────────────────────────────
+# Binance spot stand-in: order matching on a simulated price process
+# ─────────────────────────────────────────────────────────────
+# Replaces `app.binance._session`, so the limiter, quote cache, routing and
+# metrics in app.binance run unchanged.
+#
+# Each book's mid follows a mean-reverting walk around its peg, one step per
+# order on that book, from the book's own seeded stream: market data never
+# moves the price, so concurrent quote traffic cannot change which fills a
+# given sequence of orders gets. The book is LEVELS price levels of
+# LEVEL_QTY either side of the mid. MARKET buys walk the asks, and the depth
+# they take pushes the mid up by IMPACT per level consumed, which then decays
+# back towards the peg. Used weight is reported in X-MBX-USED-WEIGHT-1M.
+
+PEGS = {"USDCUSDT": 1.0001, "FDUSDUSDT": 0.9998, "TUSDUSDT": 0.9990}
+TICK = 0.0001
+LEVELS = 50
+LEVEL_QTY = 250_000.0
+REVERSION = 0.05  # share of the gap to the peg closed per tick
+VOLATILITY = 0.00005  # per-tick stddev
+IMPACT = TICK / 2  # mid move per fully consumed level
+CLIENT_ORDER_ID = re.compile(r"^[\.A-Z\:/a-z0-9_-]{1,36}$")  # as Binance checks it
+
+
+class Response:
+    def __init__(self, status: int, payload, weight: int):
+        self.status_code = status
+        self.text = json.dumps(payload)
+        self.headers = {"X-MBX-USED-WEIGHT-1M": str(weight)}
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class Book:
+    def __init__(self, symbol: str, peg: float, rng: random.Random):
+        self.symbol = symbol
+        self.peg = peg
+        self.mid = peg
+        self.rng = rng
+
+    def tick(self) -> None:
+        self.mid += REVERSION * (self.peg - self.mid) + self.rng.gauss(0, VOLATILITY)
+
+    def levels(self, side: str, n: int = LEVELS) -> list[list[str]]:
+        sign = 1 if side == "asks" else -1
+        return [
+            [f"{self.mid + sign * TICK * (i + 1):.6f}", f"{LEVEL_QTY:.2f}"]
+            for i in range(n)
+        ]
+
+    def market_buy(self, quote_qty: float) -> tuple[float, float, list[dict]]:
+        """Spend `quote_qty` against the asks: (base qty, quote spent, fills)."""
+        left, qty, spent, fills = quote_qty, 0.0, 0.0, []
+        consumed = 0.0
+        for price, avail in self.levels("asks"):
+            price, avail = float(price), float(avail)
+            take = min(left, price * avail)
+            fills.append(
+                {
+                    "price": f"{price:.6f}",
+                    "qty": f"{take / price:.6f}",
+                    "commission": "0",
+                    "commissionAsset": "USDC",
+                }
+            )
+            qty += take / price
+            spent += take
+            left -= take
+            consumed += take / (price * avail)
+            if left <= 1e-9:
+                break
+        self.mid += IMPACT * consumed
+        return qty, spent, fills
+
+
+class Exchange:
+    def __init__(self, rng: random.Random, latency):
+        self.rng = rng
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.books = {
+            s: Book(s, p, random.Random(rng.getrandbits(64))) for s, p in PEGS.items()
+        }
+        self.orders: dict[str, dict] = {}
+        self._order_id = 0
+        self._weight_minute = 0
+        self._weight = 0
+
+    def _used(self, weight: int) -> int:
+        minute = int(time.time() // 60)
+        if minute != self._weight_minute:
+            self._weight_minute, self._weight = minute, 0
+        self._weight += weight
+        return self._weight
+
+    def _order(self, book: Book, p: dict) -> dict:
+        if p.get("side") != "BUY" or p.get("type") != "MARKET":
+            return {"code": -1013, "msg": "only MARKET BUY is simulated"}
+        coid = p.get("newClientOrderId") or "sim%016x" % self.rng.getrandbits(64)
+        if not CLIENT_ORDER_ID.fullmatch(coid):
+            return {
+                "code": -1100,
+                "msg": "Illegal characters found in parameter 'newClientOrderId'; "
+                f"legal range is '{CLIENT_ORDER_ID.pattern}'.",
+            }
+        if coid in self.orders:
+            return {"code": -2010, "msg": "Duplicate order sent."}
+        book.tick()
+        qty, spent, fills = book.market_buy(float(p["quoteOrderQty"]))
+        self._order_id += 1
+        order = {
+            "symbol": book.symbol,
+            "orderId": self._order_id,
+            "clientOrderId": coid,
+            "transactTime": int(time.time() * 1000),
+            "status": "FILLED",
+            "type": "MARKET",
+            "side": "BUY",
+            "origQuoteOrderQty": p["quoteOrderQty"],
+            "executedQty": f"{qty:.6f}",
+            "cummulativeQuoteQty": f"{spent:.6f}",
+            "fills": fills,
+        }
+        self.orders[coid] = order
+        return order
+
+    def _klines(self, book: Book, p: dict) -> list[list]:
+        # candles are a pure function of (symbol, open time), so
+        # backfill and refresh agree however often they are asked for
+        step = 60_000
+        now = int(time.time() * 1000)
+        limit = int(p.get("limit", 500))
+        start = int(p.get("startTime") or now - step * limit)
+        rows = []
+        for t in range(start - start % step, min(now, start + step * limit), step):
+            r = random.Random(f"{book.symbol}:{t}")
+            o = book.peg + r.gauss(0, VOLATILITY * 4)
+            c = book.peg + r.gauss(0, VOLATILITY * 4)
+            h = max(o, c) + abs(r.gauss(0, VOLATILITY))
+            lo = min(o, c) - abs(r.gauss(0, VOLATILITY))
+            vol = 1000 + r.random() * 9000
+            rows.append(
+                [
+                    t,
+                    f"{o:.6f}",
+                    f"{h:.6f}",
+                    f"{lo:.6f}",
+                    f"{c:.6f}",
+                    f"{vol:.2f}",
+                    t + step - 1,
+                    f"{vol * c:.2f}",
+                    int(vol // 10),
+                    f"{vol / 2:.2f}",
+                    f"{vol * c / 2:.2f}",
+                    "0",
+                ]
+            )
+        return rows
+
+    def _route(self, method: str, path: str, p: dict) -> tuple[int, object]:
+        symbol: Optional[str] = p.get("symbol")
+        book = self.books.get(symbol) if symbol else None
+        if symbol is not None and book is None:
+            return 400, {"code": -1121, "msg": "Invalid symbol."}
+        if path == "/api/v3/ping":
+            return 200, {}
+        if path == "/api/v3/time":
+            return 200, {"serverTime": int(time.time() * 1000)}
+        if path == "/api/v3/ticker/price" and book:
+            return 200, {"symbol": symbol, "price": f"{book.mid:.6f}"}
+        if path == "/api/v3/ticker/bookTicker" and book:
+            bid, ask = book.levels("bids", 1)[0], book.levels("asks", 1)[0]
+            return 200, {
+                "symbol": symbol,
+                "bidPrice": bid[0],
+                "bidQty": bid[1],
+                "askPrice": ask[0],
+                "askQty": ask[1],
+            }
+        if path == "/api/v3/depth" and book:
+            n = min(int(p.get("limit", 100)), LEVELS)
+            return 200, {
+                "lastUpdateId": self._order_id,
+                "bids": book.levels("bids", n),
+                "asks": book.levels("asks", n),
+            }
+        if path == "/api/v3/klines" and book:
+            return 200, self._klines(book, p)
+        if path == "/api/v3/account":
+            return 200, {
+                "canTrade": True,
+                "balances": [
+                    {"asset": "USDT", "free": "1000000.00", "locked": "0"},
+                    {"asset": "USDC", "free": "1000000.00", "locked": "0"},
+                ],
+            }
+        if path == "/api/v3/order" and method == "POST" and book:
+            order = self._order(book, p)
+            return (400 if "code" in order else 200), order
+        if path == "/api/v3/order" and book:
+            order = self.orders.get(p.get("origClientOrderId", ""))
+            if order is None:
+                return 400, {"code": -2013, "msg": "Order does not exist."}
+            return 200, order
+        return 404, {"code": -1, "msg": f"sim exchange: no route for {method} {path}"}
+
+    # requests.Session.request signature, as used by app.binance._http
+    def request(self, method, url, headers=None, params=None, timeout=None, **kwargs):
+        self.latency.wait("binance")
+        path = urlsplit(url).path
+        with self._lock:
+            status, payload = self._route(method, path, dict(params or {}))
+            weight = self._used(1)
+        return Response(status, payload, weight)
+
+
+def install(rng: random.Random, latency) -> Exchange:
+    import app.binance as binance
+
+    exchange = Exchange(rng, latency)
+    binance._session = exchange
+    return exchange
@@ -0,0 +1,545 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import msgpack
+from algosdk import encoding, transaction
+from nacl.signing import SigningKey
+
+# ─────────────────────────────────────────────────────────────
+# In-memory algod / indexer / KMD (a dev-mode LocalNet stand-in)
+# ─────────────────────────────────────────────────────────────
+# The real algosdk clients are used unchanged; only `urlopen` in their
+# modules is swapped for a dispatcher into Ledger, so request building,
+# msgpack encoding and the backend's metrics wrappers all stay on the path.
+#
+# Like LocalNet in dev mode, every submitted group is validated and written
+# to its own block immediately. State kept: ALGO balances, ASA holdings and
+# params, app ids with boxes (the WalletRegistry "register_user" call writes
+# its box), blocks with txids, and an indexer-style transaction log.
+
+GENESIS_ID = "dockernet-v1"
+GENESIS_HASH = base64.b64encode(hashlib.sha256(b"simulation").digest()).decode()
+MIN_FEE = 1000
+DISPENSER_ALGOS = 10**15  # μAlgos
+
+# txn fields that hold 32-byte addresses (block JSON renders them base32)
+_ADDR_KEYS = {
+    "snd",
+    "rcv",
+    "close",
+    "arcv",
+    "aclose",
+    "asnd",
+    "rekey",
+    "m",
+    "r",
+    "f",
+    "c",
+}
+
+
+class ChainError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_value(key: str, v: Any) -> Any:
+    if isinstance(v, bytes):
+        if key in _ADDR_KEYS and len(v) == 32:
+            return encoding.encode_address(v)
+        return base64.b64encode(v).decode()
+    if isinstance(v, dict):
+        return {k: _json_value(k, x) for k, x in v.items()}
+    if isinstance(v, list):
+        return [_json_value(key, x) for x in v]
+    return v
+
+
+class Ledger:
+    def __init__(self, rng: random.Random, latency):
+        self.rng = rng
+        self.latency = latency
+        self.lock = threading.RLock()
+        self.new_block = threading.Condition(self.lock)
+        self.round = 1
+        self.next_id = 1001
+        self.accounts: dict[str, dict] = {}  # addr -> {amount, assets{id: amt}}
+        self.assets: dict[int, dict] = {}
+        self.apps: dict[int, dict] = {}
+        self.blocks: dict[int, dict] = {
+            1: {"rnd": 1, "ts": int(time.time()), "txns": []}
+        }
+        self.block_txids: dict[int, list[str]] = {1: []}
+        self.confirmed: dict[str, dict] = {}  # txid -> pending-info body
+        self.tx_log: list[dict] = []  # indexer view, oldest first
+
+        # KMD: the LocalNet default wallet holds the funded dispenser
+        sk, addr = self._keypair()
+        self.dispenser = addr
+        self.accounts[addr] = {"amount": DISPENSER_ALGOS, "assets": {}}
+        self.wallets: dict[str, dict] = {}
+        self.handles: dict[str, str] = {}
+        self._create_wallet("unencrypted-default-wallet", {addr: sk})
+
+    # ---------------- helpers ----------------
+    def _acct(self, addr: str) -> dict:
+        return self.accounts.setdefault(addr, {"amount": 0, "assets": {}})
+
+    def _token(self) -> str:
+        return "%032x" % self.rng.getrandbits(128)
+
+    def _keypair(self) -> tuple[str, str]:
+        """Like account.generate_account(), but drawn from the seeded rng."""
+        sk = SigningKey(self.rng.randbytes(32))
+        pk = bytes(sk.verify_key)
+        return base64.b64encode(bytes(sk) + pk).decode(), encoding.encode_address(pk)
+
+    def _create_wallet(self, name: str, keys: Optional[dict] = None) -> dict:
+        w = {"id": self._token(), "name": name, "keys": dict(keys or {})}
+        self.wallets[w["id"]] = w
+        return w
+
+    # ---------------- transaction processing ----------------
+    def submit(self, raw: bytes) -> str:
+        unpacker = msgpack.Unpacker(io.BytesIO(raw), raw=False, strict_map_key=False)
+        stxns = [
+            encoding.msgpack_decode(base64.b64encode(msgpack.packb(d)).decode())
+            for d in unpacker
+        ]
+        if not stxns:
+            raise ChainError(400, "empty transaction group")
+        # fees are pooled across a group: only the total has to cover the min
+        fees = sum(stx.transaction.fee for stx in stxns)
+        if fees < MIN_FEE * len(stxns):
+            raise ChainError(
+                400,
+                f"txgroup had {fees} in fees, which is less than the minimum "
+                f"{len(stxns)} * {MIN_FEE}",
+            )
+        with self.lock:
+            # validate the whole group against a scratch copy, then commit
+            saved = (
+                {
+                    a: {"amount": v["amount"], "assets": dict(v["assets"])}
+                    for a, v in self.accounts.items()
+                },
+                {k: dict(v) for k, v in self.assets.items()},
+                {k: {**v, "boxes": dict(v["boxes"])} for k, v in self.apps.items()},
+                self.next_id,
+            )
+            results = []
+            try:
+                for stx in stxns:
+                    results.append(self._apply(stx))
+            except ChainError:
+                self.accounts, self.assets, self.apps, self.next_id = saved
+                raise
+            self.round += 1
+            rnd, ts = self.round, int(time.time())
+            block_txns, txids = [], []
+            for stx, extra in zip(stxns, results):
+                txid = stx.get_txid()
+                body = _json_value("", stx.transaction.dictify())
+                block_txns.append({"txn": body})
+                txids.append(txid)
+                self.confirmed[txid] = {
+                    "confirmed-round": rnd,
+                    "pool-error": "",
+                    "txn": {"txn": body},
+                    **extra,
+                }
+                self._index(txid, rnd, ts, stx.transaction)
+            self.blocks[rnd] = {"rnd": rnd, "ts": ts, "txns": block_txns}
+            self.block_txids[rnd] = txids
+            self.new_block.notify_all()
+        return txids[0]
+
+    def _apply(self, stx) -> dict:
+        txn = stx.transaction
+        sender = self._acct(txn.sender)
+        if txn.last_valid_round < self.round + 1:
+            raise ChainError(400, "txn dead: round outside of validity window")
+        if stx.get_txid() in self.confirmed:
+            raise ChainError(400, f"transaction already in ledger: {stx.get_txid()}")
+        if sender["amount"] < txn.fee:
+            raise ChainError(400, f"overspend: {txn.sender} cannot pay fee")
+        sender["amount"] -= txn.fee
+
+        if isinstance(txn, transaction.PaymentTxn):
+            if sender["amount"] < txn.amt:
+                raise ChainError(400, f"overspend: {txn.sender} balance too low")
+            sender["amount"] -= txn.amt
+            self._acct(txn.receiver)["amount"] += txn.amt
+            return {}
+
+        if isinstance(txn, transaction.AssetConfigTxn):
+            if txn.index:
+                return {}  # reconfigure / destroy: not modelled
+            aid = self.next_id
+            self.next_id += 1
+            self.assets[aid] = {
+                "creator": txn.sender,
+                "total": txn.total,
+                "decimals": txn.decimals,
+                "unit-name": txn.unit_name,
+                "name": txn.asset_name,
+                "manager": txn.manager,
+                "reserve": txn.reserve,
+                "freeze": txn.freeze,
+                "clawback": txn.clawback,
+                "default-frozen": bool(txn.default_frozen),
+            }
+            sender["assets"][aid] = txn.total
+            return {"asset-index": aid}
+
+        if isinstance(txn, transaction.AssetTransferTxn):
+            aid = txn.index
+            if aid not in self.assets:
+                raise ChainError(400, f"asset {aid} does not exist")
+            src = self._acct(txn.revocation_target or txn.sender)
+            dst = self._acct(txn.receiver)
+            if txn.amount == 0 and txn.receiver == txn.sender:
+                src["assets"].setdefault(aid, 0)  # opt-in
+                return {}
+            if aid not in src["assets"]:
+                raise ChainError(400, f"{txn.sender} is not opted in to {aid}")
+            if aid not in dst["assets"]:
+                raise ChainError(
+                    400, f"receiver {txn.receiver} is not opted in to {aid}"
+                )
+            if src["assets"][aid] < txn.amount:
+                raise ChainError(400, f"underflow on asset {aid}")
+            src["assets"][aid] -= txn.amount
+            dst["assets"][aid] += txn.amount
+            if txn.close_assets_to:
+                self._acct(txn.close_assets_to)["assets"][aid] += src["assets"].pop(aid)
+            return {}
+
+        if isinstance(txn, transaction.ApplicationCallTxn):
+            if not txn.index:
+                app_id = self.next_id
+                self.next_id += 1
+                self.apps[app_id] = {"creator": txn.sender, "boxes": {}}
+                return {"application-index": app_id}
+            app = self.apps.get(txn.index)
+            if app is None:
+                raise ChainError(400, f"application {txn.index} does not exist")
+            args = txn.app_args or []
+            if len(args) == 3 and args[0] == b"register_user":
+                if len(args[1]) != 32 or len(args[2]) != 32:
+                    raise ChainError(400, "logic eval error: assert failed")
+                app["boxes"][bytes(args[1])] = bytes(args[2])
+            return {}
+
+        return {}  # keyreg etc.: fee only
+
+    def _index(self, txid: str, rnd: int, ts: int, txn) -> None:
+        rec = {
+            "id": txid,
+            "confirmed-round": rnd,
+            "round-time": ts,
+            "sender": txn.sender,
+            "fee": txn.fee,
+            "tx-type": txn.type,
+        }
+        if txn.note:
+            rec["note"] = base64.b64encode(txn.note).decode()
+        if isinstance(txn, transaction.AssetTransferTxn):
+            rec["asset-transfer-transaction"] = {
+                "amount": txn.amount,
+                "asset-id": txn.index,
+                "receiver": txn.receiver,
+            }
+            rec["_parties"] = {txn.sender, txn.receiver}
+        elif isinstance(txn, transaction.PaymentTxn):
+            rec["payment-transaction"] = {"amount": txn.amt, "receiver": txn.receiver}
+            rec["_parties"] = {txn.sender, txn.receiver}
+        else:
+            rec["_parties"] = {txn.sender}
+        self.tx_log.append(rec)
+
+    # ---------------- algod ----------------
+    def status(self) -> dict:
+        return {
+            "last-round": self.round,
+            "time-since-last-round": 0,
+            "catchup-time": 0,
+            "last-version": "future",
+            "next-version": "future",
+            "next-version-round": self.round + 1,
+            "next-version-supported": True,
+            "stopped-at-unsupported-round": False,
+        }
+
+    def algod(self, method: str, path: str, q: dict, body: Optional[bytes]):
+        m = lambda pattern: re.fullmatch(pattern, path)
+        with self.lock:
+            if path == "/transactions/params":
+                return {
+                    "consensus-version": "future",
+                    "fee": 0,
+                    "min-fee": MIN_FEE,
+                    "genesis-id": GENESIS_ID,
+                    "genesis-hash": GENESIS_HASH,
+                    "last-round": self.round,
+                }
+            if path == "/genesis":
+                return {
+                    "id": GENESIS_ID,
+                    "network": "dockernet",
+                    "alloc": [
+                        {"addr": self.dispenser, "comment": "Wallet1", "state": {}}
+                    ],
+                }
+            if path in ("/health", "/ready"):
+                return {}
+            if path == "/versions":
+                return {
+                    "genesis_id": GENESIS_ID,
+                    "genesis_hash_b64": GENESIS_HASH,
+                    "versions": ["v2"],
+                }
+            if path == "/status":
+                return self.status()
+            if r := m(r"/status/wait-for-block-after/(\d+)"):
+                after = int(r.group(1))
+                self.new_block.wait_for(lambda: self.round > after, timeout=1.0)
+                return self.status()
+            if path == "/transactions" and method == "POST":
+                return {"txId": self.submit(body or b"")}
+            if path == "/transactions/pending":
+                return {"top-transactions": [], "total-transactions": 0}
+            if r := m(r"/transactions/pending/(\w+)"):
+                info = self.confirmed.get(r.group(1))
+                if info is None:
+                    raise ChainError(404, "txn does not exist")
+                return info
+            if r := m(r"/accounts/(\w{58})/assets/(\d+)"):
+                acct = self.accounts.get(r.group(1)) or {"assets": {}}
+                aid = int(r.group(2))
+                if aid not in acct["assets"]:
+                    raise ChainError(404, "account asset info not found")
+                return {
+                    "round": self.round,
+                    "asset-holding": {
+                        "amount": acct["assets"][aid],
+                        "asset-id": aid,
+                        "is-frozen": False,
+                    },
+                }
+            if r := m(r"/accounts/(\w{58})"):
+                addr = r.group(1)
+                acct = self.accounts.get(addr) or {"amount": 0, "assets": {}}
+                return {
+                    "address": addr,
+                    "amount": acct["amount"],
+                    "amount-without-pending-rewards": acct["amount"],
+                    "min-balance": 100_000 * (1 + len(acct["assets"])),
+                    "assets": [
+                        {"asset-id": a, "amount": v, "is-frozen": False}
+                        for a, v in acct["assets"].items()
+                    ],
+                    "round": self.round,
+                    "status": "Offline",
+                    "total-apps-opted-in": 0,
+                    "total-assets-opted-in": len(acct["assets"]),
+                    "total-created-apps": 0,
+                    "total-created-assets": 0,
+                    "pending-rewards": 0,
+                    "rewards": 0,
+                }
+            if r := m(r"/assets/(\d+)"):
+                aid = int(r.group(1))
+                if aid not in self.assets:
+                    raise ChainError(404, "asset does not exist")
+                return {"index": aid, "params": self.assets[aid]}
+            if r := m(r"/applications/(\d+)/box"):
+                app = self.apps.get(int(r.group(1)))
+                name = (q.get("name") or [""])[0]
+                key = base64.b64decode(name.split(":", 1)[1]) if ":" in name else b""
+                if app is None or key not in app["boxes"]:
+                    raise ChainError(404, "box not found")
+                return {
+                    "name": base64.b64encode(key).decode(),
+                    "value": base64.b64encode(app["boxes"][key]).decode(),
+                    "round": self.round,
+                }
+            if r := m(r"/applications/(\d+)"):
+                app_id = int(r.group(1))
+                if app_id not in self.apps:
+                    raise ChainError(404, "application does not exist")
+                return {
+                    "id": app_id,
+                    "params": {"creator": self.apps[app_id]["creator"]},
+                }
+            if path == "/teal/compile":
+                digest = hashlib.sha256(body or b"").digest()
+                return {
+                    "hash": encoding.encode_address(digest),
+                    "result": base64.b64encode(b"\x08" + digest).decode(),
+                }
+            if r := m(r"/blocks/(\d+)/txids"):
+                rnd = int(r.group(1))
+                if rnd not in self.blocks:
+                    raise ChainError(404, "block not found")
+                return {"blockTxids": self.block_txids[rnd]}
+            if r := m(r"/blocks/(\d+)"):
+                rnd = int(r.group(1))
+                if rnd not in self.blocks:
+                    raise ChainError(404, "block not found")
+                return {"block": self.blocks[rnd]}
+        raise ChainError(404, f"sim algod: no route for {method} {path}")
+
+    # ---------------- indexer ----------------
+    def indexer(self, method: str, path: str, q: dict, body: Optional[bytes]):
+        one = lambda k: (q.get(k) or [None])[0]
+        if path == "/health":
+            with self.lock:
+                return {
+                    "round": self.round,
+                    "db-available": True,
+                    "is-migrating": False,
+                }
+        if path == "/transactions":
+            addr, aid = one("address"), one("asset-id")
+            limit = int(one("limit") or 1000)
+            start = int(one("next") or 0)
+            with self.lock:
+                hits = [
+                    t
+                    for t in self.tx_log
+                    if (not addr or addr in t["_parties"])
+                    and (
+                        not aid
+                        or (t.get("asset-transfer-transaction") or {}).get("asset-id")
+                        == int(aid)
+                    )
+                ]
+            page = hits[start : start + limit]
+            out = {
+                "current-round": self.round,
+                "transactions": [
+                    {k: v for k, v in t.items() if k != "_parties"} for t in page
+                ],
+            }
+            if start + limit < len(hits):
+                out["next-token"] = str(start + limit)
+            return out
+        raise ChainError(404, f"sim indexer: no route for {method} {path}")
+
+    # ---------------- kmd ----------------
+    def kmd(self, method: str, path: str, q: dict, body: Optional[bytes]):
+        data = json.loads(body or b"{}")
+        with self.lock:
+            if path == "/versions":
+                return {"versions": ["v1"]}
+            if path == "/wallets":
+                return {
+                    "wallets": [
+                        {"id": w["id"], "name": w["name"], "driver_name": "sqlite"}
+                        for w in self.wallets.values()
+                    ]
+                }
+            if path == "/wallet" and method == "POST":
+                name = data.get("wallet_name")
+                if any(w["name"] == name for w in self.wallets.values()):
+                    raise ChainError(400, "wallet with same name already exists")
+                w = self._create_wallet(name)
+                return {
+                    "wallet": {
+                        "id": w["id"],
+                        "name": w["name"],
+                        "driver_name": "sqlite",
+                    }
+                }
+            if path == "/wallet/init":
+                if data.get("wallet_id") not in self.wallets:
+                    raise ChainError(404, "wallet not found")
+                token = self._token()
+                self.handles[token] = data["wallet_id"]
+                return {"wallet_handle_token": token, "expires_seconds": 60}
+            if path in ("/wallet/release", "/wallet/renew"):
+                return {}
+            wallet = self.wallets.get(
+                self.handles.get(data.get("wallet_handle_token"), "")
+            )
+            if wallet is None:
+                raise ChainError(401, "invalid wallet handle")
+            if path == "/key/list":
+                return {"addresses": list(wallet["keys"])}
+            if path == "/key" and method == "POST":
+                sk, addr = self._keypair()
+                wallet["keys"][addr] = sk
+                return {"address": addr}
+            if path == "/key/export":
+                sk = wallet["keys"].get(data.get("address"))
+                if sk is None:
+                    raise ChainError(404, "key does not exist in this wallet")
+                return {"private_key": sk}
+        raise ChainError(404, f"sim kmd: no route for {method} {path}")
+
+
+# ---------------- urlopen shim ----------------
+class _Response:
+    def __init__(self, payload: bytes):
+        self._payload = payload
+        self.status = 200
+        self.length = len(payload)
+
+    def read(self, *args) -> bytes:
+        return self._payload
+
+
+def _urlopen(chain: Ledger, upstream: str, handler: Callable, prefix: str) -> Callable:
+    def urlopen(req, timeout=None):
+        chain.latency.wait(upstream)
+        parts = urlsplit(req.full_url)
+        path = parts.path
+        if path.startswith(prefix):
+            path = path[len(prefix) :]
+        q = parse_qs(parts.query)
+        body = bytes(req.data) if req.data is not None else None
+        try:
+            payload = handler(req.get_method(), path, q, body)
+        except ChainError as e:
+            raise urllib.error.HTTPError(
+                req.full_url,
+                e.status,
+                str(e),
+                {},
+                io.BytesIO(json.dumps({"message": str(e)}).encode()),
+            )
+        if (q.get("format") or [""])[0] == "msgpack":
+            return _Response(msgpack.packb(payload, use_bin_type=True))
+        return _Response(json.dumps(payload).encode())
+
+    return urlopen
+
+
+def install(rng: random.Random, latency) -> Ledger:
+    """Point the algosdk algod / indexer / kmd clients at a fresh Ledger."""
+    from algosdk import kmd
+    from algosdk.v2client import algod, indexer
+    from hackathon.teal_cache import cache as teal_cache
+
+    # /teal/compile answers with stand-in bytecode: keep it out of the
+    # on-disk TEAL cache a real LocalNet deploy would read back
+    teal_cache.configure(None)
+
+    chain = Ledger(rng, latency)
+    algod.urlopen = _urlopen(chain, "algod", chain.algod, "/v2")
+    indexer.urlopen = _urlopen(chain, "indexer", chain.indexer, "/v2")
+    kmd.urlopen = _urlopen(chain, "kmd", chain.kmd, "/v1")
+    return chain
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import copy
+import json
+import os
+import random
+import re
+import threading
+from types import SimpleNamespace
+from typing import Optional
+from urllib.parse import urlsplit
+
+# ─────────────────────────────────────────────────────────────
+# PayPal REST stand-in: OAuth, Checkout Orders and Payouts
+# ─────────────────────────────────────────────────────────────
+# Replaces the requests session used by app.utils.paypal, so token caching,
+# idempotency headers and the metrics wrappers stay on the path.
+#
+# Orders:  CREATED -> APPROVED -> COMPLETED. The buyer's approval in the
+#          browser is simulated: with SIM_PAYPAL_AUTO_APPROVE (default on)
+#          an order is approved as soon as it is created, otherwise call
+#          `approve(order_id)`. Capturing an unapproved or captured order
+#          fails with 422 like the real API.
+# Payouts: a batch is PENDING when created and SUCCESS once it has been
+#          polled SIM_PAYOUT_POLLS times.
+# A repeated PayPal-Request-Id replays the first response.
+
+SIM_PAYPAL_AUTO_APPROVE = os.getenv("SIM_PAYPAL_AUTO_APPROVE", "1") == "1"
+SIM_PAYOUT_POLLS = int(os.getenv("SIM_PAYOUT_POLLS", "1"))
+
+
+class Response:
+    def __init__(self, status: int, payload: Optional[dict], debug_id: str = ""):
+        self.status_code = status
+        self.text = json.dumps(payload) if payload is not None else ""
+        self.headers = {"paypal-debug-id": debug_id}
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def _error(status: int, name: str, issue: str = "") -> tuple[int, dict]:
+    body = {"name": name, "message": issue or name}
+    if issue:
+        body["details"] = [{"issue": issue}]
+    return status, body
+
+
+class PayPal:
+    def __init__(self, rng: random.Random, latency):
+        self.rng = rng
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.orders: dict[str, dict] = {}
+        self.payouts: dict[str, dict] = {}
+        self._polls: dict[str, int] = {}
+        self._replies: dict[str, tuple[int, dict]] = {}  # PayPal-Request-Id
+
+    def _id(self, n: int) -> str:
+        return "".join(self.rng.choices("0123456789ABCDEFGHJKLMNPRSTUVWXY", k=n))
+
+    def approve(self, order_id: str) -> None:
+        with self._lock:
+            order = self.orders[order_id]
+            if order["status"] == "CREATED":
+                order["status"] = "APPROVED"
+
+    # ---------------- orders ----------------
+    def _create_order(self, body: dict) -> tuple[int, dict]:
+        oid = self._id(17)
+        order = {
+            "id": oid,
+            "intent": body.get("intent", "CAPTURE"),
+            "status": "CREATED",
+            "purchase_units": body.get("purchase_units") or [{}],
+            "links": [
+                {
+                    "rel": "approve",
+                    "href": f"https://www.sandbox.paypal.com/checkoutnow?token={oid}",
+                    "method": "GET",
+                },
+                {
+                    "rel": "capture",
+                    "href": f"/v2/checkout/orders/{oid}/capture",
+                    "method": "POST",
+                },
+            ],
+        }
+        self.orders[oid] = order
+        reply = copy.deepcopy(order)  # as created, before approval
+        if SIM_PAYPAL_AUTO_APPROVE:
+            order["status"] = "APPROVED"
+        return 201, reply
+
+    def _capture(self, oid: str) -> tuple[int, dict]:
+        order = self.orders.get(oid)
+        if order is None:
+            return _error(404, "RESOURCE_NOT_FOUND", "INVALID_RESOURCE_ID")
+        if order["status"] == "CREATED":
+            return _error(422, "UNPROCESSABLE_ENTITY", "ORDER_NOT_APPROVED")
+        if order["status"] == "COMPLETED":
+            return _error(422, "UNPROCESSABLE_ENTITY", "ORDER_ALREADY_CAPTURED")
+        order["status"] = "COMPLETED"
+        unit = order["purchase_units"][0]
+        unit["payments"] = {
+            "captures": [
+                {
+                    "id": self._id(17),
+                    "status": "COMPLETED",
+                    "amount": unit.get("amount", {}),
+                    "final_capture": True,
+                }
+            ]
+        }
+        return 201, order
+
+    # ---------------- payouts ----------------
+    def _create_payout(self, body: dict) -> tuple[int, dict]:
+        header = body.get("sender_batch_header") or {}
+        if any(
+            b["batch_header"]["sender_batch_header"].get("sender_batch_id")
+            == header.get("sender_batch_id")
+            for b in self.payouts.values()
+        ):
+            return _error(422, "UNPROCESSABLE_ENTITY", "DUPLICATE_REQUEST_ID")
+        bid = self._id(13)
+        self.payouts[bid] = {
+            "batch_header": {
+                "payout_batch_id": bid,
+                "batch_status": "PENDING",
+                "sender_batch_header": header,
+            },
+            "items": [
+                {
+                    "payout_item_id": self._id(13),
+                    "payout_batch_id": bid,
+                    "transaction_status": "PENDING",
+                    "payout_item": item,
+                }
+                for item in body.get("items") or []
+            ],
+        }
+        self._polls[bid] = 0
+        return 201, {"batch_header": dict(self.payouts[bid]["batch_header"])}
+
+    def _poll_payout(self, bid: str) -> tuple[int, dict]:
+        batch = self.payouts.get(bid)
+        if batch is None:
+            return _error(404, "RESOURCE_NOT_FOUND", "INVALID_RESOURCE_ID")
+        self._polls[bid] += 1
+        if self._polls[bid] >= SIM_PAYOUT_POLLS:
+            batch["batch_header"]["batch_status"] = "SUCCESS"
+            for item in batch["items"]:
+                item["transaction_status"] = "SUCCESS"
+        return 200, batch
+
+    # ---------------- transport ----------------
+    def _route(self, method: str, path: str, body: dict) -> tuple[int, dict]:
+        m = lambda pattern: re.fullmatch(pattern, path)
+        if path == "/v2/checkout/orders" and method == "POST":
+            return self._create_order(body)
+        if r := m(r"/v2/checkout/orders/(\w+)/capture"):
+            return self._capture(r.group(1))
+        if r := m(r"/v2/checkout/orders/(\w+)"):
+            order = self.orders.get(r.group(1))
+            if order is None:
+                return _error(404, "RESOURCE_NOT_FOUND", "INVALID_RESOURCE_ID")
+            return 200, order
+        if path == "/v1/payments/payouts" and method == "POST":
+            return self._create_payout(body)
+        if r := m(r"/v1/payments/payouts/(\w+)"):
+            return self._poll_payout(r.group(1))
+        if r := m(r"/v1/payments/payouts-item/(\w+)"):
+            for batch in self.payouts.values():
+                for item in batch["items"]:
+                    if item["payout_item_id"] == r.group(1):
+                        return 200, item
+            return _error(404, "RESOURCE_NOT_FOUND", "INVALID_RESOURCE_ID")
+        return _error(404, "NOT_FOUND", f"sim paypal: no route for {method} {path}")
+
+    def post(self, url, **kwargs) -> Response:
+        self.latency.wait("paypal")
+        if urlsplit(url).path != "/v1/oauth2/token":
+            return Response(*_error(404, "NOT_FOUND"))
+        with self._lock:
+            token = "A21AA" + self._id(40)
+        return Response(200, {"access_token": token, "expires_in": 32400})
+
+    def request(self, method, url, json=None, params=None, headers=None, **kwargs):
+        self.latency.wait("paypal")
+        path = urlsplit(url).path
+        request_id = (headers or {}).get("PayPal-Request-Id")
+        with self._lock:
+            if request_id and request_id in self._replies:
+                status, payload = self._replies[request_id]
+            else:
+                status, payload = self._route(method, path, json or {})
+                if request_id and status < 400:
+                    self._replies[request_id] = (status, copy.deepcopy(payload))
+            return Response(status, payload, self._id(12).lower())
+
+
+def install(rng: random.Random, latency) -> PayPal:
+    import app.utils.paypal as paypal
+
+    engine = PayPal(rng, latency)
+    paypal._session = SimpleNamespace(post=engine.post, request=engine.request)
+    return engine
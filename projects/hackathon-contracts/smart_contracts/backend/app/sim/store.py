@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import copy
+import random
+import threading
+import time
+from typing import Any, Iterator, Optional
+
+from google.api_core.exceptions import Aborted, AlreadyExists, NotFound
+from google.cloud.firestore_v1 import transforms
+
+# ─────────────────────────────────────────────────────────────
+# Dict-backed document store (the firestore.Client surface we use)
+# ─────────────────────────────────────────────────────────────
+# Covers what the backend uses: documents (get / set with merge / update /
+# create / delete, get_all), nested merges, Increment, filters + stream,
+# subcollections, all-or-nothing write batches and transactions (for
+# firestore.transactional: optimistic, a commit aborts if any document it
+# read has changed since). Every round trip (a get, a write, a stream, a
+# batch commit) calls latency.wait("firestore").
+
+
+def _apply(target: dict, data: dict, merge: bool) -> dict:
+    out = copy.deepcopy(target) if merge else {}
+    for key, value in data.items():
+        if isinstance(value, transforms.Increment):
+            cur = out.get(key)
+            out[key] = (cur if isinstance(cur, (int, float)) else 0) + value.value
+        elif value is transforms.DELETE_FIELD:
+            out.pop(key, None)
+        elif value is transforms.SERVER_TIMESTAMP:
+            out[key] = time.time()
+        elif isinstance(value, dict) and merge:
+            cur = out.get(key)
+            out[key] = _apply(cur if isinstance(cur, dict) else {}, value, True)
+        elif isinstance(value, dict):
+            out[key] = _apply({}, value, False)
+        else:
+            out[key] = copy.deepcopy(value)
+    return out
+
+
+def _nest(dotted: dict) -> dict:
+    """update() takes 'a.b' field paths; turn them into nested dicts."""
+    out: dict = {}
+    for key, value in dotted.items():
+        parts = key.split(".")
+        cur = out
+        for p in parts[:-1]:
+            cur = cur.setdefault(p, {})
+        cur[parts[-1]] = value
+    return out
+
+
+def _field(doc: dict, path: str) -> Any:
+    cur: Any = doc
+    for p in path.split("."):
+        if not isinstance(cur, dict) or p not in cur:
+            return _MISSING
+        cur = cur[p]
+    return cur
+
+
+_MISSING = object()
+
+_OPS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a in b,
+    "not-in": lambda a, b: a not in b,
+    "array_contains": lambda a, b: isinstance(a, list) and b in a,
+}
+
+
+class Snapshot:
+    def __init__(self, ref: "DocumentReference", data: Optional[dict]):
+        self.reference = ref
+        self.id = ref.id
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[dict]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field: str) -> Any:
+        v = _field(self._data or {}, field)
+        return None if v is _MISSING else copy.deepcopy(v)
+
+
+class DocumentReference:
+    def __init__(self, client: "DocumentStore", path: tuple):
+        self._client = client
+        self.path_tuple = path
+        self.id = path[-1]
+
+    @property
+    def path(self) -> str:
+        return "/".join(self.path_tuple)
+
+    def collection(self, name: str) -> "CollectionReference":
+        return CollectionReference(self._client, self.path_tuple + (name,))
+
+    def get(self, *args, transaction: Optional["Transaction"] = None, **kwargs):
+        self._client.latency.wait("firestore")
+        with self._client.lock:
+            if transaction is not None:
+                transaction._read(self.path_tuple)
+            return Snapshot(self, copy.deepcopy(self._client.docs.get(self.path_tuple)))
+
+    def set(self, data: dict, merge: bool = False) -> None:
+        self._client.latency.wait("firestore")
+        self._client._set(self.path_tuple, data, merge)
+
+    def update(self, data: dict) -> None:
+        self._client.latency.wait("firestore")
+        self._client._update(self.path_tuple, data)
+
+    def create(self, data: dict) -> None:
+        self._client.latency.wait("firestore")
+        self._client._create(self.path_tuple, data)
+
+    def delete(self) -> None:
+        self._client.latency.wait("firestore")
+        self._client._delete(self.path_tuple)
+
+
+class Query:
+    def __init__(self, client: "DocumentStore", path: tuple, filters=(), limit=None):
+        self._client = client
+        self._path = path
+        self._filters = tuple(filters)
+        self._limit = limit
+
+    def where(self, field_path=None, op_string=None, value=None, *, filter=None):
+        if filter is not None:
+            field_path, op_string, value = (
+                filter.field_path,
+                filter.op_string,
+                filter.value,
+            )
+            if not isinstance(op_string, str):  # `== None` becomes IS_NULL
+                op_string, value = "==", None
+        return Query(
+            self._client,
+            self._path,
+            self._filters + ((field_path, op_string, value),),
+            self._limit,
+        )
+
+    def limit(self, n: int) -> "Query":
+        return Query(self._client, self._path, self._filters, n)
+
+    def _matches(self, doc: dict) -> bool:
+        for field, op, value in self._filters:
+            have = _field(doc, field)
+            if have is _MISSING:
+                if not (op == "==" and value is None):
+                    return False
+                have = None
+            if not _OPS[op](have, value):
+                return False
+        return True
+
+    def stream(
+        self, *args, transaction: Optional["Transaction"] = None, **kwargs
+    ) -> Iterator[Snapshot]:
+        self._client.latency.wait("firestore")
+        n = len(self._path)
+        with self._client.lock:
+            hits = [
+                (path, copy.deepcopy(doc))
+                for path, doc in self._client.docs.items()
+                if len(path) == n + 1 and path[:n] == self._path and self._matches(doc)
+            ]
+            if self._limit is not None:
+                hits = hits[: self._limit]
+            if transaction is not None:
+                for path, _ in hits:
+                    transaction._read(path)
+        for path, doc in hits:
+            yield Snapshot(DocumentReference(self._client, path), doc)
+
+    def get(self, *args, **kwargs) -> list[Snapshot]:
+        return list(self.stream(*args, **kwargs))
+
+
+class CollectionReference(Query):
+    def __init__(self, client: "DocumentStore", path: tuple):
+        super().__init__(client, path)
+        self.id = path[-1]
+
+    def document(self, doc_id: Optional[str] = None) -> DocumentReference:
+        return DocumentReference(
+            self._client, self._path + (doc_id or self._client._new_id(),)
+        )
+
+    def add(self, data: dict):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+
+class WriteBatch:
+    def __init__(self, client: "DocumentStore"):
+        self._client = client
+        self._ops: list[tuple] = []
+
+    def set(self, ref: DocumentReference, data: dict, merge: bool = False):
+        self._ops.append(("set", ref.path_tuple, data, merge))
+
+    def update(self, ref: DocumentReference, data: dict):
+        self._ops.append(("update", ref.path_tuple, data, None))
+
+    def create(self, ref: DocumentReference, data: dict):
+        self._ops.append(("create", ref.path_tuple, data, None))
+
+    def delete(self, ref: DocumentReference):
+        self._ops.append(("delete", ref.path_tuple, None, None))
+
+    def commit(self):
+        self._client.latency.wait("firestore")
+        with self._client.lock:
+            self._apply_ops()
+        return []
+
+    def _apply_ops(self) -> None:
+        # caller holds the store lock; all-or-nothing, like the real thing
+        c = self._client
+        for op, path, _, _ in self._ops:
+            if op == "create" and path in c.docs:
+                raise AlreadyExists(f"{'/'.join(path)} already exists")
+            if op == "update" and path not in c.docs:
+                raise NotFound(f"{'/'.join(path)} not found")
+        for op, path, data, merge in self._ops:
+            if op == "set":
+                c._set(path, data, merge)
+            elif op == "update":
+                c._update(path, data)
+            elif op == "create":
+                c._create(path, data)
+            else:
+                c._delete(path)
+        self._ops = []
+
+
+class Transaction(WriteBatch):
+    """The private surface firestore.transactional drives (begin/commit/rollback)."""
+
+    def __init__(self, client: "DocumentStore", max_attempts: int = 5):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._read_only = False
+        self._id: Optional[bytes] = None
+        self._reads: dict[tuple, int] = {}  # path -> version when first read
+
+    def _read(self, path: tuple) -> None:
+        self._reads.setdefault(path, self._client.versions.get(path, 0))
+
+    def get(self, ref_or_query, *args, **kwargs) -> Iterator[Snapshot]:
+        if isinstance(ref_or_query, DocumentReference):
+            return iter([ref_or_query.get(transaction=self)])
+        return ref_or_query.stream(transaction=self)
+
+    def _clean_up(self) -> None:
+        self._ops = []
+        self._reads = {}
+        self._id = None
+
+    def _begin(self, retry_id: Optional[bytes] = None) -> None:
+        self._id = self._client._new_id().encode()
+
+    def _rollback(self) -> None:
+        self._clean_up()
+
+    def _commit(self) -> list:
+        self._client.latency.wait("firestore")
+        c = self._client
+        try:
+            with c.lock:
+                for path, version in self._reads.items():
+                    if c.versions.get(path, 0) != version:
+                        raise Aborted(
+                            f"{'/'.join(path)} changed during the transaction"
+                        )
+                self._apply_ops()
+        finally:
+            self._clean_up()
+        return []
+
+
+class DocumentStore:
+    def __init__(self, rng: random.Random, latency):
+        self.rng = rng
+        self.latency = latency
+        self.lock = threading.RLock()
+        self.docs: dict[tuple, dict] = {}
+        self.versions: dict[tuple, int] = {}  # bumped on every write
+
+    def _new_id(self) -> str:
+        with self.lock:
+            return "%020x" % self.rng.getrandbits(80)
+
+    def collection(self, name: str) -> CollectionReference:
+        return CollectionReference(self, (name,))
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def get_all(self, references, *args, **kwargs) -> Iterator[Snapshot]:
+        self.latency.wait("firestore")
+        with self.lock:
+            snaps = [
+                Snapshot(ref, copy.deepcopy(self.docs.get(ref.path_tuple)))
+                for ref in references
+            ]
+        yield from snaps
+
+    def transaction(self, max_attempts: int = 5, **kwargs) -> Transaction:
+        return Transaction(self, max_attempts)
+
+    # caller may or may not hold the lock; RLock makes both fine
+    def _bump(self, path: tuple) -> None:
+        self.versions[path] = self.versions.get(path, 0) + 1
+
+    def _set(self, path: tuple, data: dict, merge: bool) -> None:
+        with self.lock:
+            self.docs[path] = _apply(self.docs.get(path, {}), data, merge)
+            self._bump(path)
+
+    def _update(self, path: tuple, data: dict) -> None:
+        with self.lock:
+            if path not in self.docs:
+                raise NotFound(f"{'/'.join(path)} not found")
+            self.docs[path] = _apply(self.docs[path], _nest(data), True)
+            self._bump(path)
+
+    def _create(self, path: tuple, data: dict) -> None:
+        with self.lock:
+            if path in self.docs:
+                raise AlreadyExists(f"{'/'.join(path)} already exists")
+            self.docs[path] = _apply({}, data, False)
+            self._bump(path)
+
+    def _delete(self, path: tuple) -> None:
+        with self.lock:
+            if self.docs.pop(path, None) is not None:
+                self._bump(path)
@@ -6,6 +6,9 @@ import uuid
 from typing import Any, Dict, Optional
 import requests
 
+from app.core import faults, metrics
+from app.sim import SIMULATION
+
 
 # ────────────────────────────────────────────────────────────────
 # Config
@@ -16,9 +19,15 @@ PAYPAL_CLIENT_ID = os.getenv("PAYPAL_CLIENT_ID", "")
 PAYPAL_CLIENT_SECRET = os.getenv("PAYPAL_CLIENT_SECRET", "")
 TIMEOUT = 20  # seconds
 
-if not PAYPAL_CLIENT_ID or not PAYPAL_CLIENT_SECRET:
-    # Fail fast in dev if creds aren’t set
-    raise RuntimeError("Missing PAYPAL_CLIENT_ID / PAYPAL_CLIENT_SECRET env vars")
+# One keep-alive pool for every PayPal call (token, orders, payouts)
+_session = requests.Session()
+
+
+def _require_creds() -> None:
+    # Checked on first token fetch, not at import, so the module can load
+    # before the worker needs PayPal (SIMULATION serves PayPal in memory)
+    if (not PAYPAL_CLIENT_ID or not PAYPAL_CLIENT_SECRET) and not SIMULATION:
+        raise RuntimeError("Missing PAYPAL_CLIENT_ID / PAYPAL_CLIENT_SECRET env vars")
 
 
 # ────────────────────────────────────────────────────────────────
@@ -43,14 +52,18 @@ def _get_app_token() -> str:
     if _token_cache["access_token"] and _now() < (_token_cache["expires_at"] - 120):
         return _token_cache["access_token"]
 
-    r = requests.post(
-        f"{PAYPAL_API}/v1/oauth2/token",
-        auth=(PAYPAL_CLIENT_ID, PAYPAL_CLIENT_SECRET),
-        data={"grant_type": "client_credentials"},
-        headers={"Accept": "application/json"},
-        timeout=TIMEOUT,
-    )
+    _require_creds()
+    with metrics.timed("paypal", "POST /v1/oauth2/token"):
+        faults.inject("paypal", "POST /v1/oauth2/token", TIMEOUT)
+        r = _session.post(
+            f"{PAYPAL_API}/v1/oauth2/token",
+            auth=(PAYPAL_CLIENT_ID, PAYPAL_CLIENT_SECRET),
+            data={"grant_type": "client_credentials"},
+            headers={"Accept": "application/json"},
+            timeout=TIMEOUT,
+        )
     if r.status_code != 200:
+        metrics.http_error("paypal", "POST /v1/oauth2/token", r.status_code)
         raise RuntimeError(f"PayPal token error {r.status_code}: {r.text[:500]}")
     data = r.json()
     _token_cache["access_token"] = data["access_token"]
@@ -85,17 +98,21 @@ def _pp_request(
         headers["PayPal-Request-Id"] = idempotency_key
 
     url = f"{PAYPAL_API}{path}"
-    r = requests.request(
-        method,
-        url,
-        json=json,
-        params=params,
-        headers=headers,
-        timeout=TIMEOUT,
-    )
+    op = metrics.path_op(method, path)
+    with metrics.timed("paypal", op):
+        faults.inject("paypal", op, TIMEOUT)
+        r = _session.request(
+            method,
+            url,
+            json=json,
+            params=params,
+            headers=headers,
+            timeout=TIMEOUT,
+        )
 
     # 200/201/202 are all common "success" responses
     if r.status_code >= 400:
+        metrics.http_error("paypal", op, r.status_code)
         dbg = r.headers.get("paypal-debug-id", "")
         raise RuntimeError(
             f"PayPal {method} {path} failed {r.status_code}: {r.text[:800]} "
@@ -0,0 +1,8 @@
+"""
+Offline load tests for the backend: the real FastAPI app, driven in-process,
+in SIMULATION mode (app.sim) with injected upstream latency.
+
+    python -m bench run --scenario mixed --rps 40 --duration 30
+    python -m bench compare <sha-a> <sha-b>
+    python -m bench startup
+"""
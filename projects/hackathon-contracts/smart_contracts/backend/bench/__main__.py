@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import sys
+import time
+
+from bench import results
+from bench.latency import Latency
+from bench.scenarios import SCENARIOS
+
+
+def _fmt(v) -> str:
+    return "-" if v is None else f"{v:.1f}"
+
+
+def _print_summary(summary: dict) -> None:
+    cols = ("count", "errors", "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+    width = max(len(r) for r in [*summary["routes"], "overall"])
+    print(f"{'route':<{width}}  " + "  ".join(f"{c:>14}" for c in cols))
+    rows = [*summary["routes"].items(), ("overall", summary["overall"])]
+    for route, s in rows:
+        cells = [
+            f"{s[c]:>14}" if isinstance(s[c], int) else f"{_fmt(s[c]):>14}"
+            for c in cols
+        ]
+        print(f"{route:<{width}}  " + "  ".join(cells))
+    print(
+        f"duration {summary['duration_s']}s, offered {summary['offered_rps']} rps, "
+        f"dropped {summary['dropped']}"
+    )
+
+
+async def _run(args) -> dict:
+    from bench.harness import Harness
+    from bench.load import run_load
+    from bench.scenarios import Users, picker
+
+    latency = Latency.parse(args.latency, args.latency_scale)
+    async with Harness(latency, args.seed) as h:
+        users = Users(h.client)
+        t0 = time.perf_counter()
+        await users.seed(args.users)
+        print(f"seeded {args.users} users in {time.perf_counter() - t0:.1f}s")
+        if args.warmup:
+            await run_load(picker(args.scenario, users), args.rps, args.warmup)
+        load = await run_load(
+            picker(args.scenario, users),
+            args.rps,
+            args.duration,
+            max_inflight=args.max_inflight,
+            poisson=not args.uniform,
+        )
+    return {
+        "scenario": args.scenario,
+        "rps": args.rps,
+        "duration": args.duration,
+        "users": args.users,
+        "seed": args.seed,
+        "latency": latency.as_dict(),
+        "python": platform.python_version(),
+        "summary": load.summary(),
+    }
+
+
+def cmd_run(args) -> int:
+    result = asyncio.run(_run(args))
+    _print_summary(result["summary"])
+    if not args.no_save:
+        print(f"saved {results.save(result, args.rev)}")
+    return 0
+
+
+def cmd_compare(args) -> int:
+    a = results.load(args.a, args.scenario)
+    b = results.load(args.b, args.scenario)
+    rows, regressed = results.compare(a, b, args.threshold)
+    print(f"{a['rev']} -> {b['rev']} ({args.scenario})")
+    for row in rows:
+        parts = []
+        for k in results.COMPARE_KEYS:
+            va, vb, d = row[k]
+            change = "" if d is None else f" ({d:+.0%})"
+            parts.append(f"{k[:-3]} {_fmt(va)}->{_fmt(vb)}{change}")
+        ea, eb = row["error_rate"]
+        flag = "  REGRESSION" if row["regressed"] else ""
+        print(
+            f"{row['route']:<32} "
+            + "  ".join(parts)
+            + f"  err {ea:.1%}->{eb:.1%}{flag}"
+        )
+    return 1 if regressed else 0
+
+
+def cmd_startup(args) -> int:
+    from bench import startup
+
+    out = startup.run(args.simulation, args.timeout)
+    if args.json:
+        print(json.dumps(out, indent=2))
+    else:
+        startup.print_report(out, args.top)
+    return 0
+
+
+def cmd_list(args) -> int:
+    for r in results.listing():
+        print(json.dumps(r))
+    return 0
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="python -m bench")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    run = sub.add_parser("run", help="drive the app in SIMULATION mode")
+    run.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    run.add_argument("--rps", type=float, default=20)
+    run.add_argument("--duration", type=float, default=30, help="seconds")
+    run.add_argument("--warmup", type=float, default=3, help="seconds, not recorded")
+    run.add_argument("--users", type=int, default=20, help="users signed up first")
+    run.add_argument("--max-inflight", type=int, default=512)
+    run.add_argument(
+        "--uniform", action="store_true", help="fixed, not Poisson, arrivals"
+    )
+    run.add_argument(
+        "--latency", default="", help='upstream ms, e.g. "binance=80:30,firestore=20"'
+    )
+    run.add_argument("--latency-scale", type=float, default=1.0)
+    run.add_argument("--seed", type=int, default=0, help="simulation seed")
+    run.add_argument("--rev", help="store under this name instead of the git sha")
+    run.add_argument("--no-save", action="store_true")
+    run.set_defaults(fn=cmd_run)
+
+    cmp = sub.add_parser("compare", help="per-route percentiles between two revs")
+    cmp.add_argument("a")
+    cmp.add_argument("b")
+    cmp.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    cmp.add_argument("--threshold", type=float, default=0.10)
+    cmp.set_defaults(fn=cmd_compare)
+
+    st = sub.add_parser("startup", help="cold-start profile of app.main")
+    st.add_argument("--top", type=int, default=15)
+    st.add_argument(
+        "--simulation", action="store_true", help="run with SIMULATION=1 (app.sim)"
+    )
+    st.add_argument(
+        "--timeout", type=float, default=60, help="s to wait for deferred routers"
+    )
+    st.add_argument("--json", action="store_true")
+    st.set_defaults(fn=cmd_startup)
+
+    ls = sub.add_parser("list", help="stored results")
+    ls.set_defaults(fn=cmd_list)
+
+    args = p.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    return args.fn(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
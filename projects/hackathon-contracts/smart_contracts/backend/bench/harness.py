@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+from contextlib import AsyncExitStack
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Any
+
+import httpx
+
+from bench.latency import Latency
+
+# ─────────────────────────────────────────────────────────────
+# App under test
+# ─────────────────────────────────────────────────────────────
+# The app runs in SIMULATION mode (see app.sim) with this run's latency
+# injected into every engine. Env is pinned before app.main is imported
+# (several modules read it at import time), then the real lifespan runs so
+# the job workers, chain follower, ledger and settlement loops are all live;
+# load starts once /ready reports the deferred routers and warm-up done.
+# Requests go through httpx's ASGITransport: no sockets, full middleware.
+
+BENCH_ENV = {
+    "SESSION_SECRET": "bench-session-secret",
+    "TRACE_EXPORTERS": "",
+}
+
+
+class Harness:
+    """
+    async with Harness(latency) as h:
+        r = await h.client.get("/health")
+    """
+
+    def __init__(self, latency: Latency, seed: int = 0):
+        self.latency = latency
+        self.seed = seed
+        self.engines: Any = None
+        self.app = None
+        self.client: httpx.AsyncClient | None = None
+        self._stack = AsyncExitStack()
+        self._tmp = tempfile.TemporaryDirectory(prefix="bench-")
+
+    async def __aenter__(self) -> "Harness":
+        for k, v in BENCH_ENV.items():
+            os.environ.setdefault(k, v)
+        os.environ["SIMULATION"] = "1"
+        # fresh follower / market state per run, not the developer's cache
+        os.environ["CHAIN_DATA_DIR"] = os.path.join(self._tmp.name, "chain")
+        os.environ["MARKET_DATA_DIR"] = os.path.join(self._tmp.name, "market")
+
+        from app import sim
+
+        self.engines = sim.install(self.seed, self.latency)
+
+        from app.main import app
+
+        self.app = app
+        await self._stack.enter_async_context(app.router.lifespan_context(app))
+        # virtual users carry their own session cookie: the shared jar keeps none
+        no_jar = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+        self.client = await self._stack.enter_async_context(
+            httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+                base_url="http://bench",
+                cookies=no_jar,
+                timeout=120,
+            )
+        )
+        # take traffic only once /ready says so, like a load balancer would
+        for _ in range(600):
+            if (await self.client.get("/ready")).status_code == 200:
+                break
+            await asyncio.sleep(0.1)
+        else:
+            raise RuntimeError("app not ready after 60s")
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        try:
+            await self._stack.aclose()
+        finally:
+            self._tmp.cleanup()
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import random
+import time
+from dataclasses import dataclass
+
+# ─────────────────────────────────────────────────────────────
+# Injected upstream latency
+# ─────────────────────────────────────────────────────────────
+# Spec: "algod=4,binance=60:20,firestore=15" -> per upstream mean ms and
+# optional jitter ms (uniform, +/-). Unlisted upstreams use DEFAULTS, which
+# are rough figures for LocalNet + a nearby cloud region.
+
+DEFAULTS = {
+    "firestore": (12.0, 6.0),
+    "algod": (3.0, 1.0),
+    "indexer": (8.0, 4.0),
+    "kmd": (2.0, 1.0),
+    "binance": (60.0, 25.0),
+    "paypal": (250.0, 80.0),
+}
+
+
+@dataclass
+class Latency:
+    table: dict[str, tuple[float, float]]
+    scale: float = 1.0  # multiply everything (0 disables)
+
+    @classmethod
+    def parse(cls, spec: str = "", scale: float = 1.0) -> "Latency":
+        table = dict(DEFAULTS)
+        for part in filter(None, (p.strip() for p in spec.split(","))):
+            name, _, value = part.partition("=")
+            mean, _, jitter = value.partition(":")
+            table[name.strip()] = (float(mean), float(jitter or 0))
+        return cls(table, scale)
+
+    def sample(self, upstream: str) -> float:
+        """Seconds to wait for one call to `upstream`."""
+        mean, jitter = self.table.get(upstream, (0.0, 0.0))
+        ms = max(0.0, mean + random.uniform(-jitter, jitter)) * self.scale
+        return ms / 1000
+
+    def wait(self, upstream: str) -> None:
+        s = self.sample(upstream)
+        if s:
+            time.sleep(s)
+
+    def as_dict(self) -> dict:
+        return {
+            "scale": self.scale,
+            "ms": {k: {"mean": m, "jitter": j} for k, (m, j) in self.table.items()},
+        }
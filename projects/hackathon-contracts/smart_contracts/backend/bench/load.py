@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+# ─────────────────────────────────────────────────────────────
+# Open-loop load generator
+# ─────────────────────────────────────────────────────────────
+# Arrivals are scheduled at the target rate (Poisson by default) whether or
+# not earlier requests have finished, so a slow server shows up as latency
+# and backlog rather than as a politely reduced request rate (no coordinated
+# omission). Latency is measured from the scheduled arrival time. Requests
+# past `max_inflight` are counted as dropped instead of being started.
+
+Op = Callable[[], Awaitable[int]]  # returns the HTTP status
+
+
+@dataclass
+class RouteStats:
+    latencies: list[float] = field(default_factory=list)  # seconds
+    errors: int = 0
+    statuses: dict[int, int] = field(default_factory=lambda: defaultdict(int))
+
+    def summary(self, duration: float) -> dict:
+        lat = sorted(self.latencies)
+        n = len(lat)
+        pct = lambda p: (
+            round(lat[min(n - 1, math.ceil(p * n) - 1)] * 1000, 2) if n else None
+        )
+        return {
+            "count": n,
+            "errors": self.errors,
+            "throughput_rps": round((n - self.errors) / duration, 2) if duration else 0,
+            "mean_ms": round(sum(lat) / n * 1000, 2) if n else None,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": round(lat[-1] * 1000, 2) if n else None,
+            "statuses": dict(sorted(self.statuses.items())),
+        }
+
+
+@dataclass
+class LoadResult:
+    duration: float
+    offered_rps: float
+    routes: dict[str, RouteStats]
+    dropped: int = 0
+
+    def summary(self) -> dict:
+        total = RouteStats()
+        for s in self.routes.values():
+            total.latencies += s.latencies
+            total.errors += s.errors
+            for k, v in s.statuses.items():
+                total.statuses[k] += v
+        return {
+            "duration_s": round(self.duration, 2),
+            "offered_rps": self.offered_rps,
+            "dropped": self.dropped,
+            "overall": total.summary(self.duration),
+            "routes": {
+                name: s.summary(self.duration)
+                for name, s in sorted(self.routes.items())
+            },
+        }
+
+
+async def run_load(
+    pick: Callable[[], tuple[str, Op]],
+    rps: float,
+    duration: float,
+    max_inflight: int = 512,
+    poisson: bool = True,
+) -> LoadResult:
+    """Start `pick()`'s op at `rps` for `duration` seconds, then drain."""
+    routes: dict[str, RouteStats] = defaultdict(RouteStats)
+    inflight: set[asyncio.Task] = set()
+    dropped = 0
+
+    async def one(name: str, op: Op, scheduled: float) -> None:
+        stats = routes[name]
+        try:
+            status = await op()
+        except Exception:
+            status = 599
+        stats.latencies.append(time.perf_counter() - scheduled)
+        stats.statuses[status] += 1
+        if status >= 400:
+            stats.errors += 1
+
+    t0 = time.perf_counter()
+    next_at = t0
+    while next_at - t0 < duration:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        name, op = pick()
+        if len(inflight) >= max_inflight:
+            dropped += 1
+        else:
+            task = asyncio.create_task(one(name, op, next_at))
+            inflight.add(task)
+            task.add_done_callback(inflight.discard)
+        next_at += random.expovariate(rps) if poisson else 1.0 / rps
+    if inflight:
+        await asyncio.gather(*inflight, return_exceptions=True)
+    return LoadResult(time.perf_counter() - t0, rps, dict(routes), dropped)
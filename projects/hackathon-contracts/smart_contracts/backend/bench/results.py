@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import time
+from pathlib import Path
+from typing import Optional
+
+# ─────────────────────────────────────────────────────────────
+# Result store: one JSON file per (commit, scenario)
+# ─────────────────────────────────────────────────────────────
+# BENCH_RESULTS_DIR/<sha>-<scenario>.json; a rerun on the same commit
+# overwrites. Runs on a dirty tree are stored under "<sha>+dirty" so they
+# never shadow the clean result for that commit.
+
+BENCH_RESULTS_DIR = Path(os.getenv("BENCH_RESULTS_DIR", ".cache/bench"))
+COMPARE_KEYS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def git_rev() -> str:
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", *args], capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    try:
+        sha = git("rev-parse", "--short=10", "HEAD")
+        dirty = bool(git("status", "--porcelain", "--untracked-files=no"))
+    except (OSError, subprocess.CalledProcessError):
+        return "nogit"
+    return f"{sha}+dirty" if dirty else sha
+
+
+def save(result: dict, rev: Optional[str] = None) -> Path:
+    rev = rev or git_rev()
+    result = {**result, "rev": rev, "saved_at": int(time.time())}
+    BENCH_RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = BENCH_RESULTS_DIR / f"{rev}-{result['scenario']}.json"
+    path.write_text(json.dumps(result, indent=2))
+    return path
+
+
+def load(rev: str, scenario: str) -> dict:
+    matches = sorted(BENCH_RESULTS_DIR.glob(f"{rev}*-{scenario}.json"))
+    if not matches:
+        raise FileNotFoundError(
+            f"no {scenario!r} result for {rev} in {BENCH_RESULTS_DIR}"
+        )
+    if len(matches) > 1:
+        exact = [p for p in matches if p.name == f"{rev}-{scenario}.json"]
+        if len(exact) != 1:
+            raise ValueError(f"{rev} is ambiguous: {[p.name for p in matches]}")
+        matches = exact
+    return json.loads(matches[0].read_text())
+
+
+def listing() -> list[dict]:
+    out = []
+    for p in sorted(BENCH_RESULTS_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime):
+        r = json.loads(p.read_text())
+        overall = r["summary"]["overall"]
+        out.append(
+            {
+                "rev": r["rev"],
+                "scenario": r["scenario"],
+                "rps": r["rps"],
+                "duration_s": r["duration"],
+                "p95_ms": overall["p95_ms"],
+                "throughput_rps": overall["throughput_rps"],
+            }
+        )
+    return out
+
+
+def compare(a: dict, b: dict, threshold: float = 0.10) -> tuple[list[dict], bool]:
+    """
+    Per route and percentile: a, b and the relative change. A route regresses
+    when any percentile grows by more than `threshold` or it gains errors.
+    """
+    rows, regressed = [], False
+    routes_a, routes_b = a["summary"]["routes"], b["summary"]["routes"]
+    for route in sorted(set(routes_a) | set(routes_b)):
+        ra, rb = routes_a.get(route), routes_b.get(route)
+        row = {"route": route}
+        bad = False
+        for k in COMPARE_KEYS:
+            va = ra.get(k) if ra else None
+            vb = rb.get(k) if rb else None
+            delta = (vb - va) / va if va and vb is not None else None
+            row[k] = (va, vb, delta)
+            bad |= delta is not None and delta > threshold
+        ea = ra["errors"] / ra["count"] if ra and ra["count"] else 0.0
+        eb = rb["errors"] / rb["count"] if rb and rb["count"] else 0.0
+        row["error_rate"] = (round(ea, 4), round(eb, 4))
+        bad |= eb > ea
+        row["regressed"] = bad
+        regressed |= bad
+        rows.append(row)
+    return rows, regressed
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import random
+import uuid
+from typing import Callable
+
+import httpx
+
+from bench.load import Op
+
+# ─────────────────────────────────────────────────────────────
+# Request mixes
+# ─────────────────────────────────────────────────────────────
+# Each scenario is a weighted mix of ops. Ops run as a random virtual user
+# from a pool signed up before measurement starts (signup itself is only
+# measured by the scenarios that include it). Users keep their own session
+# cookie; the client's shared jar is disabled by the harness.
+
+PASSWORD = "bench-password"
+
+SCENARIOS: dict[str, dict[str, float]] = {
+    "auth": {"signup": 0.3, "login": 0.7},
+    "quotes": {"quote": 1.0},
+    "ramp": {"ramp": 1.0},
+    "history": {"history": 1.0},
+    "mixed": {
+        "signup": 0.03,
+        "login": 0.07,
+        "quote": 0.45,
+        "ramp": 0.10,
+        "history": 0.35,
+    },
+}
+
+LABELS = {
+    "signup": "POST /auth/signup",
+    "login": "POST /auth/login",
+    "quote": "POST /api/ramp/quote",
+    "ramp": "POST /api/ramp/fiat-to-usdc",
+    "history": "GET /api/tx/history",
+}
+
+
+class Users:
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.sessions: dict[str, str] = {}  # email -> session cookie
+        self._seq = itertools.count()
+        self._run = uuid.uuid4().hex[:6]
+
+    def new_email(self) -> str:
+        return f"bench-{self._run}-{next(self._seq)}@example.com"
+
+    async def signup(self, email: str) -> httpx.Response:
+        r = await self.client.post(
+            "/auth/signup", json={"email": email, "password": PASSWORD}
+        )
+        if r.status_code == 200 and "session" in r.cookies:
+            self.sessions[email] = r.cookies["session"]
+        return r
+
+    async def seed(self, n: int, concurrency: int = 8) -> None:
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with sem:
+                r = await self.signup(self.new_email())
+                r.raise_for_status()
+
+        await asyncio.gather(*(one() for _ in range(n)))
+
+    def pick(self) -> tuple[str, dict]:
+        email = random.choice(list(self.sessions))
+        return email, {"Cookie": f"session={self.sessions[email]}"}
+
+
+def ops(users: Users) -> dict[str, Op]:
+    client = users.client
+
+    async def signup() -> int:
+        return (await users.signup(users.new_email())).status_code
+
+    async def login() -> int:
+        email, _ = users.pick()
+        r = await client.post(
+            "/auth/login", json={"email": email, "password": PASSWORD}
+        )
+        return r.status_code
+
+    async def quote() -> int:
+        _, h = users.pick()
+        usd = f"{random.choice((10, 25, 50, 100, 250))}.00"
+        r = await client.post("/api/ramp/quote", json={"usd": usd}, headers=h)
+        return r.status_code
+
+    async def ramp() -> int:
+        _, h = users.pick()
+        usd = f"{random.choice((5, 10, 20))}.00"
+        r = await client.post("/api/ramp/fiat-to-usdc", json={"usd": usd}, headers=h)
+        return r.status_code
+
+    async def history() -> int:
+        _, h = users.pick()
+        return (await client.get("/api/tx/history", headers=h)).status_code
+
+    return {
+        "signup": signup,
+        "login": login,
+        "quote": quote,
+        "ramp": ramp,
+        "history": history,
+    }
+
+
+def picker(scenario: str, users: Users) -> Callable[[], tuple[str, Op]]:
+    if scenario not in SCENARIOS:
+        raise KeyError(f"unknown scenario {scenario!r}; have {sorted(SCENARIOS)}")
+    mix = SCENARIOS[scenario]
+    table = ops(users)
+    names, weights = list(mix), list(mix.values())
+
+    def pick() -> tuple[str, Op]:
+        name = random.choices(names, weights)[0]
+        return LABELS[name], table[name]
+
+    return pick
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+# ─────────────────────────────────────────────────────────────
+# Cold-start profile
+# ─────────────────────────────────────────────────────────────
+# Starts the app in a fresh interpreter under `-X importtime`, runs the real
+# lifespan and times the first response from a few routes:
+#   health    GET /health                     (eager)
+#   auth      POST /auth/login, empty body    (eager; 422 without upstreams)
+#   deferred  GET /metrics                    (deferred router; 401 unauthenticated)
+# and how long until GET /ready first returns 200 (routers + warm-up done),
+# then joins that with the import log: self time per top-level package, split
+# into what app.main imports before serving ("eager") and what the deferred
+# router loader pulls in afterwards.
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+PROBE = r"""
+import asyncio, json, os, sys, time
+import httpx
+
+t0 = time.perf_counter()
+from app.main import app
+from app.core import startup
+from app.core.warmup import warmup
+
+out = {"import_s": time.perf_counter() - t0, "routes": {}}
+PROBES = {
+    "health": ("GET", "/health", None),
+    "auth": ("POST", "/auth/login", {}),
+    "deferred": ("GET", "/metrics", None),
+}
+
+
+async def until_ready(c):
+    while not startup.loader.error and (await c.get("/ready")).status_code != 200:
+        await asyncio.sleep(0.01)
+
+
+async def probe():
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with app.router.lifespan_context(app):
+        out["lifespan_s"] = time.perf_counter() - t0
+        eager = set(sys.modules)
+        async with httpx.AsyncClient(transport=transport, base_url="http://probe") as c:
+            for name, (method, path, body) in PROBES.items():
+                r = await c.request(method, path, json=body)
+                out["routes"][name] = {
+                    "path": f"{method} {path}",
+                    "status": r.status_code,
+                    "s": time.perf_counter() - t0,
+                }
+            await asyncio.wait_for(until_ready(c), float(sys.argv[1]))
+            out["ready_s"] = time.perf_counter() - t0
+        out["report"] = startup.report()
+        out["warmup"] = warmup.status()
+        out["eager_modules"] = sorted(eager)
+        print("\n" + json.dumps(out), flush=True)
+        os._exit(0)  # skip shutdown: background loops may be talking to upstreams
+
+
+asyncio.run(probe())
+"""
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """(module, self_us, cumulative_us, depth) in log order."""
+    rows = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append(
+                (m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2)
+            )
+    return rows
+
+
+def _subtree(rows: list, root: str) -> list:
+    """`root` and everything imported under it (the log is post-order)."""
+    for i, (module, _, _, depth) in enumerate(rows):
+        if module == root:
+            j = i
+            while j > 0 and rows[j - 1][3] > depth:
+                j -= 1
+            return [(m, s, c, d - depth) for m, s, c, d in rows[j : i + 1]]
+    return []
+
+
+def run(simulation: bool = False, timeout: float = 60) -> dict:
+    env = dict(os.environ)
+    env.setdefault("SESSION_SECRET", "startup-probe")
+    env.setdefault("TRACE_EXPORTERS", "")
+    if simulation:
+        env["SIMULATION"] = "1"
+    p = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE, str(timeout)],
+        cwd=BACKEND,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=timeout + 120,
+    )
+    lines = [l for l in p.stdout.splitlines() if l.startswith("{")]
+    if p.returncode != 0 or not lines:
+        raise RuntimeError(f"probe failed ({p.returncode}):\n{p.stderr[-3000:]}")
+    out = json.loads(lines[-1])
+    eager = set(out.pop("eager_modules"))
+    rows = parse_importtime(p.stderr)
+
+    packages: dict[str, dict[str, float]] = defaultdict(
+        lambda: {"eager_ms": 0.0, "deferred_ms": 0.0}
+    )
+    for module, self_us, _, _ in rows:
+        phase = "eager_ms" if module in eager else "deferred_ms"
+        packages[module.split(".")[0]][phase] += self_us / 1000
+    out["packages"] = dict(packages)
+    out["eager_imports"] = [
+        {"module": m, "cumulative_ms": cum / 1000, "depth": d}
+        for m, _, cum, d in _subtree(rows, "app.main")
+    ]
+    return out
+
+
+def print_report(out: dict, top: int = 15) -> None:
+    rep = out["report"]
+    print(
+        f"import app.main {out['import_s'] * 1000:.0f} ms, "
+        f"lifespan entered {out['lifespan_s'] * 1000:.0f} ms, "
+        f"deferred routers in {rep['marks'].get('routers_loaded', 0) * 1000:.0f} ms, "
+        f"ready in {out['ready_s'] * 1000:.0f} ms"
+        + (f"  (load failed: {rep['error']})" if rep["error"] else "")
+    )
+    print("\nfirst response (ms since import began)")
+    for name, r in out["routes"].items():
+        print(f"  {name:<9} {r['path']:<20} {r['status']}  {r['s'] * 1000:8.0f}")
+
+    print("\nwarm-up steps (ms)")
+    for name, st in out["warmup"]["steps"].items():
+        seconds = st["seconds"] or 0
+        detail = st["detail"] or ""
+        print(f"  {name:<12} {st['state']:<8} {seconds * 1000:8.0f}  {detail}")
+
+    print("\ndeferred router imports (ms)")
+    for module, s in rep["routers"].items():
+        print(f"  {module:<28} {s * 1000:8.0f}")
+
+    print(f"\npackages by import self time (ms), top {top}")
+    print(f"  {'package':<24} {'eager':>8} {'deferred':>9}")
+    rows = sorted(
+        out["packages"].items(),
+        key=lambda kv: -(kv[1]["eager_ms"] + kv[1]["deferred_ms"]),
+    )
+    for pkg, t in rows[:top]:
+        print(f"  {pkg:<24} {t['eager_ms']:8.0f} {t['deferred_ms']:9.0f}")
+
+    print(f"\nslowest imports under app.main by cumulative time (ms), top {top}")
+    shallow = [r for r in out["eager_imports"] if r["depth"] <= 2]
+    for r in sorted(shallow, key=lambda r: -r["cumulative_ms"])[:top]:
+        print(f"  {'  ' * r['depth']}{r['module']:<40} {r['cumulative_ms']:8.0f}")
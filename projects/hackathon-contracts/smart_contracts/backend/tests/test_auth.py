@@ -0,0 +1,14 @@
+from app.routers.auth import create_session_token, read_session_token
+
+
+def test_password_session_token_round_trips():
+    # password-only users have no Google "sub"; jose rejects a null one
+    token = create_session_token(email="a@x.io", sub=None, name=None, picture=None)
+    claims = read_session_token(token)
+    assert claims["email"] == "a@x.io"
+    assert "sub" not in claims
+
+
+def test_google_session_token_keeps_sub():
+    token = create_session_token(email="a@x.io", sub="1234", name="A", picture=None)
+    assert read_session_token(token)["sub"] == "1234"
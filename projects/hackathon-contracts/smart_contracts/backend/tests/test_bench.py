@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+# A fresh interpreter with only the backend on the path, as `python -m bench`
+# runs: SIMULATION and sys.path are both settled at import time.
+_SMOKE = """
+import asyncio
+from bench.harness import Harness
+from bench.latency import Latency
+
+async def main():
+    async with Harness(Latency.parse(scale=0)) as h:
+        assert (await h.client.get("/health")).status_code == 200
+
+asyncio.run(main())
+"""
+
+
+def test_harness_starts_the_app():
+    env = {k: v for k, v in os.environ.items() if k not in ("PYTHONPATH", "SIMULATION")}
+    proc = subprocess.run(
+        [sys.executable, "-c", _SMOKE],
+        cwd=BACKEND,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from algosdk import account
+
+from app.core import disburse
+
+
+def _parse(*chunks: bytes) -> list[disburse.Row]:
+    async def gen():
+        for c in chunks:
+            yield c
+
+    return asyncio.run(disburse.parse_rows(gen()))
+
+
+def test_csv_with_header_split_across_chunks():
+    rows = _parse(b"\xef\xbb\xbfrecipient,amount\na@x.io,1", b"2.5\r\nB@x.io,3\n\n")
+    assert [(r.n, r.recipient, r.amount, r.error) for r in rows] == [
+        (1, "a@x.io", "12.5", None),
+        (2, "B@x.io", "3", None),
+    ]
+
+
+def test_csv_without_header():
+    rows = _parse(b"a@x.io,1.000001\nb@x.io,0\n,5\nc@x.io,1.0000001")
+    assert [r.error for r in rows] == [
+        None,
+        "invalid amount",
+        "missing recipient",
+        "invalid amount",
+    ]
+
+
+def test_ndjson():
+    rows = _parse(
+        b'{"email": "a@x.io", "amount": "1"}\n'
+        b'{"address": "ADDR", "amount": 2}\n'
+        b"{oops\n"
+    )
+    assert [(r.recipient, r.amount, r.error) for r in rows] == [
+        ("a@x.io", "1", None),
+        ("ADDR", "2", None),
+        ("", "", "invalid json"),
+    ]
+
+
+def test_row_limit(monkeypatch):
+    monkeypatch.setattr(disburse, "DISBURSE_MAX_ROWS", 2)
+    with pytest.raises(ValueError):
+        _parse(b"a,1\nb,1\nc,1\n")
+
+
+def test_opt_in_lookup_failure_is_its_own_error():
+    a, b, c = (account.generate_account()[1] for _ in range(3))
+
+    def is_opted_in(address, asset_id):
+        if address == c:
+            raise RuntimeError("algod unavailable")
+        return address == a
+
+    rows = [disburse.Row(n, addr, "1") for n, addr in enumerate((a, b, c), 1)]
+    disburse.resolve(rows, 1, lambda h: None, lambda e: None, is_opted_in, int)
+    assert [r.error for r in rows] == [
+        None,
+        "recipient not opted in to USDC",
+        "opt-in lookup failed: algod unavailable",
+    ]
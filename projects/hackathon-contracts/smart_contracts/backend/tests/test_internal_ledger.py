@@ -0,0 +1,29 @@
+from app.core.internal_ledger import net_transfers
+
+
+def _apply(transfers) -> dict:
+    out: dict = {}
+    for debtor, creditor, amount in transfers:
+        assert amount > 0
+        out[debtor] = out.get(debtor, 0) - amount
+        out[creditor] = out.get(creditor, 0) + amount
+    return out
+
+
+def test_realises_positions_in_at_most_n_minus_1_transfers():
+    positions = {"A": -70, "B": -30, "C": 50, "D": 40, "E": 10}
+    transfers = net_transfers(positions)
+    assert _apply(transfers) == positions
+    assert len(transfers) <= len(positions) - 1
+
+
+def test_largest_debtor_pays_largest_creditor_first():
+    assert net_transfers({"A": -10, "B": -100, "C": 100, "D": 10}) == [
+        ("B", "C", 100),
+        ("A", "D", 10),
+    ]
+
+
+def test_zero_positions_need_no_transfers():
+    assert net_transfers({}) == []
+    assert net_transfers({"A": 0, "B": 0}) == []
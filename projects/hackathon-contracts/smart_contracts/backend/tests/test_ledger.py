@@ -0,0 +1,54 @@
+import random
+import time
+
+import pytest
+
+from app.core import ledger as ledger_mod
+from app.sim import NoLatency
+from app.sim.store import DocumentStore
+
+
+class _Algod:
+    def __init__(self, holdings: dict):
+        self.holdings = holdings
+
+    def account_asset_info(self, address, asset_id):
+        return {"round": 10, "asset-holding": {"amount": self.holdings[address]}}
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = DocumentStore(random.Random(0), NoLatency())
+    monkeypatch.setattr(ledger_mod, "get_firestore_client", lambda: store)
+    monkeypatch.setattr(ledger_mod, "LEDGER", lambda: store.collection("ledger"))
+    return store
+
+
+def test_confirmation_after_restart_settles_once(store):
+    before = ledger_mod.Ledger()
+    before.confirmed("tx0", 1, "B", "A", 1000)  # A starts with 1000
+    before.submitted("tx1", "A", "B", 500)
+    before.flush()
+
+    after = ledger_mod.Ledger()  # restarted: tx1's pending amounts are gone
+    assert after.balance("A")["pending_out"] == 0
+    after.confirmed("tx1", 2, "A", "B", 500)
+    a = after.balance("A")
+    assert (a["balance"], a["pending_out"], a["available"]) == (500, 0, 500)
+    assert after.balance("B")["pending_in"] == 0
+
+
+def test_reconcile_drops_stale_pending(store, monkeypatch):
+    led = ledger_mod.Ledger()
+    led.submitted("tx1", "A", "B", 500)
+    algod = _Algod({"A": 1000, "B": 0})
+    led.reconcile("A", algod, 1)
+    assert led.balance("A")["pending_out"] == 500  # still within the TTL
+
+    now = time.time()
+    monkeypatch.setattr(
+        ledger_mod.time, "time", lambda: now + ledger_mod.LEDGER_PENDING_TTL + 1
+    )
+    led.reconcile("A", algod, 1)
+    assert led.balance("A")["pending_out"] == 0
+    assert led.balance("B")["pending_in"] == 0
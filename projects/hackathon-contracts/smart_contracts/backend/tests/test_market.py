@@ -0,0 +1,68 @@
+import pytest
+
+from app.core import market
+
+M = market.STEP_MS
+
+
+def _rows(start: int, n: int, price: float = 1.0) -> list:
+    return [
+        [(start + i) * M, price, price + 1, price - 1, price, 1.0] for i in range(n)
+    ]
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(market, "MARKET_DATA_DIR", tmp_path)
+    return tmp_path
+
+
+def _reloaded(store: market.KlineStore) -> market.KlineStore:
+    again = market.KlineStore(store.symbol)
+    assert again.load() == len(store)
+    return again
+
+
+def test_save_appends_and_skips_trimmed_rows(data_dir):
+    store = market.KlineStore("USDCUSDT")
+    store.extend(_rows(0, 10))
+    store.save()
+    size = (data_dir / "USDCUSDT-1m.0.t").stat().st_size
+
+    store.extend([[9 * M, 2.0, 3.0, 1.0, 2.5, 4.0], *_rows(10, 5)])  # 9 was forming
+    store.trim(3 * M)
+    store.save()
+    assert (data_dir / "USDCUSDT-1m.0.t").stat().st_size == size + 5 * 8
+
+    again = _reloaded(store)
+    assert list(again.cols["t"]) == [i * M for i in range(3, 15)]
+    assert again.cols["c"][6] == 2.5 and again.cols["v"][6] == 4.0
+
+
+def test_save_compacts_once_trimmed_rows_dominate(data_dir):
+    store = market.KlineStore("USDCUSDT")
+    store.extend(_rows(0, 10))
+    store.save()
+    store.trim(8 * M)
+    store.extend(_rows(10, 1))
+    store.save()
+    assert not (data_dir / "USDCUSDT-1m.0.t").exists()
+    assert list(_reloaded(store).cols["t"]) == [8 * M, 9 * M, 10 * M]
+
+
+def test_an_unfinished_save_is_ignored(data_dir):
+    store = market.KlineStore("USDCUSDT")
+    store.extend(_rows(0, 4))
+    store.save()
+    with (data_dir / "USDCUSDT-1m.0.t").open("ab") as f:
+        f.write(b"\0" * 12)  # a crash before the head was replaced
+    assert list(_reloaded(store).cols["t"]) == [i * M for i in range(4)]
+
+
+def test_series_buckets_whole_steps_and_caches_them():
+    store = market.KlineStore("USDCUSDT")
+    store.extend(_rows(0, 10))
+    a = store.series(1 * M, 7 * M, 5 * M)
+    assert a["t"] == [0, 5 * M]
+    assert a["v"] == [5.0, 5.0]
+    assert store.series(2 * M + 1, 6 * M, 5 * M) is a
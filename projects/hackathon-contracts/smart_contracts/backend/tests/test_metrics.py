@@ -0,0 +1,33 @@
+import pytest
+
+from app.core import metrics
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+
+
+def _stream(n):
+    yield from range(n)
+
+
+def test_stream_stopped_early_is_not_an_error():
+    stream = metrics._wrap_iter(_stream, "test", "stream")
+    for i in stream(5):
+        if i == 1:
+            break
+    assert ("test", "stream", "GeneratorExit") not in metrics.UPSTREAM_ERRORS._values
+    assert metrics.UPSTREAM_INFLIGHT._values[("test",)] == 0
+
+
+def test_stream_error_is_counted():
+    def broken():
+        yield 1
+        raise ValueError("boom")
+
+    stream = metrics._wrap_iter(broken, "test", "broken")
+    with pytest.raises(ValueError):
+        list(stream())
+    assert metrics.UPSTREAM_ERRORS._values[("test", "broken", "ValueError")] == 1
+    assert metrics.UPSTREAM_INFLIGHT._values[("test",)] == 0
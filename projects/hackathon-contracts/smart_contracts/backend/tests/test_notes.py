@@ -0,0 +1,68 @@
+from algosdk import account
+
+from app.core import notes
+
+
+def _receipt(**kw) -> dict:
+    r = {
+        "ts": 1_700_000_000,
+        "recipient": {"wallet": account.generate_account()[1]},
+        "payment": {"usd": "12.34", "usdc_bought": "12.001234"},
+        "exchange": {"symbol": "USDCUSDT", "effective_price_usdt_per_usdc": "1.0001"},
+        "binance": {"orderId": 987654321},
+    }
+    r.update(kw)
+    return r
+
+
+def test_v2_round_trip():
+    receipt = _receipt()
+    data, h = notes.encode_note_v2(receipt)
+    assert data.startswith(notes.MAGIC_V2)
+    assert len(data) <= 130
+    assert notes.decode_note(data) == {
+        "k": notes.NOTE_NS,
+        "v": 2,
+        "h": h,
+        "to": receipt["recipient"]["wallet"],
+        "usd": "12.34",
+        "usdc": "12.001234",
+        "px": "1.000100",
+        "oid": 987654321,
+        "ts": 1_700_000_000,
+        "sym": "USDCUSDT",
+    }
+
+
+def test_hash_is_the_content_hash():
+    receipt = _receipt()
+    _, h = notes.encode_note_v2(receipt)
+    assert h == notes.content_hash(receipt)
+    assert h != notes.content_hash(_receipt(ts=1))
+
+
+def test_missing_and_invalid_fields_are_left_out():
+    data, h = notes.encode_note_v2(
+        {"recipient": {"wallet": "not-an-address"}, "payment": {"usd": "1e3"}}
+    )
+    assert notes.decode_note(data) == {"k": notes.NOTE_NS, "v": 2, "h": h}
+
+
+def test_symbol_is_truncated():
+    data, _ = notes.encode_note_v2(_receipt(exchange={"symbol": "X" * 40}))
+    assert notes.decode_note(data)["sym"] == "X" * 16
+
+
+def test_empty_symbol_is_left_out():
+    data, _ = notes.encode_note_v2(_receipt(exchange={"symbol": ""}))
+    decoded = notes.decode_note(data)
+    assert decoded is not None
+    assert "sym" not in decoded
+
+
+def test_v1_json_and_garbage():
+    assert notes.decode_note(b'{"k":"rad/ramp","v":1}') == {"k": "rad/ramp", "v": 1}
+    assert notes.decode_note(b"") is None
+    assert notes.decode_note(b"hello") is None
+    assert notes.decode_note(b"{not json") is None
+    assert notes.decode_note(notes.MAGIC_V2 + b"\xff") is None
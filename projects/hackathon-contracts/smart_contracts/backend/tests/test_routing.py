@@ -0,0 +1,44 @@
+import pytest
+
+from app.core.routing import child_sizes, plan_routes
+
+
+def test_cheapest_asks_first_across_books():
+    books = {
+        "USDCUSDT": [(1.0002, 100), (1.0010, 1000)],
+        "FDUSDUSDT": [(1.0001, 50), (1.0005, 1000)],
+    }
+    routes = plan_routes(books, 300)
+    alloc = {r.symbol: r.quote_qty for r in routes}
+    # 50 @1.0001 (FDUSD), 100 @1.0002 (USDC), rest @1.0005 (FDUSD)
+    assert alloc["USDCUSDT"] == pytest.approx(100 * 1.0002)
+    assert alloc["FDUSDUSDT"] == pytest.approx(300 - 100 * 1.0002)
+    assert [r.symbol for r in routes] == ["FDUSDUSDT", "USDCUSDT"]
+    assert sum(alloc.values()) == pytest.approx(300)
+
+
+def test_small_share_folds_into_the_main_route():
+    books = {"USDCUSDT": [(1.0001, 5), (1.0003, 1000)], "FDUSDUSDT": [(1.0002, 1000)]}
+    routes = plan_routes(books, 100, min_child=10)
+    assert len(routes) == 1
+    assert routes[0].symbol == "FDUSDUSDT"
+    assert routes[0].quote_qty == pytest.approx(100)
+
+
+def test_thin_books_park_the_rest_on_the_deepest():
+    books = {"USDCUSDT": [(1.0, 10)], "FDUSDUSDT": [(1.0, 20)]}
+    routes = plan_routes(books, 100, min_child=0)
+    alloc = {r.symbol: r.quote_qty for r in routes}
+    assert alloc == {"FDUSDUSDT": pytest.approx(90), "USDCUSDT": pytest.approx(10)}
+
+
+def test_children_split_by_max_child():
+    routes = plan_routes({"USDCUSDT": [(1.0, 10_000)]}, 250, max_child=100)
+    assert routes[0].children == 3
+    assert child_sizes(250, 3) == [83.34, 83.33, 83.33]
+
+
+def test_nothing_to_route():
+    assert plan_routes({}, 100) == []
+    assert plan_routes({"USDCUSDT": []}, 100) == []
+    assert plan_routes({"USDCUSDT": [(1.0, 10)]}, 0) == []
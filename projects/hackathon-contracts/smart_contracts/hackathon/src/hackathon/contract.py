@@ -2,7 +2,6 @@ from __future__ import annotations
 from typing import Optional
 import base64
 
-from pyteal import *
 from algosdk import encoding as algo_encoding, transaction
 from algosdk.atomic_transaction_composer import (
     AtomicTransactionComposer,
@@ -10,61 +9,20 @@ from algosdk.atomic_transaction_composer import (
     TransactionWithSigner,
 )
 
-# --------------------------------------------------------------------
-# PyTeal program: store mapping sha256(email) -> 32-byte raw address
-# in application boxes. We use *bare* method dispatch via a string arg.
-# --------------------------------------------------------------------
-
-
-def approval_program() -> Expr:
-    # Args for both ops:
-    #   arg0: b"register_user" | b"get_wallet"
-    #   arg1: email_hash (32 bytes)
-    #   arg2: wallet (32 bytes)  -- only for register_user
-    method = Txn.application_args[0]
-    email_hash = Txn.application_args[1]
-
-    on_create = Approve()
-
-    # register_user(email_hash, wallet)
-    is_register = method == Bytes("register_user")
-    wallet = Txn.application_args[2]
-    do_register = Seq(
-        Assert(Len(email_hash) == Int(32)),
-        Assert(Len(wallet) == Int(32)),
-        App.box_put(email_hash, wallet),  # write 32B raw address
-        Approve(),
-    )
-
-    # get_wallet(email_hash) – no state change; box read is offchain
-    is_get = method == Bytes("get_wallet")
-    do_get = Approve()  # no-op (read occurs via indexer/SDK box read)
-
-    return Cond(
-        [Txn.application_id() == Int(0), on_create],
-        [is_register, do_register],
-        [is_get, do_get],
-    )
-
-
-def clear_program() -> Expr:
-    return Approve()
+from .teal_cache import cache
 
+# The PyTeal program lives in .program and is only imported when its TEAL
+# is not in the compiled-program cache (.teal_cache), so callers that just
+# register / read wallets, and most deploys, never load pyteal.
 
 # --------------------------------------------------------------------
 # Helpers to compile | deploy | call the app via algosdk (no Beaker)
 # --------------------------------------------------------------------
 
 
-def compile_teal(algod, expr: Expr) -> bytes:
-    teal = compileTeal(expr, mode=Mode.Application, version=8)
-    res = algod.compile(teal)
-    return base64.b64decode(res["result"])
-
-
 def create_app(algod, sender_addr: str, signer_sk: bytes) -> int:
-    approval = compile_teal(algod, approval_program())
-    clear = compile_teal(algod, clear_program())
+    approval = cache.compiled(algod, "approval").bytecode
+    clear = cache.compiled(algod, "clear").bytecode
 
     sp = algod.suggested_params()
     txn = transaction.ApplicationCreateTxn(
@@ -95,16 +53,18 @@ def call_register_user(
     caller_sk: bytes,
     email_hash_32: bytes,
     wallet_raw_32: bytes,
+    fee: Optional[int] = None,
 ) -> str:
     """
     Submit a *bare* app call with args:
       [b"register_user", email_hash_32, wallet_raw_32]
     Include the box reference for `email_hash_32`.
+    `fee` overrides the flat fee (μAlgos); defaults to the network min fee.
     """
     algod = algod_client
     sp = algod.suggested_params()
     sp.flat_fee = True
-    sp.fee = max(sp.min_fee, 1000)
+    sp.fee = max(sp.min_fee, fee or 1000)
 
     # Box reference for this email hash must be provided
     boxes = [(app_id, email_hash_32)]
@@ -154,9 +114,10 @@ def register_user(
     admin_sk: bytes,
     email_hash_32: bytes,
     wallet_raw_32: bytes,
+    fee: Optional[int] = None,
 ) -> str:
     return call_register_user(
-        algod_client, app_id, admin_addr, admin_sk, email_hash_32, wallet_raw_32
+        algod_client, app_id, admin_addr, admin_sk, email_hash_32, wallet_raw_32, fee
     )
 
 
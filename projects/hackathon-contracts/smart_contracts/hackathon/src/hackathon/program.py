@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from pyteal import *
+
+# --------------------------------------------------------------------
+# PyTeal program: store mapping sha256(email) -> 32-byte raw address
+# in application boxes. We use *bare* method dispatch via a string arg.
+# --------------------------------------------------------------------
+
+
+def approval_program() -> Expr:
+    # Args for both ops:
+    #   arg0: b"register_user" | b"get_wallet"
+    #   arg1: email_hash (32 bytes)
+    #   arg2: wallet (32 bytes)  -- only for register_user
+    method = Txn.application_args[0]
+    email_hash = Txn.application_args[1]
+
+    on_create = Approve()
+
+    # register_user(email_hash, wallet)
+    is_register = method == Bytes("register_user")
+    wallet = Txn.application_args[2]
+    do_register = Seq(
+        Assert(Len(email_hash) == Int(32)),
+        Assert(Len(wallet) == Int(32)),
+        App.box_put(email_hash, wallet),  # write 32B raw address
+        Approve(),
+    )
+
+    # get_wallet(email_hash) – no state change; box read is offchain
+    is_get = method == Bytes("get_wallet")
+    do_get = Approve()  # no-op (read occurs via indexer/SDK box read)
+
+    return Cond(
+        [Txn.application_id() == Int(0), on_create],
+        [is_register, do_register],
+        [is_get, do_get],
+    )
+
+
+def clear_program() -> Expr:
+    return Approve()
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from importlib import metadata
+from pathlib import Path
+from typing import Optional
+
+# --------------------------------------------------------------------
+# Compiled-program cache: PyTeal -> TEAL -> bytecode, each step on disk
+# --------------------------------------------------------------------
+# Two content-addressed layers, both also kept in memory for the process:
+#
+#   programs/<gen key>.teal     TEAL generated for one program, keyed by
+#                               sha256(program.py, pyteal version, program
+#                               name, TEAL version). A hit skips importing
+#                               pyteal and building the expression tree.
+#   compiled/<teal sha>.json    algod's compile result for that TEAL:
+#                               bytecode, program hash and source map.
+#                               Keyed by sha256 of the TEAL text, whose
+#                               `#pragma version` pins the assembler, so a
+#                               hit skips the algod round trip.
+#
+# Editing program.py or upgrading pyteal changes the first key; TEAL that
+# comes out identical still reuses its compiled entry. Files are written to
+# a temp name and renamed, so concurrent deploys never read a partial entry,
+# and an unreadable entry is treated as a miss. TEAL_CACHE_DIR moves the
+# cache; TEAL_CACHE=0 keeps it in memory only. Code that must not share the
+# on-disk cache (a simulated algod) calls `cache.configure(None)`.
+
+TEAL_VERSION = 8
+TEAL_CACHE = os.getenv("TEAL_CACHE", "1") == "1"
+TEAL_CACHE_DIR = Path(os.getenv("TEAL_CACHE_DIR", ".cache/teal"))
+
+_PROGRAM_SRC = Path(__file__).with_name("program.py")
+
+
+@dataclass(frozen=True)
+class CompiledProgram:
+    name: str
+    teal: str
+    teal_sha: str
+    bytecode: bytes
+    program_hash: str  # algod's "hash": the program's escrow address
+    sourcemap: Optional[dict]
+
+    def as_json(self) -> dict:
+        return {
+            "name": self.name,
+            "teal_sha": self.teal_sha,
+            "bytecode": base64.b64encode(self.bytecode).decode(),
+            "hash": self.program_hash,
+            "sourcemap": self.sourcemap,
+        }
+
+
+def _sha256(*parts: bytes) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(len(p).to_bytes(8, "big"))
+        h.update(p)
+    return h.hexdigest()
+
+
+def _pyteal_version() -> str:
+    try:
+        return metadata.version("pyteal")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def _write_atomic(path: Path, data: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+    tmp.write_text(data)
+    os.replace(tmp, path)
+
+
+def _read(path: Optional[Path]) -> Optional[str]:
+    if path is None:
+        return None
+    try:
+        return path.read_text()
+    except OSError:
+        return None
+
+
+class TealCache:
+    def __init__(self, directory: Optional[Path] = None):
+        self.directory = directory  # None: memory only
+        self._lock = threading.Lock()
+        self._gen_key: Optional[str] = None
+        self._teal: dict[str, str] = {}  # program name -> TEAL
+        self._compiled: dict[str, CompiledProgram] = {}  # teal sha -> result
+        self.stats = {"teal_hits": 0, "teal_misses": 0, "hits": 0, "misses": 0}
+
+    def _key(self, name: str) -> str:
+        if self._gen_key is None:
+            self._gen_key = _sha256(
+                _PROGRAM_SRC.read_bytes(),
+                _pyteal_version().encode(),
+                str(TEAL_VERSION).encode(),
+            )
+        return _sha256(self._gen_key.encode(), name.encode())
+
+    def configure(self, directory: Optional[Path]) -> None:
+        """Move the on-disk cache (None: memory only); drops what is in memory."""
+        with self._lock:
+            self.directory = directory
+            self._teal.clear()
+            self._compiled.clear()
+
+    def _path(self, *parts: str) -> Optional[Path]:
+        return None if self.directory is None else self.directory.joinpath(*parts)
+
+    # ---------------- PyTeal -> TEAL ----------------
+    def teal(self, name: str) -> str:
+        """TEAL for program.<name>_program(), generated at most once per source."""
+        if name in self._teal:
+            return self._teal[name]
+        path = self._path("programs", f"{self._key(name)}.teal")
+        teal = _read(path)
+        if teal:
+            self.stats["teal_hits"] += 1
+        else:
+            self.stats["teal_misses"] += 1
+            from pyteal import Mode, compileTeal
+
+            from . import program
+
+            expr = getattr(program, f"{name}_program")()
+            teal = compileTeal(expr, mode=Mode.Application, version=TEAL_VERSION)
+            if path is not None:
+                _write_atomic(path, teal)
+        with self._lock:
+            self._teal[name] = teal
+        return teal
+
+    # ---------------- TEAL -> bytecode ----------------
+    def compiled(self, algod, name: str) -> CompiledProgram:
+        teal = self.teal(name)
+        sha = _sha256(teal.encode())
+        hit = self._compiled.get(sha)
+        if hit is not None:
+            self.stats["hits"] += 1
+            return hit
+        path = self._path("compiled", f"{sha}.json")
+        prog = self._load(path, name, teal, sha)
+        if prog is None:
+            self.stats["misses"] += 1
+            res = algod.compile(teal, source_map=True)
+            prog = CompiledProgram(
+                name=name,
+                teal=teal,
+                teal_sha=sha,
+                bytecode=base64.b64decode(res["result"]),
+                program_hash=res.get("hash", ""),
+                sourcemap=res.get("sourcemap"),
+            )
+            if path is not None:
+                _write_atomic(path, json.dumps(prog.as_json()))
+        else:
+            self.stats["hits"] += 1
+        with self._lock:
+            self._compiled[sha] = prog
+        return prog
+
+    @staticmethod
+    def _load(
+        path: Optional[Path], name: str, teal: str, sha: str
+    ) -> Optional[CompiledProgram]:
+        raw = _read(path)
+        if raw is None:
+            return None
+        try:
+            d = json.loads(raw)
+            if d["teal_sha"] != sha:
+                return None
+            return CompiledProgram(
+                name=name,
+                teal=teal,
+                teal_sha=sha,
+                bytecode=base64.b64decode(d["bytecode"]),
+                program_hash=d.get("hash", ""),
+                sourcemap=d.get("sourcemap"),
+            )
+        except (ValueError, KeyError, TypeError):
+            return None  # torn or foreign file: recompile over it
+
+
+cache = TealCache(TEAL_CACHE_DIR if TEAL_CACHE else None)